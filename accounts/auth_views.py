@@ -1,10 +1,21 @@
-from rest_framework_simplejwt.views import TokenObtainPairView
-from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
+from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.serializers import TokenObtainPairSerializer, TokenRefreshSerializer
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import AccessToken, RefreshToken
 from rest_framework import status
+from rest_framework.exceptions import AuthenticationFailed
 from rest_framework.response import Response
 
+from core.throttling import RateLimitMixin
+from .authentication import add_claims, load_claims_user
+
 
 class ActiveUserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    @classmethod
+    def get_token(cls, user):
+        # authorization claims read by accounts.authentication.ClaimsJWTAuthentication
+        return add_claims(super().get_token(user), user)
+
     def validate(self, attrs):
         data = super().validate(attrs)
         user = self.user
@@ -13,8 +24,9 @@ class ActiveUserTokenObtainPairSerializer(TokenObtainPairSerializer):
         return data
 
 
-class ActiveUserTokenObtainPairView(TokenObtainPairView):
+class ActiveUserTokenObtainPairView(RateLimitMixin, TokenObtainPairView):
     serializer_class = ActiveUserTokenObtainPairSerializer
+    throttle_scope = "token"
 
     def post(self, request, *args, **kwargs):
         try:
@@ -22,3 +34,22 @@ class ActiveUserTokenObtainPairView(TokenObtainPairView):
         except Exception as e:
             # return a friendly 401 JSON
             return Response({"detail": "Account inactive or credentials invalid."}, status=status.HTTP_401_UNAUTHORIZED)
+
+
+class ClaimsTokenRefreshSerializer(TokenRefreshSerializer):
+    """Refresh with claims re-read from the database, so role/staff/seller changes apply within one access lifetime."""
+
+    def validate(self, attrs):
+        data = super().validate(attrs)
+        access = AccessToken(data["access"])
+        user = load_claims_user(access[api_settings.USER_ID_CLAIM])
+        if user is None:
+            raise AuthenticationFailed("No active account found for the given token.", code="no_active_account")
+        data["access"] = str(add_claims(access, user))
+        if "refresh" in data:
+            data["refresh"] = str(add_claims(RefreshToken(data["refresh"]), user))
+        return data
+
+
+class ClaimsTokenRefreshView(TokenRefreshView):
+    serializer_class = ClaimsTokenRefreshSerializer
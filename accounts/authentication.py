@@ -0,0 +1,95 @@
+# accounts/authentication.py
+"""
+Authorization claims carried in the JWT.
+
+Tokens issued by /api/token/ (and refreshed by /api/token/refresh/) carry:
+    user_id, username, is_active, is_staff, is_superuser, role, seller_id
+
+ClaimsJWTAuthentication turns a token with these claims into a ClaimsUser
+without touching the database, and the permission classes in
+products/permissions.py decide from the claims (seller_id instead of
+user.seller_profile, role instead of user.profile.role).
+
+Claims are as fresh as the access token: they are re-read from the database
+on every refresh, and SetRoleView / CreateSellerFromProfileView return a new
+token pair right away. Views that need the real User row (profile editing,
+seller creation) keep using JWTAuthentication (FULL_USER_AUTHENTICATION).
+"""
+from django.contrib.auth import get_user_model
+from django.utils.functional import cached_property
+from rest_framework.authentication import BasicAuthentication, SessionAuthentication
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.models import TokenUser
+from rest_framework_simplejwt.settings import api_settings
+from rest_framework_simplejwt.tokens import RefreshToken
+
+User = get_user_model()
+
+CLAIMS = ("is_active", "is_staff", "is_superuser", "role", "seller_id")
+
+
+def add_claims(token, user):
+    """Write the authorization claims of `user` into `token` (refresh or access)."""
+    # missing reverse one-to-ones raise RelatedObjectDoesNotExist, an AttributeError
+    profile = getattr(user, "profile", None)
+    seller = getattr(user, "seller_profile", None)
+    token["username"] = user.get_username()
+    token["is_active"] = user.is_active
+    token["is_staff"] = user.is_staff
+    token["is_superuser"] = user.is_superuser
+    token["role"] = profile.role if profile is not None else None
+    token["seller_id"] = seller.pk if seller is not None else None
+    return token
+
+
+def load_claims_user(user_id):
+    """The user with everything add_claims reads, in one query."""
+    return User.objects.select_related("profile", "seller_profile").filter(pk=user_id).first()
+
+
+def tokens_for_user(user):
+    """New refresh/access pair with fresh claims (after a role or seller change)."""
+    refresh = add_claims(RefreshToken.for_user(user), user)
+    return {"refresh": str(refresh), "access": str(refresh.access_token)}
+
+
+class ClaimsUser(TokenUser):
+    """Stateless request.user built from the token claims."""
+
+    @cached_property
+    def id(self):
+        # simplejwt stores the user id claim as a string; compare like User.pk (user_id FKs are ints)
+        return int(self.token[api_settings.USER_ID_CLAIM])
+
+    @property
+    def is_active(self):
+        return self.token.get("is_active", False)
+
+    @property
+    def role(self):
+        return self.token.get("role")
+
+    @property
+    def seller_id(self):
+        return self.token.get("seller_id")
+
+
+class ClaimsJWTAuthentication(JWTAuthentication):
+    """
+    JWTAuthentication without the per-request user query. Tokens issued before
+    the claims existed fall back to the database lookup.
+    """
+
+    def get_user(self, validated_token):
+        if api_settings.USER_ID_CLAIM not in validated_token or not all(claim in validated_token for claim in CLAIMS):
+            return super().get_user(validated_token)
+        user = ClaimsUser(validated_token)
+        if not user.is_active:
+            raise AuthenticationFailed("User is inactive", code="user_inactive")
+        return user
+
+
+# ClaimsJWTAuthentication is the API default (REST_FRAMEWORK settings); views that
+# read or write the User row itself (profile, seller creation) use these instead
+FULL_USER_AUTHENTICATION = [JWTAuthentication, SessionAuthentication, BasicAuthentication]
@@ -0,0 +1,16 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:44
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0002_verificationresend'),
+    ]
+
+    operations = [
+        migrations.DeleteModel(
+            name='VerificationResend',
+        ),
+    ]
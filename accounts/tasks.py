@@ -0,0 +1,28 @@
+# accounts/tasks.py
+# background tasks of the accounts app (run by `manage.py run_jobs`, see jobs/)
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.mail import send_mail
+
+from jobs import task
+
+User = get_user_model()
+
+
+@task(queue="email", max_attempts=8)
+def send_verification_email(user_id, verify_url):
+    """
+    ارسال ایمیل تایید حساب.
+    خطای SMTP به بیرون پرتاب می‌شود تا job با backoff دوباره اجرا شود.
+    """
+    user = User.objects.filter(pk=user_id, is_active=False).only("email").first()
+    if user is None or not user.email:
+        # already verified (or removed) before the worker got to it
+        return
+    subject = "تایید ایمیل — فروشگاه"
+    message = (
+        "لطفا برای تایید ایمیل خود روی لینک زیر کلیک کنید:\n"
+        + verify_url
+        + "\n\nپس از تایید، به صفحهٔ تعیین نوع کاربری هدایت می‌شوید."
+    )
+    send_mail(subject, message, getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@example.com"), [user.email])
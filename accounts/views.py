@@ -6,24 +6,33 @@ from .models import Profile
 from products.models import Seller
 from django.shortcuts import get_object_or_404
 from django.contrib.auth import get_user_model
-from rest_framework_simplejwt.tokens import RefreshToken
 from products.serializers import SellerSerializer  # اگر SellerSerializer آنجاست
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.core.signing import TimestampSigner, BadSignature, SignatureExpired
-from django.core.mail import send_mail
 from django.conf import settings
+from django.db import transaction
 from django.shortcuts import redirect
-from django.utils import timezone
-from datetime import timedelta
+from core.throttling import RateLimitMixin
+from .tasks import send_verification_email
+from .authentication import FULL_USER_AUTHENTICATION, tokens_for_user
 
 User = get_user_model()
 
-class RegisterAPIView(APIView):
+
+def build_verify_url(request, user):
+    """Signed (timestamped) link that activates the account server-side."""
+    token = TimestampSigner().sign(str(user.pk))
+    base = request.build_absolute_uri("/").rstrip("/")
+    return f"{base}/api/auth/verify-email/?token={token}"
+
+
+class RegisterAPIView(RateLimitMixin, APIView):
     """
     ثبت‌نام ساده: کاربر ساخته می‌شود و توکن JWT برگشت داده می‌شود.
     Frontend پس از دریافت توکن، کاربر را به صفحهٔ تکمیل پروفایل هدایت کند.
     """
     permission_classes = [permissions.AllowAny]
+    throttle_scope = "register"
 
     def post(self, request, *args, **kwargs):
         username = request.data.get("username")
@@ -36,41 +45,25 @@ class RegisterAPIView(APIView):
         if User.objects.filter(username=username).exists():
             return Response({"detail": "username already taken."}, status=status.HTTP_400_BAD_REQUEST)
 
-        # create user as inactive until email confirmed
-        user = User.objects.create_user(username=username, email=email, password=password)
-        user.is_active = False
-        user.save()
+        with transaction.atomic():
+            # create user as inactive until email confirmed
+            user = User.objects.create_user(username=username, email=email, password=password)
+            user.is_active = False
+            user.save()
 
-        # create signed token with timestamp
-        signer = TimestampSigner()
-        token = signer.sign(str(user.pk))
-
-        # build backend verify URL so clicking the link activates the account server-side
-        base = request.build_absolute_uri("/").rstrip("/")
-        verify_url = f"{base}/api/auth/verify-email/?token={token}"
-
-        # send email (in DEBUG console backend will print)
-        subject = "تایید ایمیل — فروشگاه"
-        message = (
-            "لطفا برای تایید ایمیل خود روی لینک زیر کلیک کنید:\n"
-            + verify_url
-            + "\n\nپس از تایید، به صفحهٔ تعیین نوع کاربری هدایت می‌شوید."
-        )
-        # send email and capture result (number of successfully delivered messages)
-        try:
-            sent = send_mail(subject, message, getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@example.com"), [user.email])
-        except Exception as e:
-            sent = 0
+            # the email is sent by the job worker (accounts/tasks.py); the job row is
+            # part of this transaction, so it only runs once the user is committed
+            if user.email:
+                send_verification_email.enqueue(user_id=user.pk, verify_url=build_verify_url(request, user))
 
         # return 201 but do not issue tokens until verified
         resp = {
             "user": {"id": user.pk, "username": user.username, "email": user.email},
             "detail": "verification_sent",
-            "email_sent": bool(sent),
-            "email_sent_count": int(sent),
+            "email_queued": bool(user.email),
         }
-        if not sent:
-            resp["warning"] = "mail_send_failed_or_zero"
+        if not user.email:
+            resp["warning"] = "no_email_address"
         return Response(resp, status=status.HTTP_201_CREATED)
 
 
@@ -123,9 +116,9 @@ class VerifyEmailView(APIView):
             user.save()
             # Issue JWT tokens for the user so frontend can auto-login immediately
             try:
-                refresh = RefreshToken.for_user(user)
-                access_token = str(refresh.access_token)
-                refresh_token = str(refresh)
+                tokens = tokens_for_user(user)
+                access_token = tokens["access"]
+                refresh_token = tokens["refresh"]
             except Exception:
                 access_token = ""
                 refresh_token = ""
@@ -142,67 +135,30 @@ class VerifyEmailView(APIView):
             return Response({"detail": "invalid_token"}, status=status.HTTP_400_BAD_REQUEST)
 
 
-class ResendVerificationEmailView(APIView):
+class ResendVerificationEmailView(RateLimitMixin, APIView):
     """
     Endpoint to resend verification email to the currently authenticated user.
     - Only for authenticated users who are not yet active.
-    - Returns {email_sent: bool, email_sent_count: int}
+    - Rate limited per user by RATE_LIMITS["verification_resend"] (429 {detail: rate_limited, allowed})
+    - Returns {email_queued: true}; the email is sent by the job worker
     """
     permission_classes = [permissions.IsAuthenticated]
+    throttle_scope = "verification_resend"
 
     def post(self, request):
         user = request.user
         if user.is_active:
             return Response({"detail": "already_verified"}, status=status.HTTP_400_BAD_REQUEST)
 
-        # Rate limit: max N resends per WINDOW hours
-        WINDOW_HOURS = getattr(settings, 'VERIFICATION_RESEND_WINDOW_HOURS', 24)
-        MAX_RESENDS = getattr(settings, 'VERIFICATION_RESEND_MAX', 5)
-        from .models import VerificationResend
-
-        now = timezone.now()
-        vr, created = VerificationResend.objects.get_or_create(user=user, defaults={
-            'count': 0,
-            'window_start': now,
-        })
-
-        # reset window if expired
-        if not created and (now - vr.window_start) > timedelta(hours=WINDOW_HOURS):
-            vr.count = 0
-            vr.window_start = now
-
-        if vr.count >= MAX_RESENDS:
-            return Response({"detail": "rate_limited", "allowed": MAX_RESENDS}, status=status.HTTP_429_TOO_MANY_REQUESTS)
-
-        # increment count and save
-        vr.count += 1
-        vr.save()
-
-        signer = TimestampSigner()
-        token = signer.sign(str(user.pk))
-        base = request.build_absolute_uri("/").rstrip("/")
-        verify_url = f"{base}/api/auth/verify-email/?token={token}"
-
-        subject = "تایید ایمیل — فروشگاه"
-        message = (
-            "لطفا برای تایید ایمیل خود روی لینک زیر کلیک کنید:\n"
-            + verify_url
-            + "\n\nپس از تایید، به صفحهٔ تعیین نوع کاربری هدایت می‌شوید."
-        )
-        try:
-            sent = send_mail(subject, message, getattr(settings, "DEFAULT_FROM_EMAIL", "noreply@example.com"), [user.email])
-        except Exception:
-            sent = 0
-
-        resp = {"email_sent": bool(sent), "email_sent_count": int(sent), "resend_count": vr.count}
-        if not sent:
-            resp["warning"] = "mail_send_failed_or_zero"
+        send_verification_email.enqueue(user_id=user.pk, verify_url=build_verify_url(request, user))
+        resp = {"email_queued": True}
         return Response(resp, status=status.HTTP_200_OK)
     
 class ProfileDetailView(generics.RetrieveUpdateAPIView):
     """
     GET/PUT profile of current user
     """
+    authentication_classes = FULL_USER_AUTHENTICATION
     permission_classes = [permissions.IsAuthenticated]
     serializer_class = ProfileSerializer
 
@@ -213,7 +169,9 @@ class SetRoleView(APIView):
     """
     User chooses role after login. If chooses SELLER, we can set company_requested flag
     or create Seller on demand.
+    The response carries a new token pair ("tokens") with the updated role claim.
     """
+    authentication_classes = FULL_USER_AUTHENTICATION
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
@@ -225,13 +183,17 @@ class SetRoleView(APIView):
         if role == Profile.Role.SELLER:
             profile.company_requested = True
         profile.save()
-        return Response(ProfileSerializer(profile).data, status=status.HTTP_200_OK)
+        data = ProfileSerializer(profile).data
+        data["tokens"] = tokens_for_user(request.user)
+        return Response(data, status=status.HTTP_200_OK)
 
 class CreateSellerFromProfileView(APIView):
     """
     Create Seller (minisite) for authenticated user.
     Only allowed if profile.role in (SELLER, BOTH) or user requested seller.
+    The response carries a new token pair ("tokens") with the seller_id claim.
     """
+    authentication_classes = FULL_USER_AUTHENTICATION
     permission_classes = [permissions.IsAuthenticated]
 
     def post(self, request):
@@ -251,4 +213,7 @@ class CreateSellerFromProfileView(APIView):
         profile.role = Profile.Role.BOTH
         profile.company_requested = False
         profile.save()
-        return Response({"seller": {"id": seller.id, "company_name": seller.company_name}}, status=status.HTTP_201_CREATED)
+        return Response(
+            {"seller": {"id": seller.id, "company_name": seller.company_name}, "tokens": tokens_for_user(request.user)},
+            status=status.HTTP_201_CREATED,
+        )
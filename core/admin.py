@@ -1,8 +1,62 @@
+import json
 from django.contrib import admin
-from .models import Contact
+from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
+from django.urls import path, reverse
+from django.utils.html import format_html
+from .models import Contact, RequestProfile
 
 
 
 @admin.register(Contact)
 class ContactAdmin(admin.ModelAdmin):
-    list_display = ('id','title', 'description','email') 
\ No newline at end of file
+    list_display = ('id','title', 'description','email')
+
+
+@admin.register(RequestProfile)
+class RequestProfileAdmin(admin.ModelAdmin):
+    list_display = ('created', 'kind', 'method', 'path', 'status_code', 'duration_ms', 'sql_count', 'sql_ms', 'peak_bytes', 'trigger', 'collapsed_link')
+    list_filter = ('kind', 'trigger', 'method', 'status_code')
+    search_fields = ('path',)
+    readonly_fields = ('kind', 'method', 'path', 'status_code', 'trigger', 'duration_ms', 'sql_count', 'sql_ms', 'samples', 'top_frames', 'collapsed_link', 'peak_bytes', 'memory_report')
+    exclude = ('collapsed', 'report')
+
+    def has_add_permission(self, request):
+        return False
+
+    def get_urls(self):
+        urls = [
+            path('<uuid:pk>/collapsed/', self.admin_site.admin_view(self.collapsed_view), name='core_requestprofile_collapsed'),
+        ]
+        return urls + super().get_urls()
+
+    def collapsed_view(self, request, pk):
+        """Download the stacks in collapsed format (flamegraph.pl / speedscope input)."""
+        profile = get_object_or_404(RequestProfile, pk=pk)
+        response = HttpResponse(profile.collapsed, content_type='text/plain; charset=utf-8')
+        response['Content-Disposition'] = f'attachment; filename="profile-{profile.pk}.collapsed"'
+        return response
+
+    @admin.display(description='Collapsed stacks')
+    def collapsed_link(self, obj):
+        if obj.kind != RequestProfile.Kind.CPU:
+            return '-'
+        url = reverse('admin:core_requestprofile_collapsed', args=[obj.pk])
+        return format_html('<a href="{}">download</a>', url)
+
+    @admin.display(description='Top frames (self samples)')
+    def top_frames(self, obj):
+        leaves = {}
+        for line in obj.collapsed.splitlines():
+            stack, _, count = line.rpartition(' ')
+            leaf = stack.rsplit(';', 1)[-1]
+            leaves[leaf] = leaves.get(leaf, 0) + int(count or 0)
+        top = sorted(leaves.items(), key=lambda item: item[1], reverse=True)[:15]
+        return format_html('<pre>{}</pre>', '\n'.join(f'{count:>6}  {leaf}' for leaf, count in top))
+
+    @admin.display(description='Memory report')
+    def memory_report(self, obj):
+        if not obj.report:
+            return '-'
+        return format_html('<pre>{}</pre>', json.dumps(obj.report, indent=2))
+
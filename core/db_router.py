@@ -0,0 +1,55 @@
+# core/db_router.py
+"""
+Read-replica routing.
+
+`ReplicaRouter` sends ORM reads to the "replica" alias only while
+`replica_reads()` is active; ReplicaRoutingMiddleware enables it for safe-method
+requests outside DB_PRIMARY_PATHS whose client has not written recently (see
+the sticky cookie in the middleware). Everything else - writes, management
+commands, shells, migrations - keeps using "default".
+
+Reads inside a transaction on "default" stay on the primary, so code that
+reads its own uncommitted writes keeps working even in a GET request.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, connections
+
+REPLICA_DB_ALIAS = "replica"
+
+_replica_reads = ContextVar("replica_reads", default=False)
+
+
+def replica_configured():
+    return REPLICA_DB_ALIAS in settings.DATABASES
+
+
+@contextmanager
+def replica_reads(enabled=True):
+    """Route ORM reads of the enclosed code to the replica (if one is configured)."""
+    token = _replica_reads.set(enabled)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if not _replica_reads.get() or not replica_configured():
+            return DEFAULT_DB_ALIAS
+        if connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return REPLICA_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # both aliases hold the same data
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,158 @@
+# core/identity.py
+"""
+Request-scoped identity map and serialization memo.
+
+A catalog page references the same few rows under many parents: 100 products
+on a page may share 5 sellers (through their offers), a handful of categories
+and standards. The querysets already fetch them efficiently (JOINs and
+prefetches), but Django builds one model instance per joined row and DRF
+renders the same nested dict once per parent.
+
+- `IdentityMap` keeps one instance per (model, pk) for the request.
+  `share_related()` walks relation paths such as "offers.seller" over the
+  objects about to be serialized and points every parent at the canonical
+  instance; relations that are not loaded yet are fetched in one query for
+  the ids the map does not already hold.
+- `MemoizedSerializerMixin` renders an instance once per request and
+  serializer class and reuses the dict for every parent that nests it.
+
+Both live on the HttpRequest, so they end with the request. The memo is only
+used for GET/HEAD requests (nothing changes between two renders of the same
+row) and can be switched off with SERIALIZATION_MEMO = False.
+"""
+from django.conf import settings
+from django.core.exceptions import ObjectDoesNotExist
+
+SAFE_METHODS = ("GET", "HEAD")
+
+
+def _http_request(request):
+    # DRF's Request wraps the HttpRequest; keep the state on the inner object so
+    # DRF and plain Django views of the same request share it
+    return getattr(request, "_request", request)
+
+
+class IdentityMap:
+    def __init__(self):
+        self._objects = {}
+
+    def __len__(self):
+        return len(self._objects)
+
+    def get(self, model, pk):
+        return self._objects.get((model._meta.concrete_model, pk))
+
+    def add(self, instance):
+        """Register `instance`; return the canonical instance for its row."""
+        key = (instance._meta.concrete_model, instance.pk)
+        return self._objects.setdefault(key, instance)
+
+    def load(self, model, pks):
+        """{pk: instance} for `pks`, querying only the ids not in the map yet."""
+        model = model._meta.concrete_model
+        pks = {pk for pk in pks if pk is not None}
+        missing = [pk for pk in pks if (model, pk) not in self._objects]
+        if missing:
+            for instance in model._default_manager.filter(pk__in=missing):
+                self.add(instance)
+        return {pk: self._objects[(model, pk)] for pk in pks if (model, pk) in self._objects}
+
+    def attach(self, instances, field_name):
+        """Point the forward FK/one-to-one `field_name` of `instances` at canonical instances."""
+        if not instances:
+            return []
+        field = instances[0]._meta.get_field(field_name)
+        unloaded = [obj for obj in instances if not field.is_cached(obj)]
+        loaded = self.load(field.related_model, (getattr(obj, field.attname) for obj in unloaded))
+        related = []
+        for obj in instances:
+            if field.is_cached(obj):
+                value = field.get_cached_value(obj)
+                if value is not None:
+                    value = self.add(value)
+            else:
+                value = loaded.get(getattr(obj, field.attname))
+            field.set_cached_value(obj, value)
+            if value is not None:
+                related.append(value)
+        return related
+
+
+def identity_map(request):
+    request = _http_request(request)
+    if not hasattr(request, "identity_map"):
+        request.identity_map = IdentityMap()
+    return request.identity_map
+
+
+def _follow(obj, name):
+    """Objects reachable through `name` (a forward relation, reverse one-to-one or prefetched many relation)."""
+    try:
+        value = getattr(obj, name)
+    except ObjectDoesNotExist:  # missing reverse one-to-one
+        return []
+    if value is None:
+        return []
+    if hasattr(value, "all"):
+        return list(value.all())
+    return [value]
+
+
+def follow_path(instances, path):
+    """
+    Split "offers.seller" into the objects reached through "offers" and the
+    final field name ("seller"). Intermediate steps are only traversed, so they
+    should be select_related/prefetched already.
+    """
+    objects = list(instances) if isinstance(instances, (list, tuple)) else [instances]
+    *through, field_name = path.split(".")
+    for name in through:
+        objects = [child for parent in objects for child in _follow(parent, name)]
+    return objects, field_name
+
+
+def share_related(request, instances, paths):
+    """
+    Canonicalize the related objects named by `paths` ("category",
+    "offers.seller", "specifications.standard") on `instances`; the last step
+    of each path must be a forward FK or one-to-one (see follow_path).
+    """
+    if request is None or not instances:
+        return instances
+    shared = identity_map(request)
+    for path in paths:
+        parents, field_name = follow_path(instances, path)
+        shared.attach(parents, field_name)
+    return instances
+
+
+def serialization_memo(context):
+    """The render memo of the serializer context's request, or None when memoizing is off."""
+    request = context.get("request") if context else None
+    if request is None or not getattr(settings, "SERIALIZATION_MEMO", True):
+        return None
+    request = _http_request(request)
+    if request.method not in SAFE_METHODS:
+        return None
+    if not hasattr(request, "serialization_memo"):
+        request.serialization_memo = {}
+    return request.serialization_memo
+
+
+class MemoizedSerializerMixin:
+    """
+    For serializers of shared reference rows (seller, category, standard):
+    render each instance once per request and return the same dict wherever
+    it is nested. Only for read-only representations that depend on nothing
+    but the instance (and the request).
+    """
+
+    def to_representation(self, instance):
+        memo = serialization_memo(self.context)
+        if memo is None or instance.pk is None:
+            return super().to_representation(instance)
+        key = (type(self), instance._meta.concrete_model, instance.pk)
+        data = memo.get(key)
+        if data is None:
+            data = memo[key] = super().to_representation(instance)
+        return data
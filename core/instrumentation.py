@@ -0,0 +1,104 @@
+# core/instrumentation.py
+"""
+Request phase tracking for DRF views.
+
+`InstrumentedViewMixin` splits a view into the phases we care about when
+looking at slow or memory-hungry endpoints:
+
+- filter:    filter_queryset (django-filter, search, ordering)
+- query:     paginate_queryset / queryset evaluation of the page
+- serialize: top-level serializer .to_representation (nested serializers included)
+- render:    response rendering (JSON encoding)
+
+Phases are only recorded inside `track_request()` (opened by the metrics
+middleware), so views used outside a tracked request behave exactly as before.
+Other instrumentation can subscribe to phase boundaries through listeners.
+"""
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from rest_framework.response import Response
+
+_current = ContextVar("request_phases", default=None)
+
+
+class RequestPhases:
+    """Accumulated seconds per phase for the current request, plus listeners.
+
+    A listener is any object with `phase_started(name)` and `phase_finished(name, seconds)`.
+    """
+
+    def __init__(self):
+        self.durations = defaultdict(float)
+        self.listeners = []
+
+
+def current_phases():
+    return _current.get()
+
+
+@contextmanager
+def track_request():
+    """Collect phase timings for the enclosed request handling."""
+    phases = RequestPhases()
+    token = _current.set(phases)
+    try:
+        yield phases
+    finally:
+        _current.reset(token)
+
+
+@contextmanager
+def phase(name):
+    phases = _current.get()
+    if phases is None:
+        yield
+        return
+    for listener in phases.listeners:
+        listener.phase_started(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        phases.durations[name] += elapsed
+        for listener in phases.listeners:
+            listener.phase_finished(name, elapsed)
+
+
+class InstrumentedViewMixin:
+    """Mixin for GenericAPIView subclasses recording filter/query/serialize/render phases."""
+
+    def filter_queryset(self, queryset):
+        with phase("filter"):
+            return super().filter_queryset(queryset)
+
+    def paginate_queryset(self, queryset):
+        # DRF's paginators return list(page), so the page query runs here
+        with phase("query"):
+            return super().paginate_queryset(queryset)
+
+    def get_object(self):
+        with phase("query"):
+            return super().get_object()
+
+    def get_serializer(self, *args, **kwargs):
+        serializer = super().get_serializer(*args, **kwargs)
+        to_representation = serializer.to_representation
+
+        def timed_to_representation(instance):
+            with phase("serialize"):
+                return to_representation(instance)
+
+        # instance attribute shadows the bound method for this serializer only
+        serializer.to_representation = timed_to_representation
+        return serializer
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(request, response, *args, **kwargs)
+        if isinstance(response, Response) and _current.get() is not None:
+            with phase("render"):
+                response.render()
+        return response
@@ -0,0 +1,101 @@
+# core/management/commands/bench_db_connections.py
+"""
+Measure what connection handling costs per request.
+
+Every simulated request follows Django's request lifecycle for database
+connections: close_if_unusable_or_obsolete() at request start (which also
+arms the health check), the queries, then close_if_unusable_or_obsolete()
+at request finish. It is run against copies of DATABASES['default'] with:
+
+- new:        CONN_MAX_AGE = 0, a new connection for every request
+- persistent: CONN_MAX_AGE > 0 with CONN_HEALTH_CHECKS
+- pool:       psycopg 3 in-process pool (only with psycopg 3 and Django 5.1+)
+
+Example:
+    python manage.py bench_db_connections --requests 500 --queries 3
+"""
+import time
+
+import django
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+
+from utils.benchmarking import summarize
+
+MODES = ("new", "persistent", "pool")
+
+
+def _pool_supported(connection):
+    return connection.vendor == "postgresql" and getattr(connection, "is_psycopg3", False) is True and django.VERSION >= (5, 1)
+
+
+class Command(BaseCommand):
+    help = "Benchmark per-request cost of new vs persistent vs pooled database connections."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=300, help="Simulated requests per mode (default: 300).")
+        parser.add_argument("--queries", type=int, default=2, help="Queries per simulated request (default: 2).")
+        parser.add_argument("--mode", action="append", choices=MODES, help="Only run these modes (repeatable).")
+        parser.add_argument("--database", default="default", help="Database alias to copy settings from.")
+
+    def handle(self, *args, **options):
+        if options["database"] not in connections.settings:
+            raise CommandError(f"Unknown database alias {options['database']!r}.")
+        base = connections.settings[options["database"]]
+        modes = options["mode"] or list(MODES)
+
+        results = {}
+        for mode in modes:
+            alias = f"bench_{mode}"
+            cfg = dict(base, OPTIONS=dict(base.get("OPTIONS", {})), TEST=dict(base.get("TEST", {})))
+            cfg["OPTIONS"].pop("pool", None)
+            if mode == "new":
+                cfg.update(CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False)
+            elif mode == "persistent":
+                cfg.update(CONN_MAX_AGE=600, CONN_HEALTH_CHECKS=True)
+            else:
+                cfg.update(CONN_MAX_AGE=0, CONN_HEALTH_CHECKS=False)
+                cfg["OPTIONS"]["pool"] = {"min_size": 1, "max_size": 2}
+
+            connections.settings[alias] = cfg
+            connection = connections[alias]
+            try:
+                if mode == "pool" and not _pool_supported(connection):
+                    self.stdout.write(self.style.WARNING("pool: skipped (needs PostgreSQL, psycopg 3 and Django 5.1+)"))
+                    continue
+                results[mode] = self._run(connection, options["requests"], options["queries"])
+            finally:
+                connection.close()
+                if mode == "pool" and hasattr(connection, "close_pool"):
+                    connection.close_pool()
+                del connections[alias]
+                del connections.settings[alias]
+
+        if not results:
+            raise CommandError("No mode could be run.")
+
+        self.stdout.write(f"{'mode':<11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'mean ms':>8}")
+        for mode, stats in results.items():
+            self.stdout.write(
+                f"{mode:<11} {stats['p50'] * 1000:>8.2f} {stats['p95'] * 1000:>8.2f} "
+                f"{stats['p99'] * 1000:>8.2f} {stats['mean'] * 1000:>8.2f}"
+            )
+        if "new" in results:
+            for mode in results:
+                if mode != "new":
+                    saved = (results["new"]["p50"] - results[mode]["p50"]) * 1000
+                    self.stdout.write(f"{mode}: saves {saved:.2f} ms per request at p50 compared to a new connection")
+
+    def _run(self, connection, requests, queries):
+        durations = []
+        for _ in range(max(1, requests)):
+            started = time.perf_counter()
+            # request_started / request_finished handlers (django.db.close_old_connections)
+            connection.close_if_unusable_or_obsolete()
+            with connection.cursor() as cursor:
+                for _ in range(queries):
+                    cursor.execute("SELECT 1")
+                    cursor.fetchone()
+            connection.close_if_unusable_or_obsolete()
+            durations.append(time.perf_counter() - started)
+        return summarize(durations)
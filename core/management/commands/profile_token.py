@@ -0,0 +1,14 @@
+# core/management/commands/profile_token.py
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from core.middleware import make_profile_token
+
+
+class Command(BaseCommand):
+    help = "Print a signed X-Profile-Token header value that makes the next requests get profiled."
+
+    def handle(self, *args, **options):
+        max_age = getattr(settings, "PROFILER_TOKEN_MAX_AGE", 3600)
+        self.stdout.write(make_profile_token())
+        self.stderr.write(f"Valid for {max_age}s. Send it as: X-Profile-Token: <token>")
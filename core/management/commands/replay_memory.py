@@ -0,0 +1,106 @@
+# core/management/commands/replay_memory.py
+"""
+Replay a list of URLs under tracemalloc and rank endpoints by bytes allocated per returned item.
+
+The URL file has one path per line (blank lines and lines starting with '#' are
+skipped), e.g.:
+    /api/products/?page_size=100
+    /api/products-summary/?page_size=100
+    /api/offers/?page_size=100
+
+Every request goes through the full middleware stack with memory profiling
+forced on (see core.middleware.MemoryProfilerMiddleware); the command reports
+the request peak, the peak of each phase and peak bytes per returned item.
+"""
+import json
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client
+from django.test.utils import override_settings
+
+from core.middleware import make_profile_token
+from utils.benchmarking import summarize
+
+PHASES = ("filter", "query", "serialize", "render")
+
+
+def _item_count(response):
+    """Items in a JSON response: len(results) for paginated pages, len(list) for lists, else 1."""
+    try:
+        data = json.loads(response.content)
+    except (ValueError, AttributeError):
+        return 1
+    if isinstance(data, dict) and isinstance(data.get("results"), list):
+        return max(len(data["results"]), 1)
+    if isinstance(data, list):
+        return max(len(data), 1)
+    return 1
+
+
+class Command(BaseCommand):
+    help = "Replay URLs with tracemalloc and rank endpoints by peak bytes allocated per returned item."
+
+    def add_arguments(self, parser):
+        parser.add_argument("url_file", help="File with one URL path per line ('-' for stdin).")
+        parser.add_argument("--repeat", type=int, default=3, help="Requests per URL; the median is reported (default: 3).")
+        parser.add_argument("--top", type=int, default=5, help="Allocation sites to print for the worst endpoint (default: 5).")
+        parser.add_argument("--json", dest="json_output", help="Also write the full reports to this JSON file.")
+
+    def handle(self, *args, **options):
+        source = sys.stdin if options["url_file"] == "-" else open(options["url_file"], encoding="utf-8")
+        with source:
+            urls = [line.strip() for line in source if line.strip() and not line.lstrip().startswith("#")]
+        if not urls:
+            raise CommandError("No URLs to replay.")
+
+        token = make_profile_token()
+        rows = []
+        # reports are collected here, not stored as RequestProfile rows
+        with override_settings(MEMORY_PROFILER_STORE=False):
+            client = Client(SERVER_NAME="localhost")
+            for url in urls:
+                client.get(url)  # warm caches and imports so they do not count as request allocations
+                reports, items, status = [], 1, None
+                for _ in range(max(1, options["repeat"])):
+                    response = client.get(url, HTTP_X_MEMORY_PROFILE=token)
+                    report = getattr(response, "memory_report", None)
+                    if report is None:
+                        raise CommandError("MemoryProfilerMiddleware is not in MIDDLEWARE.")
+                    reports.append(report)
+                    items = _item_count(response)
+                    status = response.status_code
+                peak = summarize(r["peak_bytes"] for r in reports)["p50"]
+                phases = {
+                    name: summarize(r["phases"].get(name, {}).get("peak_bytes", 0) for r in reports)["p50"]
+                    for name in PHASES
+                }
+                rows.append({
+                    "url": url,
+                    "status": status,
+                    "items": items,
+                    "peak_bytes": peak,
+                    "bytes_per_item": peak / items,
+                    "phases": phases,
+                    "report": reports[-1],
+                })
+
+        rows.sort(key=lambda row: row["bytes_per_item"], reverse=True)
+        header = f"{'bytes/item':>11} {'peak KiB':>9} {'items':>6} " + " ".join(f"{p + ' KiB':>13}" for p in PHASES) + "  url"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for row in rows:
+            self.stdout.write(
+                f"{row['bytes_per_item']:>11.0f} {row['peak_bytes'] / 1024:>9.1f} {row['items']:>6} "
+                + " ".join(f"{row['phases'][p] / 1024:>13.1f}" for p in PHASES)
+                + f"  {row['url']} [{row['status']}]"
+            )
+
+        worst = rows[0]
+        self.stdout.write(f"\nTop allocation sites for {worst['url']}:")
+        for site in worst["report"].get("top_sites", [])[: options["top"]]:
+            self.stdout.write(f"  {site['bytes'] / 1024:>9.1f} KiB  {site['blocks']:>7} blocks  {site['site']}")
+
+        if options.get("json_output"):
+            with open(options["json_output"], "w", encoding="utf-8") as fh:
+                json.dump(rows, fh, indent=2)
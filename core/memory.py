@@ -0,0 +1,118 @@
+# core/memory.py
+"""
+tracemalloc-based allocation tracking for one request.
+
+`MemoryTracker` is a phase listener (see core.instrumentation): for every
+filter / query / serialize / render phase it records the bytes still held at
+the end of the phase, the peak reached during it and the top allocation sites
+(file:line) by size. A phase that runs more than once per request (e.g. per
+chunk) is reported once: retained bytes, seconds and the allocation sites are
+summed over its runs, the peak is the largest of any run. Sites are merged from
+the top N of each run, so a site just below the top N of some runs is
+under-counted. The request-wide peak covers everything between start() and
+stop().
+
+tracemalloc is process-wide: in a threaded worker, allocations of concurrent
+requests are included, so use it with sync workers or on a quiet instance.
+"""
+import tracemalloc
+
+from utils.sampling_profiler import short_path
+
+# allocations made by the measurement itself are not interesting sites
+_IGNORED_SITES = (tracemalloc.__file__, "<frozen importlib._bootstrap>", "<frozen importlib._bootstrap_external>", "<unknown>")
+
+
+def _snapshot():
+    # Snapshot.filter_traces matches every trace in pure Python and costs far more
+    # than the request itself, so sites are filtered after grouping instead.
+    return tracemalloc.take_snapshot()
+
+
+def _top_sites(snapshot, previous, limit):
+    sites = []
+    for stat in snapshot.compare_to(previous, "lineno"):
+        if len(sites) >= limit:
+            break
+        frame = stat.traceback[0]
+        if stat.size_diff <= 0 or frame.filename in _IGNORED_SITES:
+            continue
+        sites.append({
+            "site": f"{short_path(frame.filename)}:{frame.lineno}",
+            "bytes": stat.size_diff,
+            "blocks": stat.count_diff,
+        })
+    return sites
+
+
+def _merge_sites(sites, more, limit):
+    """Sum two site lists by site and keep the `limit` largest."""
+    merged = {site["site"]: dict(site) for site in sites}
+    for site in more:
+        total = merged.setdefault(site["site"], {"site": site["site"], "bytes": 0, "blocks": 0})
+        total["bytes"] += site["bytes"]
+        total["blocks"] += site["blocks"]
+    return sorted(merged.values(), key=lambda site: site["bytes"], reverse=True)[:limit]
+
+
+class MemoryTracker:
+    """Track allocations of one request, per phase and overall."""
+
+    def __init__(self, top_n=10, frames=1):
+        self.top_n = top_n
+        self.frames = frames
+        self.phases = {}
+        self.peak = 0
+        self._open = []
+        self._started_tracing = False
+
+    # ----- lifecycle -----
+    def start(self):
+        if not tracemalloc.is_tracing():
+            tracemalloc.start(self.frames)
+            self._started_tracing = True
+        tracemalloc.reset_peak()
+        self.baseline = tracemalloc.get_traced_memory()[0]
+        self._first_snapshot = _snapshot()
+
+    def stop(self):
+        self._checkpoint()
+        self.allocated = tracemalloc.get_traced_memory()[0] - self.baseline
+        self.top_sites = _top_sites(_snapshot(), self._first_snapshot, self.top_n)
+        if self._started_tracing:
+            tracemalloc.stop()
+
+    def _checkpoint(self):
+        """Fold the peak since the last checkpoint into every open phase, then reset it."""
+        current, peak = tracemalloc.get_traced_memory()
+        self.peak = max(self.peak, peak - self.baseline)
+        for entry in self._open:
+            entry["peak"] = max(entry["peak"], peak)
+        tracemalloc.reset_peak()
+        return current
+
+    # ----- phase listener -----
+    def phase_started(self, name):
+        # snapshot before the checkpoint so its own allocation is not counted in the phase
+        snapshot = _snapshot()
+        current = self._checkpoint()
+        self._open.append({"name": name, "start": current, "peak": current, "snapshot": snapshot})
+
+    def phase_finished(self, name, seconds):
+        current = self._checkpoint()
+        entry = self._open.pop()
+        stats = self.phases.setdefault(name, {"retained_bytes": 0, "peak_bytes": 0, "seconds": 0.0, "top_sites": []})
+        stats["retained_bytes"] += current - entry["start"]
+        stats["peak_bytes"] = max(stats["peak_bytes"], entry["peak"] - entry["start"])
+        stats["seconds"] += seconds
+        stats["top_sites"] = _merge_sites(
+            stats["top_sites"], _top_sites(_snapshot(), entry["snapshot"], self.top_n), self.top_n
+        )
+
+    def report(self):
+        return {
+            "peak_bytes": self.peak,
+            "retained_bytes": getattr(self, "allocated", 0),
+            "phases": self.phases,
+            "top_sites": getattr(self, "top_sites", []),
+        }
@@ -0,0 +1,112 @@
+# core/metrics.py
+"""
+Prometheus metrics for the API (exposed at /metrics by core.views.metrics_view).
+
+Works with several pre-forked gunicorn workers: when the environment variable
+PROMETHEUS_MULTIPROC_DIR points to a writable (and, at startup, empty)
+directory, prometheus_client stores every metric value in per-process
+memory-mapped files and the /metrics view aggregates them with
+MultiProcessCollector. See gunicorn.conf.py for the matching child_exit hook.
+
+prometheus_client is optional: without it all recording helpers are no-ops
+and /metrics answers 503.
+"""
+import os
+
+try:
+    import prometheus_client  # type: ignore
+    from prometheus_client import CollectorRegistry, Counter, Histogram, multiprocess
+except Exception:  # pragma: no cover - optional dependency
+    prometheus_client = None
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100, 250, 500)
+
+if prometheus_client is not None:
+    REQUEST_LATENCY = Histogram(
+        "http_request_duration_seconds",
+        "Request latency by view action (e.g. ProductViewSet.list).",
+        ["view", "method"],
+        buckets=LATENCY_BUCKETS,
+    )
+    RESPONSES = Counter(
+        "http_responses_total",
+        "Responses by view action and status code.",
+        ["view", "status"],
+    )
+    DB_QUERIES = Histogram(
+        "db_queries_per_request",
+        "Number of SQL statements executed per request.",
+        ["view"],
+        buckets=QUERY_COUNT_BUCKETS,
+    )
+    DB_TIME = Histogram(
+        "db_time_per_request_seconds",
+        "Total SQL time per request.",
+        ["view"],
+        buckets=LATENCY_BUCKETS,
+    )
+    PHASE_TIME = Histogram(
+        "request_phase_duration_seconds",
+        "Time per request phase (filter, query, serialize, render).",
+        ["view", "phase"],
+        buckets=LATENCY_BUCKETS,
+    )
+    CACHE_REQUESTS = Counter(
+        "cache_requests_total",
+        "Cache lookups by cache name and result (hit/miss); hit ratio = hit / (hit + miss).",
+        ["cache", "result"],
+    )
+
+
+def metrics_enabled():
+    return prometheus_client is not None
+
+
+def view_label(request):
+    """
+    Low-cardinality label for the resolved view:
+    - ViewSets: "<ViewSet>.<action>" (ProductViewSet.list, OfferViewSet.retrieve, ...)
+    - APIViews: "<View>.<method>"
+    - unresolved URLs: "unmatched"
+    """
+    match = getattr(request, "resolver_match", None)
+    if match is None:
+        return "unmatched"
+    func = match.func
+    cls = getattr(func, "cls", None) or getattr(func, "view_class", None)
+    method = request.method.lower()
+    if cls is None:
+        return f"{func.__module__}.{getattr(func, '__name__', 'view')}"
+    actions = getattr(func, "actions", None)
+    if actions:
+        return f"{cls.__name__}.{actions.get(method, method)}"
+    return f"{cls.__name__}.{method}"
+
+
+def observe_request(view, method, status, seconds, query_count, query_seconds, phases):
+    if prometheus_client is None:
+        return
+    REQUEST_LATENCY.labels(view, method).observe(seconds)
+    RESPONSES.labels(view, str(status)).inc()
+    DB_QUERIES.labels(view).observe(query_count)
+    DB_TIME.labels(view).observe(query_seconds)
+    for name, elapsed in phases.items():
+        PHASE_TIME.labels(view, name).observe(elapsed)
+
+
+def record_cache_lookup(cache_name, hit):
+    """Count one cache lookup; call from any code path that consults a cache."""
+    if prometheus_client is None:
+        return
+    CACHE_REQUESTS.labels(cache_name, "hit" if hit else "miss").inc()
+
+
+def render_latest():
+    """Return (body, content_type) for the current metrics, aggregated across workers."""
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = prometheus_client.REGISTRY
+    return prometheus_client.generate_latest(registry), prometheus_client.CONTENT_TYPE_LATEST
@@ -0,0 +1,449 @@
+# core/middleware.py
+import logging
+import math
+import random
+import time
+
+from asgiref.sync import async_to_sync, iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.core import signing
+
+from . import metrics
+from .db_router import replica_configured, replica_reads
+from .instrumentation import current_phases, track_request
+from .memory import MemoryTracker
+from utils.nplusone import NPlusOneDetector
+from utils.sampling_profiler import SamplingProfiler
+from utils.sql import QueryRecorder
+
+logger = logging.getLogger(__name__)
+
+
+class SelectiveMiddleware:
+    """
+    Base for middleware that only acts on some requests, usable in both the
+    WSGI and the ASGI stack.
+
+    Subclasses implement:
+    - wants(request): cheap decision that must not touch the database (under
+      ASGI it runs on the event loop); a truthy result is passed to handle()
+    - handle(request, wanted): synchronous work around self.call_next(request)
+
+    Under ASGI, unwanted requests are awaited straight through, so the async
+    catalog views (products.async_views) are not pushed into a thread. Wanted
+    requests run handle() in the request's sync thread - the same thread the
+    ORM calls of async views are sent to by sync_to_async(thread_sensitive=True)
+    - so execute_wrapper based recorders still see every query.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+
+    def wants(self, request):
+        return True
+
+    def handle(self, request, wanted):
+        raise NotImplementedError
+
+    def call_next(self, request):
+        if self.async_mode:
+            return async_to_sync(self.get_response)(request)
+        return self.get_response(request)
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        wanted = self.wants(request)
+        if not wanted:
+            return self.get_response(request)
+        return self.handle(request, wanted)
+
+    async def __acall__(self, request):
+        wanted = self.wants(request)
+        if not wanted:
+            return await self.get_response(request)
+        return await sync_to_async(self.handle)(request, wanted)
+
+
+class SQLInstrumentationMiddleware(SelectiveMiddleware):
+    """
+    Per-request SQL instrumentation based on `connection.execute_wrapper`.
+
+    For a sampled request (SQL_INSTRUMENTATION_SAMPLE_RATE) it records the
+    number of queries, total SQL time and duplicate statements (same normalized
+    fingerprint executed more than once) and:
+    - adds a `Server-Timing` header (`db` and `app` metrics) to the response
+    - logs a warning with the top SQL_SLOW_QUERY_TOP_N statements when the
+      request took longer than SQL_SLOW_REQUEST_MS
+
+    Requests that are not sampled pass through untouched, so the overhead under
+    load is proportional to the sample rate.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sample_rate = getattr(settings, "SQL_INSTRUMENTATION_SAMPLE_RATE", 0.05)
+        self.slow_request_ms = getattr(settings, "SQL_SLOW_REQUEST_MS", 500)
+        self.top_n = getattr(settings, "SQL_SLOW_QUERY_TOP_N", 5)
+
+    def wants(self, request):
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    def handle(self, request, wanted):
+        recorder = QueryRecorder()
+        request.sql_recorder = recorder
+        started = time.perf_counter()
+        with recorder.installed():
+            response = self.call_next(request)
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        sql_ms = recorder.total_time * 1000
+        duplicates = recorder.duplicates()
+
+        response["Server-Timing"] = ", ".join([
+            f'db;dur={sql_ms:.2f};desc="{recorder.count} queries, {len(duplicates)} duplicated"',
+            f"app;dur={elapsed_ms:.2f}",
+        ])
+
+        if elapsed_ms >= self.slow_request_ms:
+            lines = [
+                f"{s.count}x total={s.total_time * 1000:.2f}ms max={s.max_time * 1000:.2f}ms  {s.fingerprint[:300]}"
+                for s in recorder.slowest(self.top_n)
+            ]
+            logger.warning(
+                "Slow request %s %s: %.1fms, %d queries in %.1fms (%d duplicated fingerprints)\n  %s",
+                request.method, request.get_full_path(), elapsed_ms, recorder.count, sql_ms,
+                len(duplicates), "\n  ".join(lines),
+            )
+        return response
+
+
+class NPlusOneDetectionMiddleware(SelectiveMiddleware):
+    """
+    Development/test helper: groups every statement of a request by normalized
+    fingerprint and reports fingerprints repeated more than NPLUSONE_THRESHOLD
+    times, with the project call site and serializer field that triggered them.
+
+    - NPLUSONE_DETECTION: enable the middleware (default: DEBUG)
+    - NPLUSONE_RAISE: raise NPlusOneError instead of logging (use in tests)
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.enabled = getattr(settings, "NPLUSONE_DETECTION", settings.DEBUG)
+        self.raise_on_detect = getattr(settings, "NPLUSONE_RAISE", False)
+
+    def wants(self, request):
+        return self.enabled
+
+    def handle(self, request, wanted):
+        detector = NPlusOneDetector()
+        with detector.installed():
+            response = self.call_next(request)
+        if detector.offenders():
+            if self.raise_on_detect:
+                detector.check()
+            logger.warning("Possible N+1 queries in %s %s:\n%s", request.method, request.get_full_path(), detector.report())
+        return response
+
+
+class ReplicaRoutingMiddleware(SelectiveMiddleware):
+    """
+    Serve safe-method requests from the read replica (core.db_router).
+
+    Requests stay on the primary when:
+    - the method is not GET/HEAD/OPTIONS
+    - the path starts with one of DB_PRIMARY_PATHS (admin, auth, token, ...)
+    - the client wrote recently, so a seller reading back what they just
+      changed never sees replica lag. Every successful unsafe request pins the
+      client to the primary for DB_REPLICA_STICKY_SECONDS in two ways:
+      - the DB_REPLICA_STICKY_COOKIE cookie, for same-origin/session clients;
+      - the DB_REPLICA_STICKY_HEADER response header (unix time the pin ends),
+        for cross-origin clients with bearer tokens that never send cookies:
+        they echo the latest value back as a request header until it passes.
+        The value is only honoured up to DB_REPLICA_STICKY_SECONDS ahead, so a
+        client cannot pin itself to the primary for good.
+
+    Without a "replica" database this middleware does nothing.
+    """
+
+    SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.enabled = replica_configured()
+        self.primary_paths = tuple(getattr(settings, "DB_PRIMARY_PATHS", ("/admin/",)))
+        self.sticky_seconds = getattr(settings, "DB_REPLICA_STICKY_SECONDS", 10)
+        self.cookie_name = getattr(settings, "DB_REPLICA_STICKY_COOKIE", "db_primary")
+        self.header_name = getattr(settings, "DB_REPLICA_STICKY_HEADER", "X-DB-Primary-Until")
+
+    def use_replica(self, request):
+        return (
+            request.method in self.SAFE_METHODS
+            and not request.path.startswith(self.primary_paths)
+            and self.cookie_name not in request.COOKIES
+            and not self.pinned_by_header(request)
+        )
+
+    def pinned_by_header(self, request):
+        try:
+            until = float(request.headers.get(self.header_name, ""))
+        except ValueError:
+            return False
+        now = time.time()
+        # +1: the header is rounded up to whole seconds
+        return now < until <= now + self.sticky_seconds + 1
+
+    def wants(self, request):
+        return self.enabled
+
+    def handle(self, request, wanted):
+        with replica_reads(self.use_replica(request)):
+            response = self.call_next(request)
+        return self.stick_after_write(request, response)
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        # the context variable is copied into the threads running the ORM calls
+        with replica_reads(self.use_replica(request)):
+            response = await self.get_response(request)
+        return self.stick_after_write(request, response)
+
+    def stick_after_write(self, request, response):
+        if request.method not in self.SAFE_METHODS and response.status_code < 400 and self.sticky_seconds > 0:
+            response.set_cookie(
+                self.cookie_name, "1", max_age=self.sticky_seconds,
+                httponly=True, samesite="Lax", secure=request.is_secure(),
+            )
+            response[self.header_name] = str(math.ceil(time.time() + self.sticky_seconds))
+        return response
+
+
+PROFILE_TOKEN_SALT = "core.profiler"
+
+
+def make_profile_token():
+    """Signed token for the X-Profile-Token / X-Memory-Profile headers (see `manage.py profile_token`)."""
+    return signing.TimestampSigner(salt=PROFILE_TOKEN_SALT).sign("profile")
+
+
+def profiling_requested(request, header, query_flag, sample_rate):
+    """
+    Cheap pre-check without database access: "sampled" when the request falls in
+    the random `sample_rate` sample, "requested" when it carries `header` or
+    `?<query_flag>=1` (still to be verified by profiling_trigger), else None.
+    """
+    if sample_rate > 0 and random.random() < sample_rate:
+        return "sampled"
+    if request.headers.get(header) or request.GET.get(query_flag) == "1":
+        return "requested"
+    return None
+
+
+def profiling_trigger(request, header, query_flag, sampled=False):
+    """
+    Decide whether (and why) a request should be profiled:
+    - a valid signed token in `header` (expires after PROFILER_TOKEN_MAX_AGE)
+    - `?<query_flag>=1` from a staff session user
+    - the random sample (`sampled`, see profiling_requested)
+    Returns a RequestProfile.Trigger value or None.
+    """
+    from .models import RequestProfile
+
+    token = request.headers.get(header)
+    if token:
+        try:
+            signing.TimestampSigner(salt=PROFILE_TOKEN_SALT).unsign(
+                token, max_age=getattr(settings, "PROFILER_TOKEN_MAX_AGE", 3600)
+            )
+            return RequestProfile.Trigger.HEADER
+        except signing.BadSignature:
+            pass
+    if request.GET.get(query_flag) == "1":
+        user = getattr(request, "user", None)
+        if user is not None and user.is_authenticated and user.is_staff:
+            return RequestProfile.Trigger.QUERY
+    if sampled:
+        return RequestProfile.Trigger.SAMPLED
+    return None
+
+
+class RequestProfilerMiddleware(SelectiveMiddleware):
+    """
+    On-demand sampling profiler for individual requests.
+
+    A request is profiled when:
+    - it carries a valid `X-Profile-Token` header (signed, expires after
+      PROFILER_TOKEN_MAX_AGE seconds; generate with `manage.py profile_token`)
+    - or it has `?_profile=1` and the session user is staff
+    - or it falls in the random PROFILER_SAMPLE_RATE sample
+
+    The whole rest of the stack (view, filtering, serialization, rendering and
+    time inside the DB driver) is sampled every PROFILER_INTERVAL_MS and stored
+    as a core.RequestProfile in collapsed-stack format, retrievable from the
+    admin. The response carries the profile id in `X-Profile-Id`.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sample_rate = getattr(settings, "PROFILER_SAMPLE_RATE", 0.0)
+        self.interval = getattr(settings, "PROFILER_INTERVAL_MS", 1) / 1000.0
+
+    def wants(self, request):
+        return profiling_requested(request, "X-Profile-Token", "_profile", self.sample_rate)
+
+    def handle(self, request, wanted):
+        trigger = profiling_trigger(request, "X-Profile-Token", "_profile", sampled=wanted == "sampled")
+        if trigger is None:
+            return self.call_next(request)
+
+        from .models import RequestProfile
+
+        recorder = QueryRecorder(fingerprints=False)
+        profiler = SamplingProfiler(interval=self.interval)
+        started = time.perf_counter()
+        with recorder.installed(), profiler:
+            response = self.call_next(request)
+        duration_ms = (time.perf_counter() - started) * 1000
+
+        try:
+            profile = RequestProfile.objects.create(
+                kind=RequestProfile.Kind.CPU,
+                method=request.method,
+                path=request.get_full_path()[:2000],
+                status_code=response.status_code,
+                trigger=trigger,
+                duration_ms=duration_ms,
+                sql_count=recorder.count,
+                sql_ms=recorder.total_time * 1000,
+                samples=profiler.samples,
+                collapsed=profiler.collapsed(),
+            )
+        except Exception:
+            # profiling must never break the request it observes
+            logger.exception("Could not store request profile for %s", request.path)
+        else:
+            response["X-Profile-Id"] = str(profile.pk)
+        return response
+
+
+class PrometheusMetricsMiddleware(SelectiveMiddleware):
+    """
+    Record per-view latency, status, SQL count/time and phase timings
+    (core.instrumentation) into the Prometheus metrics of core.metrics.
+
+    Counting statements (without fingerprints) is cheap enough to run on every
+    request. Does nothing when prometheus_client is not installed.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.enabled = metrics.metrics_enabled()
+
+    def wants(self, request):
+        return self.enabled
+
+    def handle(self, request, wanted):
+        recorder = QueryRecorder(fingerprints=False)
+        started = time.perf_counter()
+        with recorder.installed(), track_request() as phases:
+            response = self.call_next(request)
+        self.observe(request, response, started, recorder, phases)
+        return response
+
+    async def __acall__(self, request):
+        if not self.enabled:
+            return await self.get_response(request)
+        recorder = QueryRecorder(fingerprints=False)
+        installed = recorder.installed()
+        started = time.perf_counter()
+        # install the execute wrapper in the request's sync thread, where the ORM
+        # calls of async views run; the view itself stays on the event loop
+        await sync_to_async(installed.__enter__)()
+        try:
+            with track_request() as phases:
+                response = await self.get_response(request)
+        finally:
+            await sync_to_async(installed.__exit__)(None, None, None)
+        self.observe(request, response, started, recorder, phases)
+        return response
+
+    def observe(self, request, response, started, recorder, phases):
+        metrics.observe_request(
+            view=metrics.view_label(request),
+            method=request.method,
+            status=response.status_code,
+            seconds=time.perf_counter() - started,
+            query_count=recorder.count,
+            query_seconds=recorder.total_time,
+            phases=phases.durations,
+        )
+
+
+class MemoryProfilerMiddleware(SelectiveMiddleware):
+    """
+    Per-request allocation tracking with tracemalloc (see core.memory).
+
+    Triggered like the CPU profiler: a signed `X-Memory-Profile` header (same
+    token as `manage.py profile_token`), `?_memprofile=1` for staff sessions, or
+    the MEMORY_PROFILER_SAMPLE_RATE sample. The report (request peak, per-phase
+    peak/retained bytes and top allocation sites for filter, query, serialize
+    and render) is stored as a core.RequestProfile of kind "memory" unless
+    MEMORY_PROFILER_STORE is False, attached to the response as
+    `response.memory_report`, and the peak is sent in `X-Memory-Peak`.
+    """
+
+    def __init__(self, get_response):
+        super().__init__(get_response)
+        self.sample_rate = getattr(settings, "MEMORY_PROFILER_SAMPLE_RATE", 0.0)
+        self.top_n = getattr(settings, "MEMORY_PROFILER_TOP_N", 10)
+        self.store = getattr(settings, "MEMORY_PROFILER_STORE", True)
+
+    def wants(self, request):
+        return profiling_requested(request, "X-Memory-Profile", "_memprofile", self.sample_rate)
+
+    def handle(self, request, wanted):
+        trigger = profiling_trigger(request, "X-Memory-Profile", "_memprofile", sampled=wanted == "sampled")
+        if trigger is None:
+            return self.call_next(request)
+
+        from .models import RequestProfile
+
+        tracker = MemoryTracker(top_n=self.top_n)
+        started = time.perf_counter()
+        tracker.start()
+        try:
+            if current_phases() is None:
+                with track_request() as phases:
+                    phases.listeners.append(tracker)
+                    response = self.call_next(request)
+            else:
+                current_phases().listeners.append(tracker)
+                response = self.call_next(request)
+        finally:
+            tracker.stop()
+        report = tracker.report()
+        response.memory_report = report
+        response["X-Memory-Peak"] = str(report["peak_bytes"])
+
+        if self.store:
+            try:
+                RequestProfile.objects.create(
+                    kind=RequestProfile.Kind.MEMORY,
+                    method=request.method,
+                    path=request.get_full_path()[:2000],
+                    status_code=response.status_code,
+                    trigger=trigger,
+                    duration_ms=(time.perf_counter() - started) * 1000,
+                    peak_bytes=report["peak_bytes"],
+                    report=report,
+                )
+            except Exception:
+                logger.exception("Could not store memory profile for %s", request.path)
+        return response
@@ -0,0 +1,36 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:30
+
+import django_extensions.db.fields
+import uuid
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RequestProfile',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, primary_key=True, serialize=False)),
+                ('created', django_extensions.db.fields.CreationDateTimeField(auto_now_add=True, verbose_name='created')),
+                ('modified', django_extensions.db.fields.ModificationDateTimeField(auto_now=True, verbose_name='modified')),
+                ('method', models.CharField(max_length=10)),
+                ('path', models.CharField(max_length=2000)),
+                ('status_code', models.PositiveSmallIntegerField(blank=True, null=True)),
+                ('trigger', models.CharField(choices=[('header', 'Signed header'), ('query', 'Staff query flag'), ('sampled', 'Random sample')], max_length=10)),
+                ('duration_ms', models.FloatField()),
+                ('sql_count', models.PositiveIntegerField(default=0)),
+                ('sql_ms', models.FloatField(default=0)),
+                ('samples', models.PositiveIntegerField(default=0)),
+                ('collapsed', models.TextField(blank=True)),
+            ],
+            options={
+                'verbose_name_plural': 'Request profiles',
+                'ordering': ('-created',),
+            },
+        ),
+    ]
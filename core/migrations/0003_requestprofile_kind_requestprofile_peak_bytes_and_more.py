@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:33
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0002_requestprofile'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='requestprofile',
+            name='kind',
+            field=models.CharField(choices=[('cpu', 'CPU samples'), ('memory', 'Memory allocations')], default='cpu', max_length=10),
+        ),
+        migrations.AddField(
+            model_name='requestprofile',
+            name='peak_bytes',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='requestprofile',
+            name='report',
+            field=models.JSONField(blank=True, default=dict),
+        ),
+    ]
@@ -21,3 +21,46 @@ class Contact(
 
 	def __str__(self):
 		return f'{self.title}'
+
+
+class RequestProfile(
+	TimeStampedModel,
+	Model
+	):
+	"""A sampled profile of one API request.
+
+	- kind=cpu (core.middleware.RequestProfilerMiddleware): `collapsed` holds the
+	  stacks in collapsed format (one "frame;frame;... count" line per stack)
+	  ready for flamegraph.pl or speedscope.
+	- kind=memory (core.middleware.MemoryProfilerMiddleware): `peak_bytes` and a
+	  per-phase allocation `report`.
+	"""
+
+	class Kind(models.TextChoices):
+		CPU = "cpu", "CPU samples"
+		MEMORY = "memory", "Memory allocations"
+
+	class Trigger(models.TextChoices):
+		HEADER = "header", "Signed header"
+		QUERY = "query", "Staff query flag"
+		SAMPLED = "sampled", "Random sample"
+
+	class Meta:
+		verbose_name_plural = "Request profiles"
+		ordering = ("-created",)
+
+	kind = models.CharField(max_length=10, choices=Kind.choices, default=Kind.CPU)
+	method = models.CharField(max_length=10)
+	path = models.CharField(max_length=2000)
+	status_code = models.PositiveSmallIntegerField(null=True, blank=True)
+	trigger = models.CharField(max_length=10, choices=Trigger.choices)
+	duration_ms = models.FloatField()
+	sql_count = models.PositiveIntegerField(default=0)
+	sql_ms = models.FloatField(default=0)
+	samples = models.PositiveIntegerField(default=0)
+	collapsed = models.TextField(blank=True)
+	peak_bytes = models.BigIntegerField(null=True, blank=True)
+	report = models.JSONField(default=dict, blank=True)
+
+	def __str__(self):
+		return f'{self.method} {self.path} ({self.duration_ms:.0f}ms)'
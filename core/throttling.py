@@ -0,0 +1,150 @@
+# core/throttling.py
+"""
+Cache-backed rate limiting for DRF views (no database writes).
+
+Limits are configured per endpoint scope in settings.RATE_LIMITS as a list of
+(key, rate) rules; a request is rejected when any rule is exceeded:
+
+    RATE_LIMITS = {
+        "token": [("ip", "20/min"), ("username", "10/min")],
+        "verification_resend": [("user", "5/day")],
+    }
+
+Keys:
+- "ip":       client address (REST_FRAMEWORK NUM_PROXIES aware)
+- "user":     authenticated user id (anonymous requests fall back to the ip)
+- "email", "username": that field of the request body, case-insensitive;
+  the rule is skipped when the field is missing. These read request.data, so
+  only use them on views that parse the body through DRF.
+
+Rates are "<count>/<period>" with the period in s, min, hour or day and an
+optional multiplier ("5/15min", "100/hour").
+
+Each rule is a sliding-window counter: the hits of the current fixed window
+plus the previous window's hits weighted by how much of it still overlaps the
+sliding window. Counting is a single atomic cache.incr() per rule, so the
+limit holds across workers when CACHES points to a shared backend (Redis);
+with the default local-memory cache it is per process. If the cache is down
+the request is let through.
+
+Views opt in with RateLimitMixin and a `throttle_scope`; rejected requests get
+429 {"detail": "rate_limited", "allowed": <limit>} with a Retry-After header.
+"""
+import hashlib
+import logging
+import math
+import re
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework import exceptions, status
+from rest_framework.throttling import BaseThrottle
+
+logger = logging.getLogger(__name__)
+
+PERIODS = {"s": 1, "m": 60, "h": 60 * 60, "d": 24 * 60 * 60}
+RATE_RE = re.compile(r"^\s*(\d+)\s*/\s*(\d*)\s*([smhd])[a-z]*\s*$")
+
+
+def parse_rate(rate):
+    """'5/15min' -> (5, 900)"""
+    match = RATE_RE.match(rate)
+    if match is None:
+        raise ValueError(f"Invalid rate {rate!r}; expected e.g. '10/min' or '5/15min'.")
+    count, multiplier, unit = match.groups()
+    return int(count), int(multiplier or 1) * PERIODS[unit]
+
+
+class RateLimited(exceptions.APIException):
+    status_code = status.HTTP_429_TOO_MANY_REQUESTS
+    default_code = "rate_limited"
+
+    def __init__(self, wait=None, allowed=None):
+        detail = {"detail": "rate_limited"}
+        if allowed is not None:
+            detail["allowed"] = allowed
+        super().__init__(detail)
+        self.detail = detail  # keep "allowed" a number (APIException coerces values to strings)
+        # DRF's exception handler turns this into the Retry-After header
+        self.wait = math.ceil(wait) if wait else None
+
+
+class RateLimitThrottle(BaseThrottle):
+    """Apply settings.RATE_LIMITS[view.throttle_scope]."""
+
+    def __init__(self):
+        self.cache = caches[getattr(settings, "RATE_LIMIT_CACHE", "default")]
+        self.wait_seconds = None
+
+    def get_rules(self, view):
+        scope = getattr(view, "throttle_scope", None)
+        if not scope:
+            return scope, ()
+        return scope, getattr(settings, "RATE_LIMITS", {}).get(scope, ())
+
+    def get_key(self, key, request):
+        if key == "ip":
+            return self.get_ident(request)
+        if key == "user":
+            user = getattr(request, "user", None)
+            if user is not None and user.is_authenticated:
+                return f"user:{user.pk}"
+            return self.get_ident(request)
+        value = request.data.get(key) if hasattr(request.data, "get") else None
+        if not value or not isinstance(value, str):
+            return None
+        return value.strip().lower()
+
+    def allow_request(self, request, view):
+        scope, rules = self.get_rules(view)
+        for key, rate in rules:
+            ident = self.get_key(key, request)
+            if ident is None:
+                continue
+            limit, period = parse_rate(rate)
+            digest = hashlib.sha1(ident.encode()).hexdigest()[:20]  # no raw emails in cache keys
+            try:
+                wait = self.hit(f"rl:{scope}:{key}:{digest}", limit, period)
+            except Exception:
+                logger.exception("Rate limit cache unavailable; allowing %s request", scope)
+                return True
+            if wait is not None:
+                self.wait_seconds = wait
+                # picked up by RateLimitMixin.throttled for the response body
+                request.rate_limit_allowed = limit
+                return False
+        return True
+
+    def hit(self, key, limit, period):
+        """Count one request; return None when allowed, else the seconds to wait."""
+        now = time.time()
+        window = int(now // period)
+        elapsed = (now % period) / period
+        current_key = f"{key}:{window}"
+        # add() is a no-op when the key exists; incr() is atomic in Redis/Memcached
+        self.cache.add(current_key, 0, timeout=period * 2)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:  # expired between add() and incr()
+            self.cache.set(current_key, 1, timeout=period * 2)
+            current = 1
+        previous = self.cache.get(f"{key}:{window - 1}", 0)
+        if previous * (1 - elapsed) + current <= limit:
+            return None
+        if current < limit and previous:
+            # the previous window's weight decays until the estimate fits under the limit
+            return max(1.0, ((1 - (limit - current) / previous) - elapsed) * period)
+        return max(1.0, (1 - elapsed) * period)
+
+    def wait(self):
+        return self.wait_seconds
+
+
+class RateLimitMixin:
+    """Throttle an APIView with RateLimitThrottle under `throttle_scope`."""
+    throttle_classes = [RateLimitThrottle]
+    throttle_scope = None
+
+    def throttled(self, request, wait):
+        raise RateLimited(wait=wait, allowed=getattr(request, "rate_limit_allowed", None))
@@ -1,18 +1,24 @@
 from json import JSONDecodeError
-from django.http import JsonResponse
+from django.conf import settings
+from django.http import HttpResponse, JsonResponse
+from django.utils.crypto import constant_time_compare
+from . import metrics
 from .serializers import ContactSerializer
 from rest_framework.parsers import JSONParser
 from rest_framework import views, status
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
+from .throttling import RateLimitMixin
 
 
 
-class ContactAPIView(views.APIView):
+class ContactAPIView(RateLimitMixin, views.APIView):
     """
     A simple APIView for creating contact entires.
     """
     permission_classes = [AllowAny]
+    # the body is parsed by hand in post(), so only ip based rules apply here
+    throttle_scope = "contact"
     serializer_class = ContactSerializer
 
     def get_serializer_context(self):
@@ -36,4 +42,21 @@ class ContactAPIView(views.APIView):
             else:
                 return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
         except JSONDecodeError:
-            return JsonResponse({"result": "error","message": "Json decoding error"}, status= 400)
\ No newline at end of file
+            return JsonResponse({"result": "error","message": "Json decoding error"}, status= 400)
+
+
+def metrics_view(request):
+    """
+    Prometheus text exposition of core.metrics (aggregated across workers).
+    When METRICS_TOKEN is set, scrapers must send `Authorization: Bearer <token>`.
+    """
+    token = getattr(settings, "METRICS_TOKEN", "")
+    if token:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not constant_time_compare(supplied, token):
+            return HttpResponse(status=403)
+    if not metrics.metrics_enabled():
+        return HttpResponse("prometheus_client is not installed\n", status=503, content_type="text/plain")
+    body, content_type = metrics.render_latest()
+    return HttpResponse(body, content_type=content_type)
+
@@ -0,0 +1,23 @@
+# gunicorn.conf.py
+# Picked up automatically by `gunicorn tg1.wsgi` when started from the project root.
+# The same file serves the ASGI stack (async catalog views under /api/async/):
+#   gunicorn tg1.asgi:application -k uvicorn.workers.UvicornWorker
+#
+# Prometheus multiprocess mode: every worker writes its metric values to
+# memory-mapped files in PROMETHEUS_MULTIPROC_DIR and /metrics aggregates them.
+# The directory must exist and be emptied before the master starts, e.g.
+#   rm -rf /tmp/prometheus && mkdir -p /tmp/prometheus
+#   PROMETHEUS_MULTIPROC_DIR=/tmp/prometheus gunicorn tg1.wsgi
+import multiprocessing
+import os
+
+bind = os.environ.get("GUNICORN_BIND", "0.0.0.0:8000")
+workers = int(os.environ.get("GUNICORN_WORKERS", multiprocessing.cpu_count() * 2 + 1))
+
+
+def child_exit(server, worker):
+    # drop the live gauges of a worker that exited; its counters/histograms stay aggregated
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        from prometheus_client import multiprocess
+
+        multiprocess.mark_process_dead(worker.pid)
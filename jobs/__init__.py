@@ -0,0 +1,3 @@
+from .registry import enqueue, task
+
+__all__ = ["enqueue", "task"]
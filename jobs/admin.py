@@ -0,0 +1,21 @@
+# jobs/admin.py
+from django.contrib import admin
+from django.utils import timezone
+
+from .models import Job
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ("id", "task", "queue", "status", "attempts", "max_attempts", "run_at", "locked_by", "finished_at")
+    list_filter = ("status", "queue", "task")
+    search_fields = ("task", "last_error")
+    readonly_fields = ("created_at", "finished_at", "locked_at", "locked_by", "last_error")
+    actions = ["retry_now"]
+
+    @admin.action(description="Retry selected jobs now")
+    def retry_now(self, request, queryset):
+        updated = queryset.exclude(status=Job.Status.RUNNING).update(
+            status=Job.Status.PENDING, run_at=timezone.now(), attempts=0, locked_at=None, locked_by="",
+        )
+        self.message_user(request, f"{updated} job(s) queued again.")
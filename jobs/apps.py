@@ -0,0 +1,12 @@
+# jobs/apps.py
+from django.apps import AppConfig
+from django.utils.module_loading import autodiscover_modules
+
+
+class JobsConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "jobs"
+
+    def ready(self):
+        # register the @task functions of every installed app (<app>/tasks.py)
+        autodiscover_modules("tasks")
@@ -0,0 +1,74 @@
+# jobs/management/commands/run_jobs.py
+"""
+Background job worker.
+
+    python manage.py run_jobs                      # all queues, poll forever
+    python manage.py run_jobs --queue email        # only the email queue
+    python manage.py run_jobs --burst              # run what is due, then exit (cron / tests)
+
+Run as many workers (processes or hosts) as needed; jobs are claimed with
+SELECT ... FOR UPDATE SKIP LOCKED (see jobs.worker).
+"""
+import os
+import signal
+import socket
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import close_old_connections
+
+from jobs.worker import claim, purge_finished, run_job
+
+
+class Command(BaseCommand):
+    help = "Run background jobs from the jobs queue table."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--queue", action="append", dest="queues", help="Only run jobs of this queue (repeatable).")
+        parser.add_argument("--batch", type=int, default=10, help="Jobs claimed per poll (default: 10).")
+        parser.add_argument("--burst", action="store_true", help="Exit when no job is due instead of polling.")
+        parser.add_argument(
+            "--sleep", type=float, default=None,
+            help="Seconds between polls when idle (default: JOBS_POLL_INTERVAL, 1.0).",
+        )
+        parser.add_argument(
+            "--purge-done-days", type=int, default=None,
+            help="Delete successful jobs older than this many days at startup (default: JOBS_KEEP_DONE_DAYS, 7).",
+        )
+
+    def handle(self, *args, **options):
+        worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        interval = options["sleep"] if options["sleep"] is not None else getattr(settings, "JOBS_POLL_INTERVAL", 1.0)
+        keep_days = options["purge_done_days"]
+        if keep_days is None:
+            keep_days = getattr(settings, "JOBS_KEEP_DONE_DAYS", 7)
+        if keep_days:
+            purged = purge_finished(keep_days)
+            if purged:
+                self.stdout.write(f"Purged {purged} finished jobs older than {keep_days} days.")
+
+        self._stopping = False
+        # finish the current job on SIGTERM/SIGINT instead of abandoning it as "running"
+        signal.signal(signal.SIGTERM, self._stop)
+        signal.signal(signal.SIGINT, self._stop)
+
+        done = failed = 0
+        self.stdout.write(f"Worker {worker_id} started (queues: {', '.join(options['queues'] or ['*'])}).")
+        while not self._stopping:
+            close_old_connections()
+            jobs = claim(worker_id, queues=options["queues"], limit=options["batch"])
+            if not jobs:
+                if options["burst"]:
+                    break
+                time.sleep(interval)
+                continue
+            for job in jobs:
+                if run_job(job):
+                    done += 1
+                else:
+                    failed += 1
+        self.stdout.write(f"Worker {worker_id} stopped: {done} done, {failed} failed.")
+
+    def _stop(self, signum, frame):
+        self._stopping = True
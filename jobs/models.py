@@ -0,0 +1,44 @@
+# jobs/models.py
+from django.db import models
+from django.db.models import Q
+from django.utils import timezone
+
+
+class Job(models.Model):
+    """
+    One unit of background work (transactional outbox row).
+
+    Rows are inserted inside the caller's transaction (see jobs.enqueue), so a
+    job becomes visible to workers only when that transaction commits and
+    disappears with it on rollback.
+    """
+
+    class Status(models.TextChoices):
+        PENDING = "pending", "Pending"
+        RUNNING = "running", "Running"
+        DONE = "done", "Done"
+        FAILED = "failed", "Failed"
+
+    queue = models.CharField(max_length=50, default="default")
+    task = models.CharField(max_length=200)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=5)
+    run_at = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    locked_by = models.CharField(max_length=100, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ["-id"]
+        indexes = [
+            # claim query: pending jobs of a queue that are due, oldest first
+            models.Index(fields=["queue", "run_at"], name="jobs_job_due_idx", condition=Q(status="pending")),
+            models.Index(fields=["status", "locked_at"], name="jobs_job_status_locked_idx"),
+        ]
+
+    def __str__(self):
+        return f"{self.task}#{self.pk} ({self.status})"
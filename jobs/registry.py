@@ -0,0 +1,68 @@
+# jobs/registry.py
+"""
+Task registry and enqueueing.
+
+Register a function as a task in `<app>/tasks.py` (discovered at startup):
+
+    from jobs import task
+
+    @task(queue="email", max_attempts=8)
+    def send_welcome_email(user_id):
+        ...
+
+and enqueue it from request code; the payload must be JSON-serializable:
+
+    send_welcome_email.enqueue(user_id=user.pk)
+    enqueue("accounts.send_welcome_email", {"user_id": user.pk}, delay=60)
+
+The job is inserted in the current transaction: it is picked up by
+`manage.py run_jobs` only after the transaction commits.
+"""
+from datetime import timedelta
+
+from django.utils import timezone
+
+TASKS = {}
+
+
+class UnknownTask(LookupError):
+    pass
+
+
+def task(name=None, queue="default", max_attempts=5):
+    """Register the decorated function; the default name is "<app label>.<function name>"."""
+
+    def decorator(func):
+        task_name = name or f"{func.__module__.split('.')[0]}.{func.__name__}"
+        TASKS[task_name] = func
+        func.task_name = task_name
+        func.enqueue = lambda delay=None, **payload: enqueue(
+            task_name, payload, queue=queue, delay=delay, max_attempts=max_attempts
+        )
+        return func
+
+    return decorator
+
+
+def get_task(name):
+    try:
+        return TASKS[name]
+    except KeyError:
+        raise UnknownTask(f"No task registered as {name!r}.") from None
+
+
+def enqueue(task_name, payload=None, queue="default", delay=None, max_attempts=5):
+    """Insert a pending job; `delay` (seconds or timedelta) postpones its first run."""
+    from .models import Job
+
+    get_task(task_name)  # fail at the call site, not in the worker
+    run_at = timezone.now()
+    if delay:
+        run_at += delay if isinstance(delay, timedelta) else timedelta(seconds=delay)
+    return Job.objects.create(
+        task=task_name,
+        payload=payload or {},
+        queue=queue,
+        run_at=run_at,
+        max_attempts=max_attempts,
+    )
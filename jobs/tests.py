@@ -0,0 +1,119 @@
+from datetime import timedelta
+
+from django.db import transaction
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from . import enqueue, task
+from .models import Job
+from .worker import claim, run_job
+
+CALLS = []
+
+
+@task(name="jobs.test_record")
+def record(value=None):
+    CALLS.append(value)
+
+
+@task(name="jobs.test_fail")
+def fail():
+    raise RuntimeError("boom")
+
+
+class ClaimTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_only_due_jobs_are_claimed(self):
+        due = enqueue("jobs.test_record")
+        enqueue("jobs.test_record", delay=60)
+        self.assertEqual([job.pk for job in claim("w1")], [due.pk])
+        due.refresh_from_db()
+        self.assertEqual((due.status, due.locked_by, due.attempts), (Job.Status.RUNNING, "w1", 1))
+        # already running: not handed out twice
+        self.assertEqual(claim("w2"), [])
+
+    def test_limit_and_queues(self):
+        first = enqueue("jobs.test_record", queue="email")
+        second = enqueue("jobs.test_record", queue="email")
+        other = enqueue("jobs.test_record", queue="stats")
+        self.assertEqual([job.pk for job in claim("w1", queues=["email"], limit=1)], [first.pk])
+        self.assertEqual([job.pk for job in claim("w1", queues=["email"])], [second.pk])
+        self.assertEqual([job.pk for job in claim("w1")], [other.pk])
+
+    def test_enqueue_is_rolled_back_with_the_transaction(self):
+        with self.assertRaises(RuntimeError):
+            with transaction.atomic():
+                enqueue("jobs.test_record")
+                raise RuntimeError("rollback")
+        self.assertFalse(Job.objects.exists())
+
+
+class RunJobTests(TestCase):
+    def setUp(self):
+        CALLS.clear()
+
+    def test_success(self):
+        enqueue("jobs.test_record", {"value": 1})
+        [job] = claim("w1")
+        self.assertTrue(run_job(job))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.DONE)
+        self.assertEqual(CALLS, [1])
+
+    def test_retry_with_backoff_then_failed(self):
+        job = enqueue("jobs.test_fail", max_attempts=2)
+        [claimed] = claim("w1")
+        started = timezone.now()
+        self.assertFalse(run_job(claimed))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.PENDING)
+        self.assertGreater(job.run_at, started)
+        self.assertIn("boom", job.last_error)
+
+        Job.objects.filter(pk=job.pk).update(run_at=timezone.now())
+        [claimed] = claim("w1")
+        self.assertEqual(claimed.attempts, 2)
+        self.assertFalse(run_job(claimed))
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertIsNotNone(job.finished_at)
+        self.assertEqual(claim("w1"), [])
+
+
+@override_settings(JOBS_LOCK_TIMEOUT=60)
+class StaleLockTests(TestCase):
+    def make_stale(self, job):
+        Job.objects.filter(pk=job.pk).update(locked_at=timezone.now() - timedelta(seconds=120))
+
+    def test_stale_job_is_claimed_again(self):
+        job = enqueue("jobs.test_record")
+        claim("w1")
+        self.make_stale(job)
+        [reclaimed] = claim("w2")
+        self.assertEqual((reclaimed.pk, reclaimed.locked_by, reclaimed.attempts), (job.pk, "w2", 2))
+
+    def test_stale_job_without_attempts_left_is_failed(self):
+        job = enqueue("jobs.test_record", max_attempts=1)
+        claim("w1")
+        self.make_stale(job)
+        self.assertEqual(claim("w2"), [])
+        job.refresh_from_db()
+        self.assertEqual(job.status, Job.Status.FAILED)
+        self.assertIn("Worker lost", job.last_error)
+
+    def test_late_finish_does_not_touch_the_new_claim(self):
+        job = enqueue("jobs.test_fail")
+        [first] = claim("w1")
+        self.make_stale(job)
+        [second] = claim("w2")
+        self.assertFalse(run_job(first))  # the first worker fails late: no retry scheduled over w2's run
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (Job.Status.RUNNING, "w2"))
+
+        Job.objects.filter(pk=job.pk).update(task="jobs.test_record", payload={})
+        first.task, first.payload = "jobs.test_record", {}
+        self.assertTrue(run_job(first))  # nor a late success
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.locked_by), (Job.Status.RUNNING, "w2"))
@@ -0,0 +1,103 @@
+# jobs/worker.py
+"""
+Claiming and running jobs (used by `manage.py run_jobs`).
+
+claim() locks due jobs with SELECT ... FOR UPDATE SKIP LOCKED, so any number
+of workers can poll the same table without handing out a job twice and
+without waiting on each other's locks. The row lock is only held for the
+claim: the job is marked "running" and the transaction commits before the
+task runs. A job still "running" after JOBS_LOCK_TIMEOUT seconds (its worker
+died) is claimed again, unless it has used all its attempts: then it is
+marked "failed" (a job that kills its worker must not crash workers forever).
+
+A failing job is retried with exponential backoff
+(JOBS_BACKOFF_BASE * 2 ** (attempts - 1), capped at JOBS_BACKOFF_MAX, plus
+jitter) until max_attempts, then left as "failed" with the last traceback.
+"""
+import logging
+import random
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+from .registry import get_task
+
+logger = logging.getLogger(__name__)
+
+
+def backoff_seconds(attempts):
+    base = getattr(settings, "JOBS_BACKOFF_BASE", 10)
+    cap = getattr(settings, "JOBS_BACKOFF_MAX", 3600)
+    delay = min(cap, base * 2 ** max(0, attempts - 1))
+    # jitter spreads retries of jobs that failed together (e.g. SMTP outage)
+    return delay * random.uniform(0.8, 1.2)
+
+
+def claim(worker_id, queues=None, limit=10):
+    """Lock, mark running and return up to `limit` due jobs."""
+    now = timezone.now()
+    stale = now - timedelta(seconds=getattr(settings, "JOBS_LOCK_TIMEOUT", 600))
+    lost = Q(status=Job.Status.RUNNING, locked_at__lt=stale)
+    due = Q(status=Job.Status.PENDING, run_at__lte=now) | (lost & Q(attempts__lt=F("max_attempts")))
+    with transaction.atomic():
+        exhausted = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(lost, attempts__gte=F("max_attempts"))
+            .values_list("id", flat=True)
+        )
+        if exhausted:
+            logger.error("Jobs %s lost their worker on their last attempt; marking them failed", exhausted)
+            Job.objects.filter(pk__in=exhausted).update(
+                status=Job.Status.FAILED, finished_at=now, locked_at=None, locked_by="",
+                last_error="Worker lost: still running after JOBS_LOCK_TIMEOUT on the last attempt.",
+            )
+        qs = Job.objects.select_for_update(skip_locked=True).filter(due)
+        if queues:
+            qs = qs.filter(queue__in=queues)
+        ids = list(qs.order_by("run_at", "id").values_list("id", flat=True)[:limit])
+        if not ids:
+            return []
+        Job.objects.filter(pk__in=ids).update(
+            status=Job.Status.RUNNING, locked_at=now, locked_by=worker_id, attempts=F("attempts") + 1,
+        )
+    return list(Job.objects.filter(pk__in=ids).order_by("run_at", "id"))
+
+
+def run_job(job):
+    """Run one claimed job and record the outcome; returns True on success."""
+    # only the current owner records the outcome: once JOBS_LOCK_TIMEOUT has passed another
+    # worker may have claimed the job again, and its run must not be finished or reset by this one
+    owned = Job.objects.filter(pk=job.pk, status=Job.Status.RUNNING, locked_by=job.locked_by, locked_at=job.locked_at)
+    try:
+        get_task(job.task)(**job.payload)
+    except Exception:
+        error = traceback.format_exc()
+        if job.attempts >= job.max_attempts:
+            logger.error("Job %s (%s) failed permanently after %d attempts:\n%s", job.pk, job.task, job.attempts, error)
+            updated = owned.update(
+                status=Job.Status.FAILED, last_error=error, finished_at=timezone.now(), locked_at=None, locked_by="",
+            )
+        else:
+            retry_at = timezone.now() + timedelta(seconds=backoff_seconds(job.attempts))
+            logger.warning("Job %s (%s) attempt %d failed, retrying at %s", job.pk, job.task, job.attempts, retry_at)
+            updated = owned.update(
+                status=Job.Status.PENDING, last_error=error, run_at=retry_at, locked_at=None, locked_by="",
+            )
+        if not updated:
+            logger.warning("Job %s (%s) was claimed again while running; failure not recorded", job.pk, job.task)
+        return False
+    if not owned.update(status=Job.Status.DONE, finished_at=timezone.now(), locked_at=None):
+        logger.warning("Job %s (%s) was claimed again while running; result not recorded", job.pk, job.task)
+    return True
+
+
+def purge_finished(days):
+    """Delete jobs that finished successfully more than `days` days ago."""
+    cutoff = timezone.now() - timedelta(days=days)
+    deleted, _ = Job.objects.filter(status=Job.Status.DONE, finished_at__lt=cutoff).delete()
+    return deleted
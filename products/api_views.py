@@ -4,9 +4,11 @@ from django_filters.rest_framework import DjangoFilterBackend
 from .models import Product
 from .serializers import ProductSummarySerializer  # فقط برای الهام، اینجا خلاصه می‌سازیم
 from .filters import ProductFilter
+from . import popularity
+from core.instrumentation import InstrumentedViewMixin
 
-class ProductSummaryViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = Product.objects.all().prefetch_related("offers", "images")
+class ProductSummaryViewSet(InstrumentedViewMixin, viewsets.ReadOnlyModelViewSet):
+    queryset = Product.objects.all().prefetch_related("images")
     serializer_class = ProductSummarySerializer  # ✅ این مهمه
 
     # enable filtering via django-filter and DRF SearchFilter
@@ -16,11 +18,13 @@ class ProductSummaryViewSet(viewsets.ReadOnlyModelViewSet):
     search_fields = ["name", "short_description", "description", "slug", "category__name"]
 
     # allow ordering by these fields
-    ordering_fields = ["id", "name", "min_price"]
+    ordering_fields = ["id", "name", "min_price", *popularity.ORDERING_FIELDS]
     ordering = ["id"]
 
     def get_queryset(self):
-        return Product.objects.annotate(
+        # only images are rendered (thumbnail); offers are aggregated in SQL
+        queryset = Product.objects.annotate(
             min_price=Min("offers__pricing_tiers__unit_price")
-        ).prefetch_related("offers", "images")
+        ).prefetch_related("images")
+        return popularity.annotate_for_ordering(queryset, self.request)
 
@@ -4,3 +4,13 @@ from django.apps import AppConfig
 class ProductsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'products'
+
+    def ready(self):
+        # reference data cache invalidation signals
+        import products.refdata  # noqa
+        # change log (delta sync) signals
+        import products.changes  # noqa
+        # seller dashboard rollups refreshed from the change log
+        import products.stats  # noqa
+        # similar-products index partitions rebuilt from the change log
+        import products.similarity  # noqa
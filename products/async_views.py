@@ -0,0 +1,290 @@
+# products/async_views.py
+"""
+Async (ASGI) read path for the hot catalog endpoints, mounted under /api/async/:
+
+    GET /api/async/products/            same payload as /api/products/
+    GET /api/async/products/<pk>/       same payload as /api/products/<pk>/
+    GET /api/async/products-summary/    same payload as /api/products-summary/
+    GET /api/async/offers/              same payload as /api/offers/
+
+The querysets, filter backends (django-filter, search, ordering), serializers
+and query parameters are the ones of the DRF viewsets; only the I/O is async:
+count with acount(), the page with aiterator(chunk_size=...) (prefetches run
+per chunk), the detail row with afirst(). While a request waits for
+PostgreSQL the worker's event loop serves other requests instead of holding a
+thread, which matters with slow clients and bursts.
+
+Serialization and JSON rendering run on the event loop: everything a
+serializer renders is prefetched, so a lazy query there (an N+1) fails loudly
+with SynchronousOnlyOperation instead of blocking the loop.
+
+GET /api/live/offers/?products=<id>,... streams offer and pricing tier changes
+of those products as Server-Sent Events (LiveOffersView, see products/live.py).
+
+Run under ASGI to benefit, e.g.
+    gunicorn tg1.asgi:application -k uvicorn.workers.UvicornWorker
+Compare with the WSGI path using `manage.py compare_async_load`.
+"""
+import asyncio
+import json
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse, StreamingHttpResponse
+from django.views import View
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.request import Request
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+from core.instrumentation import phase
+from . import live, popularity
+from .api_views import ProductSummaryViewSet
+from .serializers import OfferReadSerializer, ProductDetailSerializer, ProductListSerializer, ProductSummarySerializer
+from .views import OfferViewSet, ProductViewSet
+
+
+def json_response(data, status=200):
+    with phase("render"):
+        return HttpResponse(JSONRenderer().render(data), status=status, content_type="application/json")
+
+
+# ---------------- Pagination ----------------
+class AsyncPageNumberPagination:
+    """
+    Async counterpart of the viewset's DRF PageNumberPagination: same query
+    parameters and page sizes (taken from `drf_paginator`) and the same
+    {count, next, previous, results} payload.
+    """
+
+    def __init__(self, drf_paginator):
+        self.page_size = drf_paginator.page_size
+        self.page_query_param = drf_paginator.page_query_param
+        self.page_size_query_param = drf_paginator.page_size_query_param
+        self.max_page_size = drf_paginator.max_page_size
+
+    def get_page_size(self, request):
+        if self.page_size_query_param:
+            try:
+                size = int(request.GET[self.page_size_query_param])
+            except (KeyError, ValueError):
+                return self.page_size
+            if size > 0:
+                return min(size, self.max_page_size) if self.max_page_size else size
+        return self.page_size
+
+    async def paginate_queryset(self, queryset, request):
+        """Return (objects, count, page_number, page_size); raise Http404 for pages out of range."""
+        page_size = self.get_page_size(request)
+        raw_page = request.GET.get(self.page_query_param, 1)
+        try:
+            page_number = int(raw_page)
+        except ValueError:
+            if raw_page != "last":
+                raise Http404("Invalid page.")
+            page_number = None
+
+        count = await queryset.acount()
+        last_page = max(1, -(-count // page_size))
+        if page_number is None:
+            page_number = last_page
+        if page_number < 1 or page_number > last_page:
+            raise Http404("Invalid page.")
+
+        if not queryset.ordered:
+            queryset = queryset.order_by("pk")
+        offset = (page_number - 1) * page_size
+        page = queryset[offset:offset + page_size]
+        objects = [obj async for obj in page.aiterator(chunk_size=page_size)]
+        return objects, count, page_number, page_size
+
+    def get_paginated_data(self, request, results, count, page_number, page_size):
+        url = request.build_absolute_uri()
+        has_next = page_number * page_size < count
+        if page_number <= 1:
+            previous = None
+        elif page_number == 2:
+            previous = remove_query_param(url, self.page_query_param)
+        else:
+            previous = replace_query_param(url, self.page_query_param, page_number - 1)
+        return {
+            "count": count,
+            "next": replace_query_param(url, self.page_query_param, page_number + 1) if has_next else None,
+            "previous": previous,
+            "results": results,
+        }
+
+
+# ---------------- Base views ----------------
+class AsyncCatalogView(View):
+    """
+    Read-only async view reusing the configuration of a DRF viewset
+    (`viewset_class`): queryset, filter backends, filterset_class,
+    search_fields, ordering_fields and ordering. Reads are public like the
+    list/retrieve actions of the viewsets, so no authentication runs.
+    """
+    http_method_names = ["get", "head", "options"]
+    viewset_class = None
+    serializer_class = None
+    action = "list"
+
+    def get_viewset(self, request):
+        viewset = self.viewset_class(request=request, format_kwarg=None, kwargs=self.kwargs, action=self.action)
+        viewset.args = self.args
+        return viewset
+
+    def get_queryset(self, viewset):
+        return viewset.get_queryset()
+
+    async def filter_queryset(self, viewset, queryset):
+        # filter backends mostly only build the query (timed as the "filter" phase by
+        # InstrumentedViewMixin), but some read the database (category_name loads the
+        # reference data cache after an invalidation); keep them off the event loop
+        return await sync_to_async(viewset.filter_queryset)(queryset)
+
+    async def prepare_for_serialization(self, viewset, instance):
+        # reference data and the identity map may query; keep that off the event loop
+        prepare = getattr(viewset, "prepare_for_serialization", None)
+        if prepare is not None:
+            await sync_to_async(prepare)(instance)
+
+    def serialize(self, instance, request, many=False):
+        with phase("serialize"):
+            return self.serializer_class(instance, many=many, context={"request": request, "view": self}).data
+
+
+class AsyncListView(AsyncCatalogView):
+    pagination_class = AsyncPageNumberPagination
+
+    async def get(self, request, *args, **kwargs):
+        drf_request = Request(request)
+        viewset = self.get_viewset(drf_request)
+        try:
+            queryset = await self.filter_queryset(viewset, self.get_queryset(viewset))
+        except ValidationError as exc:
+            return json_response(exc.detail, status=400)
+
+        paginator = self.pagination_class(viewset.paginator)
+        try:
+            with phase("query"):
+                objects, count, page_number, page_size = await paginator.paginate_queryset(queryset, request)
+        except Http404 as exc:
+            return json_response({"detail": str(exc)}, status=404)
+
+        await self.prepare_for_serialization(viewset, objects)
+        results = self.serialize(objects, request, many=True)
+        return json_response(paginator.get_paginated_data(request, results, count, page_number, page_size))
+
+
+class AsyncDetailView(AsyncCatalogView):
+    action = "retrieve"
+
+    async def get(self, request, pk, *args, **kwargs):
+        viewset = self.get_viewset(Request(request))
+        with phase("query"):
+            instance = await self.get_queryset(viewset).filter(pk=pk).afirst()
+        if instance is None:
+            return json_response({"detail": "No Product matches the given query."}, status=404)
+        await self.prepare_for_serialization(viewset, instance)
+        return json_response(self.serialize(instance, request))
+
+
+# ---------------- Catalog endpoints ----------------
+class AsyncProductListView(AsyncListView):
+    viewset_class = ProductViewSet
+    serializer_class = ProductListSerializer
+
+
+class AsyncProductDetailView(AsyncDetailView):
+    viewset_class = ProductViewSet
+    serializer_class = ProductDetailSerializer
+
+    async def get(self, request, pk, *args, **kwargs):
+        response = await super().get(request, pk, *args, **kwargs)
+        if response.status_code == 200:
+            popularity.record_view(pk)
+        return response
+
+
+class AsyncProductSummaryListView(AsyncListView):
+    viewset_class = ProductSummaryViewSet
+    serializer_class = ProductSummarySerializer
+
+
+class AsyncOfferListView(AsyncListView):
+    viewset_class = OfferViewSet
+    serializer_class = OfferReadSerializer
+
+
+# ---------------- Live updates (SSE) ----------------
+def sse_event(event, data, event_id=None):
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines += [f"event: {event}", "data: " + json.dumps(data, cls=DjangoJSONEncoder, separators=(",", ":"))]
+    return "\n".join(lines) + "\n\n"
+
+
+class LiveOffersView(View):
+    """
+    GET /api/live/offers/?products=<id>,<id>
+    Server-Sent Events with the offer / pricing_tier / delivery_location
+    changes of the given products ("change" events, data as in
+    /api/changes/, id = change log seq). Reconnects with Last-Event-ID get the
+    missed changes; a "reset" event means: reload the offers.
+    Public like /api/products/<id>/offers/. ASGI only: under WSGI every open
+    stream would hold a worker thread.
+    """
+    http_method_names = ["get"]
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            product_ids = {int(value) for value in request.GET.get("products", "").split(",") if value.strip()}
+        except ValueError:
+            return json_response({"detail": "products must be a comma separated list of ids."}, status=400)
+        max_products = getattr(settings, "LIVE_MAX_PRODUCTS", 50)
+        if not product_ids or len(product_ids) > max_products:
+            return json_response({"detail": f"Give between 1 and {max_products} product ids."}, status=400)
+        try:
+            last_seq = int(request.headers.get("Last-Event-ID") or request.GET.get("last_event_id") or -1)
+        except ValueError:
+            last_seq = -1
+
+        response = StreamingHttpResponse(self.stream(product_ids, last_seq), content_type="text/event-stream")
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"  # nginx: do not buffer the stream
+        return response
+
+    async def stream(self, product_ids, last_seq):
+        # subscribe before replaying, so nothing committed in between is missed; live events
+        # already sent by the replay are skipped. Live events are not filtered by seq otherwise:
+        # transactions commit out of seq order, a lower seq can legitimately arrive later.
+        subscription = live.hub.subscribe(product_ids, asyncio.get_running_loop())
+        replayed = set()
+        try:
+            yield f"retry: {getattr(settings, 'LIVE_RETRY_MS', 3000)}\n\n"
+            if last_seq >= 0:
+                events = await sync_to_async(live.replay)(product_ids, last_seq)
+                if events is None:
+                    yield sse_event("reset", {})
+                else:
+                    for event in events:
+                        replayed.add(event["seq"])
+                        yield sse_event("change", event, event["seq"])
+            heartbeat = getattr(settings, "LIVE_HEARTBEAT", 15)
+            while True:
+                try:
+                    event = await asyncio.wait_for(subscription.queue.get(), heartbeat)
+                except asyncio.TimeoutError:
+                    yield ": keepalive\n\n"  # keeps proxies from closing an idle stream
+                    continue
+                if event is live.RESET:
+                    yield sse_event("reset", {})
+                    if subscription.overflowed:
+                        return  # the client reconnects with a fresh queue
+                    continue
+                if event["seq"] in replayed:
+                    replayed.discard(event["seq"])
+                    continue
+                yield sse_event("change", event, event["seq"])
+        finally:
+            live.hub.unsubscribe(subscription)
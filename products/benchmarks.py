@@ -0,0 +1,103 @@
+# products/benchmarks.py
+"""
+Benchmark scenarios for the hot catalog endpoints (used by `manage.py bench_endpoints`).
+
+Each scenario is one request with a typical filter combination. URL placeholders
+({product_id}, {category_id}, {seller_id}) are resolved against the seeded dataset
+before the run, so the same scenario list works for the 30-row demo data and for
+`seed_products --scale` datasets.
+
+`max_queries` is a hard query-count budget: exceeding it fails the run even when
+no baseline exists yet. List endpoints prefetch everything their serializers
+render, so their budget does not grow with the page size (an N+1 breaks it).
+"""
+from dataclasses import dataclass, field
+from typing import Optional
+
+from django.db.models import Count
+
+from .models import Offer, Product, ProductCategory, Seller
+
+
+BENCH_USERNAME = "bench_user"
+BENCH_PASSWORD = "bench-pass-123"
+
+
+@dataclass(frozen=True)
+class Scenario:
+    name: str
+    path: str
+    method: str = "get"
+    data: dict = field(default_factory=dict)
+    max_queries: Optional[int] = None
+
+
+SCENARIOS = [
+    # ---------------- /api/products/ ----------------
+    Scenario("products-list", "/api/products/", max_queries=9),
+    Scenario("products-list-grade-thickness", "/api/products/?steel_grade=ST37&min_thickness=10&max_thickness=30", max_queries=9),
+    Scenario("products-list-category", "/api/products/?category={category_id}&is_active=true", max_queries=9),
+    Scenario("products-list-search", "/api/products/?search=sheet", max_queries=9),
+    Scenario("products-list-min-price", "/api/products/?ordering=min_price", max_queries=9),
+    Scenario("products-list-page-100", "/api/products/?page_size=100", max_queries=9),
+    # ---------------- /api/products-summary/ ----------------
+    Scenario("products-summary", "/api/products-summary/", max_queries=3),
+    Scenario("products-summary-grade-price", "/api/products-summary/?steel_grade=A36&ordering=-min_price", max_queries=3),
+    Scenario("products-summary-search", "/api/products-summary/?search=pipe", max_queries=3),
+    # ---------------- /api/offers/ ----------------
+    Scenario("offers-list", "/api/offers/", max_queries=4),
+    Scenario("offers-list-seller", "/api/offers/?seller={seller_id}&is_active=true", max_queries=4),
+    Scenario("offers-list-price-range", "/api/offers/?min_price=500&max_price=700", max_queries=4),
+    # ---------------- /api/categories/ ----------------
+    Scenario("categories-list", "/api/categories/", max_queries=2),
+    # ---------------- product detail ----------------
+    Scenario("product-detail", "/api/products/{product_id}/", max_queries=8),
+    Scenario("product-offers", "/api/products/{product_id}/offers/", max_queries=4),
+    # ---------------- /api/token/ ----------------
+    Scenario(
+        "token-obtain",
+        "/api/token/",
+        method="post",
+        data={"username": BENCH_USERNAME, "password": BENCH_PASSWORD},
+        max_queries=3,
+    ),
+]
+
+
+def resolve_placeholders():
+    """
+    Pick representative ids from the current dataset:
+    - product_id: the product with the most offers (the hottest detail page)
+    - category_id: the category with the most products
+    - seller_id: the seller with the most offers
+    Missing rows resolve to 0 so the scenario still runs (and returns 404/empty).
+    """
+    product = Product.objects.annotate(n=Count("offers")).order_by("-n", "id").values_list("id", flat=True).first()
+    category = ProductCategory.objects.annotate(n=Count("products")).order_by("-n", "id").values_list("id", flat=True).first()
+    seller = Offer.objects.values("seller").annotate(n=Count("id")).order_by("-n", "seller").values_list("seller", flat=True).first()
+    if seller is None:
+        seller = Seller.objects.values_list("id", flat=True).first()
+    return {
+        "product_id": product or 0,
+        "category_id": category or 0,
+        "seller_id": seller or 0,
+    }
+
+
+# scenarios that have an async counterpart under /api/async/ (products/async_views.py),
+# compared against the WSGI path by `manage.py compare_async_load`
+ASYNC_SCENARIOS = [
+    "products-list",
+    "products-list-grade-thickness",
+    "products-list-page-100",
+    "products-summary",
+    "products-summary-search",
+    "offers-list",
+    "offers-list-seller",
+    "product-detail",
+]
+
+
+def async_path(path):
+    """/api/products/?x=1 -> /api/async/products/?x=1"""
+    return path.replace("/api/", "/api/async/", 1)
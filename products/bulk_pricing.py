@@ -0,0 +1,341 @@
+# products/bulk_pricing.py
+"""
+Bulk repricing of PricingTier rows from CSV or NDJSON.
+
+Used by POST /api/offers/bulk-prices/ (seller-scoped) and
+`manage.py import_prices` (any seller). One input row per tier:
+
+    offer, tier_name, unit_price[, minimum_quantity, maximum_quantity, is_negotiable]
+    product[, seller], tier_name, unit_price[, ...]
+
+CSV has a header line with these column names; NDJSON has one JSON object
+per line. `offer_id`, `product_id`, `seller_id` and `tier` are accepted as
+aliases. Rows addressed by product get the seller's offer for that product,
+created when it does not exist yet (upsert on the unique product/seller
+constraint).
+
+A tier is matched by (offer, tier_name):
+- with minimum_quantity the tier is upserted (INSERT ... ON CONFLICT DO UPDATE
+  of price, band and is_negotiable);
+- without it only the price of an existing tier changes (bulk_update).
+
+The input is parsed as a stream and applied in batches of
+BULK_PRICES_BATCH_SIZE rows, each batch in its own transaction with one
+ownership query for all its offers. Invalid rows (bad values, unknown or
+foreign offers/products, unknown tiers) are skipped and reported with their
+line number; the other rows are applied. Quantity bands are checked per row
+only (minimum <= maximum), not against the offer's other tiers.
+
+Written tiers and created offers are appended to the change log
+(products.changes), since bulk statements do not send model signals.
+"""
+import csv
+import json
+from dataclasses import dataclass
+from decimal import Decimal, InvalidOperation
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from . import changes
+from .models import Offer, PricingTier, Product, Seller
+
+ALIASES = {"offer_id": "offer", "product_id": "product", "seller_id": "seller", "tier": "tier_name"}
+MAX_REPORTED_ERRORS = 100
+CSV_CONTENT_TYPES = ("text/csv", "application/csv")
+NDJSON_CONTENT_TYPES = ("application/x-ndjson", "application/ndjson", "application/jsonl")
+
+
+class RowError(ValueError):
+    pass
+
+
+@dataclass
+class PriceRow:
+    line: int
+    tier_name: str
+    unit_price: Decimal
+    offer_id: Optional[int] = None
+    product_id: Optional[int] = None
+    seller_id: Optional[int] = None
+    minimum_quantity: Optional[int] = None
+    maximum_quantity: Optional[int] = None
+    is_negotiable: Optional[bool] = None
+
+
+# ---------------- parsing ----------------
+def _decoded(lines):
+    for line in lines:
+        yield line.decode("utf-8-sig") if isinstance(line, bytes) else line
+
+
+def parse_csv(lines):
+    """Yield (line_number, dict) from CSV lines (bytes or str); the first line is the header."""
+    reader = csv.DictReader(_decoded(lines))
+    for record in reader:
+        yield reader.line_num, record
+
+
+def parse_ndjson(lines):
+    for number, line in enumerate(_decoded(lines), start=1):
+        line = line.strip()
+        if not line:
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            yield number, RowError("invalid JSON")
+            continue
+        yield number, record if isinstance(record, dict) else RowError("expected a JSON object")
+
+
+def parser_for(fmt):
+    if fmt == "csv":
+        return parse_csv
+    if fmt == "ndjson":
+        return parse_ndjson
+    raise ValueError(f"Unknown format {fmt!r}; expected csv or ndjson.")
+
+
+def format_for_content_type(content_type):
+    content_type = (content_type or "").split(";")[0].strip().lower()
+    if content_type in CSV_CONTENT_TYPES:
+        return "csv"
+    if content_type in NDJSON_CONTENT_TYPES:
+        return "ndjson"
+    return None
+
+
+def _int(value, name):
+    if value is None or value == "":
+        return None
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise RowError(f"{name} must be an integer")
+    if number < 0:
+        raise RowError(f"{name} must not be negative")
+    return number
+
+
+def _bool(value):
+    if value is None or value == "":
+        return None
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in ("1", "true", "yes", "y")
+
+
+def to_price_row(line, record):
+    """Validate one parsed record into a PriceRow (raises RowError)."""
+    if isinstance(record, RowError):
+        raise record
+    record = {ALIASES.get(key, key): value for key, value in record.items() if key is not None}
+    tier_name = str(record.get("tier_name") or "").strip()
+    if not tier_name:
+        raise RowError("tier_name is required")
+    if len(tier_name) > PricingTier._meta.get_field("tier_name").max_length:
+        raise RowError("tier_name is too long")
+    try:
+        unit_price = Decimal(str(record.get("unit_price", "")).strip())
+    except InvalidOperation:
+        raise RowError("unit_price must be a decimal number")
+    if not unit_price.is_finite() or unit_price < 0 or unit_price.as_tuple().exponent < -2 or unit_price >= 10 ** 10:
+        raise RowError("unit_price must be a non-negative amount with at most 2 decimals")
+    row = PriceRow(
+        line=line,
+        tier_name=tier_name,
+        unit_price=unit_price,
+        offer_id=_int(record.get("offer"), "offer"),
+        product_id=_int(record.get("product"), "product"),
+        seller_id=_int(record.get("seller"), "seller"),
+        minimum_quantity=_int(record.get("minimum_quantity"), "minimum_quantity"),
+        maximum_quantity=_int(record.get("maximum_quantity"), "maximum_quantity"),
+        is_negotiable=_bool(record.get("is_negotiable")),
+    )
+    if row.offer_id is None and row.product_id is None:
+        raise RowError("offer or product is required")
+    if row.maximum_quantity is not None:
+        if row.minimum_quantity is None:
+            raise RowError("maximum_quantity needs minimum_quantity")
+        if row.maximum_quantity < row.minimum_quantity:
+            raise RowError("maximum_quantity must be greater than or equal to minimum_quantity")
+    return row
+
+
+# ---------------- applying ----------------
+class BulkRepricer:
+    """
+    Apply price rows for `seller_id` (rows may not name another seller), or for
+    any seller when seller_id is None (rows by product must then name the seller).
+    """
+
+    def __init__(self, seller_id=None, batch_size=None):
+        self.seller_id = seller_id
+        self.batch_size = batch_size or getattr(settings, "BULK_PRICES_BATCH_SIZE", 1000)
+        self.report = {"rows": 0, "upserted": 0, "updated": 0, "offers_created": 0, "errors": 0, "error_rows": []}
+
+    def run(self, records):
+        """Consume (line, record) pairs from parse_csv/parse_ndjson; return the report."""
+        batch = []
+        for line, record in records:
+            self.report["rows"] += 1
+            try:
+                batch.append(to_price_row(line, record))
+            except RowError as exc:
+                self.error(line, str(exc))
+                continue
+            if len(batch) >= self.batch_size:
+                self.apply(batch)
+                batch = []
+        if batch:
+            self.apply(batch)
+        return self.report
+
+    def error(self, line, message):
+        self.report["errors"] += 1
+        if len(self.report["error_rows"]) < MAX_REPORTED_ERRORS:
+            self.report["error_rows"].append({"line": line, "error": message})
+
+    def apply(self, rows):
+        with transaction.atomic():
+            rows = self.resolve_offers(rows)
+            # the last row for a tier wins (ON CONFLICT cannot touch a row twice per statement)
+            latest = {}
+            for row in rows:
+                latest[(row.offer_id, row.tier_name)] = row
+            upserts = [row for row in latest.values() if row.minimum_quantity is not None]
+            price_only = [row for row in latest.values() if row.minimum_quantity is None]
+            if upserts:
+                PricingTier.objects.bulk_create(
+                    [
+                        PricingTier(
+                            offer_id=row.offer_id,
+                            tier_name=row.tier_name,
+                            unit_price=row.unit_price,
+                            minimum_quantity=row.minimum_quantity,
+                            maximum_quantity=row.maximum_quantity,
+                            is_negotiable=bool(row.is_negotiable),
+                        )
+                        for row in upserts
+                    ],
+                    update_conflicts=True,
+                    unique_fields=["offer", "tier_name"],
+                    update_fields=["unit_price", "minimum_quantity", "maximum_quantity", "is_negotiable", "updated_at"],
+                )
+                self.record_tiers(upserts)
+                self.report["upserted"] += len(upserts)
+            if price_only:
+                self.update_prices(price_only)
+
+    def resolve_offers(self, rows):
+        """Set row.offer_id for every row the seller may write; report and drop the others."""
+        offer_ids = {row.offer_id for row in rows if row.offer_id is not None}
+        owners = dict(Offer.objects.filter(pk__in=offer_ids).values_list("pk", "seller_id")) if offer_ids else {}
+
+        by_product = [row for row in rows if row.offer_id is None]
+        pairs = set()
+        for row in by_product:
+            if self.seller_id is not None:
+                if row.seller_id not in (None, self.seller_id):
+                    row.seller_id = -1  # reported below
+                else:
+                    row.seller_id = self.seller_id
+            pairs.add((row.product_id, row.seller_id))
+        offers = self.upsert_offers(pairs) if pairs else {}
+
+        resolved = []
+        for row in rows:
+            if row.offer_id is not None:
+                owner = owners.get(row.offer_id)
+                if owner is None:
+                    self.error(row.line, f"offer {row.offer_id} does not exist")
+                elif self.seller_id is not None and owner != self.seller_id:
+                    self.error(row.line, f"offer {row.offer_id} belongs to another seller")
+                else:
+                    resolved.append(row)
+            elif row.seller_id == -1:
+                self.error(row.line, "seller must be your own seller")
+            elif row.seller_id is None:
+                self.error(row.line, "seller is required for rows addressed by product")
+            elif (row.product_id, row.seller_id) not in offers:
+                self.error(row.line, f"product {row.product_id} or seller {row.seller_id} does not exist")
+            else:
+                row.offer_id = offers[(row.product_id, row.seller_id)]
+                resolved.append(row)
+        return resolved
+
+    def upsert_offers(self, pairs):
+        """{(product_id, seller_id): offer_id}, creating missing offers; unknown products/sellers are left out."""
+        pairs = {(product, seller) for product, seller in pairs if seller not in (None, -1)}
+        if not pairs:
+            return {}
+        products = {product for product, _ in pairs}
+        sellers = {seller for _, seller in pairs}
+        known_products = set(Product.objects.filter(pk__in=products).values_list("pk", flat=True))
+        known_sellers = set(Seller.objects.filter(pk__in=sellers).values_list("pk", flat=True))
+        pairs = {(p, s) for p, s in pairs if p in known_products and s in known_sellers}
+        if not pairs:
+            return {}
+
+        def existing():
+            return {
+                (product, seller): pk
+                for pk, product, seller in Offer.objects.filter(
+                    product_id__in={p for p, _ in pairs}, seller_id__in={s for _, s in pairs}
+                ).values_list("pk", "product_id", "seller_id")
+                if (product, seller) in pairs
+            }
+
+        found = existing()
+        missing = pairs - found.keys()
+        if missing:
+            # ON CONFLICT DO NOTHING on products_offer_product_seller_uniq: concurrent imports may race here
+            before = len(found)
+            Offer.objects.bulk_create([Offer(product_id=p, seller_id=s) for p, s in missing], ignore_conflicts=True)
+            previous, found = found, existing()
+            created = {pk: key for key, pk in found.items() if key not in previous}
+            changes.record(Offer, list(created), owners=created)
+            self.report["offers_created"] += len(found) - before
+        return found
+
+    def update_prices(self, rows):
+        tiers = {
+            (tier.offer_id, tier.tier_name): tier
+            for tier in PricingTier.objects.filter(
+                offer_id__in={row.offer_id for row in rows}, tier_name__in={row.tier_name for row in rows}
+            ).only("pk", "offer_id", "tier_name", "unit_price", "is_negotiable").annotate(
+                product_id=F("offer__product_id"), seller_id=F("offer__seller_id")
+            )
+        }
+        changed, now = [], timezone.now()
+        for row in rows:
+            tier = tiers.get((row.offer_id, row.tier_name))
+            if tier is None:
+                self.error(row.line, f"offer {row.offer_id} has no tier {row.tier_name!r} (send minimum_quantity to create it)")
+                continue
+            tier.unit_price = row.unit_price
+            if row.is_negotiable is not None:
+                tier.is_negotiable = row.is_negotiable
+            tier.updated_at = now
+            changed.append(tier)
+        if changed:
+            PricingTier.objects.bulk_update(changed, ["unit_price", "is_negotiable", "updated_at"])
+            changes.record(PricingTier, [tier.pk for tier in changed],
+                           owners={tier.pk: (tier.product_id, tier.seller_id) for tier in changed})
+            self.report["updated"] += len(changed)
+
+    def record_tiers(self, rows):
+        """Change log entries for upserted tiers (ON CONFLICT updates do not report their ids)."""
+        tiers = PricingTier.objects.filter(
+            offer_id__in={row.offer_id for row in rows}, tier_name__in={row.tier_name for row in rows}
+        ).values_list("pk", "offer_id", "tier_name", "offer__product_id", "offer__seller_id")
+        wanted = {(row.offer_id, row.tier_name) for row in rows}
+        owners = {
+            pk: (product_id, seller_id)
+            for pk, offer_id, tier_name, product_id, seller_id in tiers if (offer_id, tier_name) in wanted
+        }
+        changes.record(PricingTier, list(owners), owners=owners)
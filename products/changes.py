@@ -0,0 +1,193 @@
+# products/changes.py
+"""
+Append-only change log of catalog rows (CatalogChange) for delta sync:
+GET /api/changes/?since=<seq> (products.views.ChangeFeedView).
+
+Tracked: Product, ProductSpecification, Offer, PricingTier, DeliveryLocation
+and Seller. Every save/delete appends an entry (entity, object_id, op) in
+the same transaction as the write; `seq` is the monotonic log position.
+Writes that bypass signals (bulk_create, bulk_update, queryset.update(), raw
+SQL) must call `record()` themselves, as OfferWriteSerializer and
+products.bulk_pricing do. Changes of categories/standards (reference data)
+are not tracked; clients read those tables whole.
+
+Reading (`read_changes`): the entries after `since` are compacted to the last
+entry per row; upserts carry the current row, deletes are tombstones. A
+consumer stores `next` and polls again with it, so a sync costs O(changes).
+
+Sequence numbers are taken at insert time but become visible at commit, so a
+slow transaction can commit seq 41 after seq 42 was read. A gap in the
+sequence therefore stops the page unless the entry after it is older than
+CHANGES_GAP_TIMEOUT seconds (then the missing numbers are taken to be rolled
+back). Entries older than CHANGES_COMPACT_AFTER_DAYS may be compacted
+(`manage.py compact_changes`): superseded entries are dropped, the last one
+per row (tombstones included) is kept, so since=0 stays a full snapshot.
+
+Each entry carries the product and seller its row belongs to. Entries are also
+published with pg_notify for the live updates stream (products.live), tier
+upserts append their changed prices to the price history
+(products.price_history), and after commit `catalog_changed` is sent with the
+committed entries.
+"""
+from datetime import timedelta
+from decimal import Decimal
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal
+from django.utils import timezone
+
+from . import live, price_history
+from .models import CatalogChange, DeliveryLocation, Offer, PricingTier, Product, ProductSpecification, Seller
+
+# sent after commit; `changes` is the list of new CatalogChange entries
+catalog_changed = Signal()
+
+ENTITIES = {
+    Product: "product",
+    ProductSpecification: "specification",
+    Offer: "offer",
+    PricingTier: "pricing_tier",
+    DeliveryLocation: "delivery_location",
+    Seller: "seller",
+}
+MODELS = {entity: model for model, entity in ENTITIES.items()}
+
+
+def record(model, ids, op=CatalogChange.UPSERT, using=None, owners=None):
+    """
+    Append one entry per id of `model` (call in the writing transaction);
+    `owners` maps ids to the (product_id, seller_id) the row belongs to.
+    """
+    entity = ENTITIES[model]
+    owners = owners or {}
+    entries = []
+    for pk in ids:
+        if pk is None:
+            continue
+        product_id, seller_id = owners.get(pk, (None, None))
+        if model is Product:
+            product_id = pk
+        elif model is Seller:
+            seller_id = pk
+        entries.append(CatalogChange(entity=entity, object_id=pk, op=op, product_id=product_id, seller_id=seller_id))
+    entries = CatalogChange.objects.using(using).bulk_create(entries)
+    if entries:
+        if model is PricingTier and op == CatalogChange.UPSERT:
+            price_history.record_prices([entry.object_id for entry in entries], using=using)
+        live.notify(entries, using=using)
+        transaction.on_commit(lambda: catalog_changed.send(sender=CatalogChange, changes=entries), using=using)
+    return entries
+
+
+def owner_of(instance, using=None):
+    """
+    (product_id, seller_id) a tracked row belongs to; one query for tiers /
+    delivery options whose offer is not loaded.
+    """
+    if isinstance(instance, (Product, Seller)):
+        return None, None  # the row itself, see record()
+    if isinstance(instance, ProductSpecification):
+        return instance.product_id, None
+    if isinstance(instance, Offer):
+        return instance.product_id, instance.seller_id
+    if instance._meta.get_field("offer").is_cached(instance):
+        return instance.offer.product_id, instance.offer.seller_id
+    owner = Offer.objects.using(using).filter(pk=instance.offer_id).values_list("product_id", "seller_id").first()
+    return owner or (None, None)
+
+
+def _record_save(sender, instance, raw=False, using=None, **kwargs):
+    if not raw:  # loaddata
+        record(sender, [instance.pk], using=using, owners={instance.pk: owner_of(instance, using)})
+
+
+def _record_delete(sender, instance, using=None, **kwargs):
+    # cascades delete the children before their offer, so the offer row is still there
+    record(sender, [instance.pk], op=CatalogChange.DELETE, using=using, owners={instance.pk: owner_of(instance, using)})
+
+
+for _model in ENTITIES:
+    post_save.connect(_record_save, sender=_model, dispatch_uid=f"changes-save-{_model._meta.label}")
+    post_delete.connect(_record_delete, sender=_model, dispatch_uid=f"changes-delete-{_model._meta.label}")
+
+
+def row_data(obj):
+    """
+    Flat {field: value} of the concrete fields (foreign keys as <name>_id);
+    decimals as strings like the API, timestamps Gregorian.
+    """
+    data = {}
+    for field in obj._meta.concrete_fields:
+        value = getattr(obj, field.attname)
+        if isinstance(value, Decimal):
+            value = str(value)
+        elif hasattr(value, "togregorian"):  # JalaliDateTimeField
+            value = value.togregorian()
+        data[field.attname] = value
+    return data
+
+
+def read_changes(since, limit, now=None):
+    """
+    Compacted changes after `since`, at most `limit` log entries:
+    {"since", "next", "has_more", "changes": [...]} (see hydrate()).
+    """
+    now = now or timezone.now()
+    gap_timeout = timedelta(seconds=getattr(settings, "CHANGES_GAP_TIMEOUT", 60))
+    entries = list(CatalogChange.objects.filter(seq__gt=since).order_by("seq")[:limit + 1])
+    has_more = len(entries) > limit
+    entries = entries[:limit]
+
+    visible, expected = [], since + 1
+    for entry in entries:
+        if entry.seq != expected and now - entry.created_at < gap_timeout:
+            # an earlier sequence number may still be in an open transaction
+            has_more = True
+            break
+        visible.append(entry)
+        expected = entry.seq + 1
+
+    return {
+        "since": since,
+        "next": visible[-1].seq if visible else since,
+        "has_more": has_more,
+        "changes": hydrate(visible),
+    }
+
+
+def hydrate(entries):
+    """
+    Compact `entries` (in log order) to the last one per row and render them:
+    [{"seq", "type", "id", "product_id", "op", "data"}], one query per entity.
+    """
+    latest = {}
+    for entry in entries:
+        latest.pop((entry.entity, entry.object_id), None)  # keep log order of the last entries
+        latest[(entry.entity, entry.object_id)] = entry
+
+    upserts = {}
+    for entity in {entity for entity, _ in latest}:
+        ids = [pk for (name, pk), entry in latest.items() if name == entity and entry.op == CatalogChange.UPSERT]
+        if ids:
+            upserts[entity] = MODELS[entity]._default_manager.in_bulk(ids)
+
+    changes = []
+    for (entity, pk), entry in latest.items():
+        obj = upserts.get(entity, {}).get(pk) if entry.op == CatalogChange.UPSERT else None
+        change = {"seq": entry.seq, "type": entity, "id": pk, "product_id": entry.product_id, "seller_id": entry.seller_id}
+        if obj is None:
+            # deleted after this entry: a tombstone now, the delete entry follows later in the log
+            change.update(op=CatalogChange.DELETE, data=None)
+        else:
+            change.update(op=entry.op, data=row_data(obj))
+        changes.append(change)
+    return changes
+
+
+def compact(before):
+    """Delete the entries created before `before` that a later entry of the same row supersedes."""
+    later = CatalogChange.objects.filter(entity=OuterRef("entity"), object_id=OuterRef("object_id"), seq__gt=OuterRef("seq"))
+    return CatalogChange.objects.filter(created_at__lt=before).filter(Exists(later)).delete()[0]
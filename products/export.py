@@ -0,0 +1,210 @@
+# products/export.py
+"""
+Streaming catalog export: products with specification, offers and pricing
+tiers as NDJSON (one product per line) or CSV (one row per pricing tier;
+products without tiers get one row with empty offer/tier columns).
+
+Used by GET /api/export/products.csv|.ndjson (products.views.CatalogExportView)
+and `manage.py export_catalog`.
+
+Memory stays flat whatever the catalog size:
+- rows are read with QuerySet.iterator(chunk_size=EXPORT_CHUNK_SIZE), a
+  server-side cursor on PostgreSQL; the offers/tiers prefetch runs once per
+  chunk. With DISABLE_SERVER_SIDE_CURSORS (pgbouncer) the driver would buffer
+  the whole result, so chunks are read with keyset pagination (pk > last)
+  instead;
+- output is produced line by line and flushed in ~64 KB blocks, optionally
+  gzip-compressed on the fly;
+- under ASGI the blocks are handed to Django as an async iterator
+  (`aiter_blocks`), each block produced in the sync thread: a sync iterator
+  would be collected into a list by the ASGI handler before sending.
+
+Timestamps are exported as Gregorian ISO 8601.
+"""
+import csv
+import io
+import zlib
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connections
+from django.db.models import Prefetch
+
+from . import refdata
+from .models import Offer, PricingTier, Product
+
+BLOCK_SIZE = 64 * 1024
+
+SPEC_FIELDS = (
+    "material_type", "steel_grade", "standard_id", "thickness_mm", "width_mm", "length_mm", "height_mm",
+    "weight_kg_per_unit", "surface_finish", "manufacturing_process",
+)
+TIER_FIELDS = ("tier_name", "unit_price", "minimum_quantity", "maximum_quantity", "is_negotiable")
+
+CSV_COLUMNS = (
+    ["product_id", "name", "slug", "category_id", "category", "is_active", "updated_at"]
+    + [f"spec_{name}" for name in SPEC_FIELDS]
+    + ["offer_id", "seller_id", "seller", "offer_is_active"]
+    + ["tier_id"] + list(TIER_FIELDS)
+)
+
+CONTENT_TYPES = {"csv": "text/csv; charset=utf-8", "ndjson": "application/x-ndjson"}
+
+
+def _iso(value):
+    if value is None:
+        return None
+    # JalaliDateTimeField returns jdatetime values
+    if hasattr(value, "togregorian"):
+        value = value.togregorian()
+    return value.isoformat()
+
+
+def export_queryset(queryset=None):
+    """Products (filtered by the caller) with everything the export writes."""
+    queryset = Product.objects.all() if queryset is None else queryset
+    return queryset.select_related("specifications").prefetch_related(
+        Prefetch(
+            "offers",
+            queryset=Offer.objects.select_related("seller").only(
+                "id", "product_id", "seller_id", "is_active", "seller__id", "seller__company_name"
+            ).order_by("id"),
+        ),
+        Prefetch("offers__pricing_tiers", queryset=PricingTier.objects.order_by("minimum_quantity", "id")),
+    ).order_by("pk")
+
+
+def iter_products(queryset, chunk_size=None):
+    """Yield the products of `queryset` (see export_queryset) in bounded chunks."""
+    chunk_size = chunk_size or getattr(settings, "EXPORT_CHUNK_SIZE", 500)
+    if not connections[queryset.db].settings_dict.get("DISABLE_SERVER_SIDE_CURSORS"):
+        yield from queryset.iterator(chunk_size=chunk_size)
+        return
+    last_pk = None
+    while True:
+        chunk = queryset if last_pk is None else queryset.filter(pk__gt=last_pk)
+        chunk = list(chunk[:chunk_size])
+        if not chunk:
+            return
+        yield from chunk
+        last_pk = chunk[-1].pk
+
+
+def _specification(product):
+    try:
+        spec = product.specifications
+    except Product.specifications.RelatedObjectDoesNotExist:
+        return None
+    return {name: getattr(spec, name) for name in SPEC_FIELDS}
+
+
+def product_record(product, categories):
+    category = categories.get(product.category_id)
+    return {
+        "id": product.pk,
+        "name": product.name,
+        "slug": product.slug,
+        "category_id": product.category_id,
+        "category": category.name if category else None,
+        "is_active": product.is_active,
+        "updated_at": _iso(product.updated_at),
+        "specification": _specification(product),
+        "offers": [
+            {
+                "id": offer.pk,
+                "seller_id": offer.seller_id,
+                "seller": offer.seller.company_name,
+                "is_active": offer.is_active,
+                "pricing_tiers": [
+                    dict({"id": tier.pk}, **{name: getattr(tier, name) for name in TIER_FIELDS})
+                    for tier in offer.pricing_tiers.all()
+                ],
+            }
+            for offer in product.offers.all()
+        ],
+    }
+
+
+def ndjson_lines(products):
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+    categories = refdata.categories.rows()
+    for product in products:
+        yield encoder.encode(product_record(product, categories)) + "\n"
+
+
+def csv_lines(products):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+
+    def line(row):
+        writer.writerow(row)
+        value = buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+        return value
+
+    yield line(CSV_COLUMNS)
+    categories = refdata.categories.rows()
+    for product in products:
+        record = product_record(product, categories)
+        spec = record["specification"] or {}
+        head = [record["id"], record["name"], record["slug"], record["category_id"], record["category"],
+                record["is_active"], record["updated_at"]] + [spec.get(name) for name in SPEC_FIELDS]
+        rows = 0
+        for offer in record["offers"]:
+            offer_cols = [offer["id"], offer["seller_id"], offer["seller"], offer["is_active"]]
+            for tier in offer["pricing_tiers"]:
+                yield line(head + offer_cols + [tier["id"]] + [tier[name] for name in TIER_FIELDS])
+                rows += 1
+            if not offer["pricing_tiers"]:
+                yield line(head + offer_cols + [None] * (1 + len(TIER_FIELDS)))
+                rows += 1
+        if not rows:
+            yield line(head + [None] * (4 + 1 + len(TIER_FIELDS)))
+
+
+def export_lines(fmt, products):
+    if fmt == "csv":
+        return csv_lines(products)
+    if fmt == "ndjson":
+        return ndjson_lines(products)
+    raise ValueError(f"Unknown export format {fmt!r}; expected csv or ndjson.")
+
+
+def encode(lines, gzip=False, block_size=BLOCK_SIZE):
+    """UTF-8 encode `lines` into ~block_size byte blocks, gzip-compressed when asked."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None  # wbits=31: gzip container
+    pending, size = [], 0
+    for line in lines:
+        data = line.encode("utf-8")
+        pending.append(data)
+        size += len(data)
+        if size >= block_size:
+            block = b"".join(pending)
+            pending, size = [], 0
+            block = compressor.compress(block) if compressor else block
+            if block:
+                yield block
+    block = b"".join(pending)
+    if compressor:
+        block = compressor.compress(block) + compressor.flush()
+    if block:
+        yield block
+
+
+async def aiter_blocks(blocks):
+    """Async iterator over the sync iterator `blocks`; each block is produced in the sync thread."""
+    blocks = iter(blocks)
+    # thread_sensitive: every step runs in the same thread, so on the same database connection / cursor
+    next_block = sync_to_async(next, thread_sensitive=True)
+    try:
+        while True:
+            block = await next_block(blocks, None)
+            if block is None:
+                return
+            yield block
+    finally:
+        close = getattr(blocks, "close", None)
+        if close is not None:
+            await sync_to_async(close, thread_sensitive=True)()  # client gone: release the cursor
@@ -1,11 +1,13 @@
 from django_filters import rest_framework as filters
-from .models import Product, Offer
+from . import refdata
+from .models import Product, Offer, PriceIndex
+from .price_index import grade_key
 
 class ProductFilter(filters.FilterSet):
     # filter on category id and active
     category = filters.NumberFilter(field_name='category', lookup_expr='exact')
-    # allow filtering by category name (case-insensitive)
-    category_name = filters.CharFilter(field_name='category__name', lookup_expr='iexact')
+    # allow filtering by category name (case-insensitive); resolved from the reference data cache, no JOIN
+    category_name = filters.CharFilter(method='filter_category_name')
     is_active = filters.BooleanFilter(field_name='is_active')
 
     # filters on specifications (related one-to-one)
@@ -17,6 +19,11 @@ class ProductFilter(filters.FilterSet):
         model = Product
         fields = ['category', 'category_name', 'is_active', 'steel_grade', 'min_thickness', 'max_thickness']
 
+    def filter_category_name(self, queryset, name, value):
+        wanted = value.casefold()
+        ids = [category.pk for category in refdata.categories.all() if category.name.casefold() == wanted]
+        return queryset.filter(category_id__in=ids)
+
 
 class OfferFilter(filters.FilterSet):
     product = filters.NumberFilter(field_name='product', lookup_expr='exact')
@@ -29,4 +36,25 @@ class OfferFilter(filters.FilterSet):
 
     class Meta:
         model = Offer
-        fields = ['product', 'seller', 'is_active', 'min_price', 'max_price']
\ No newline at end of file
+        fields = ['product', 'seller', 'is_active', 'min_price', 'max_price']
+
+
+class PriceIndexFilter(filters.FilterSet):
+    # grades are stored normalized (ST37); "St 37" and "st-37" match too
+    steel_grade = filters.CharFilter(method='filter_steel_grade')
+    material_type = filters.CharFilter(field_name='material_type', lookup_expr='iexact')
+    incoterm = filters.CharFilter(field_name='incoterm', lookup_expr='iexact')
+    day_from = filters.DateFilter(field_name='day', lookup_expr='gte')
+    day_to = filters.DateFilter(field_name='day', lookup_expr='lte')
+
+    class Meta:
+        model = PriceIndex
+        fields = ['steel_grade', 'material_type', 'incoterm']
+
+    def filter_steel_grade(self, queryset, name, value):
+        return queryset.filter(steel_grade=grade_key(value))
+
+
+# day range as ?from=2025-01-01&to=2025-03-31 (`from` is a Python keyword, hence the renaming)
+PriceIndexFilter.base_filters['from'] = PriceIndexFilter.base_filters.pop('day_from')
+PriceIndexFilter.base_filters['to'] = PriceIndexFilter.base_filters.pop('day_to')
@@ -0,0 +1,251 @@
+# products/live.py
+"""
+Live offer / pricing tier / delivery option updates for product pages over
+Server-Sent Events: GET /api/live/offers/?products=<id>,<id>
+(products.async_views.LiveOffersView, ASGI only).
+
+Flow:
+- products.changes.record() publishes every change log entry of an offer,
+  tier or delivery option with pg_notify(LIVE_UPDATES_CHANNEL, ...) inside
+  the writing transaction, so PostgreSQL delivers it only when (and if) the
+  transaction commits;
+- each ASGI process runs one listener thread (`hub`) with its own LISTEN
+  connection, started by the first subscriber. For every notification it
+  loads the changed rows once (products.changes.hydrate) and hands the events
+  to the event loops of the subscribed connections. Watchers cost no database
+  work of their own;
+- a client that reconnects with Last-Event-ID (the change log seq) gets the
+  entries it missed from the change log, up to LIVE_REPLAY_LIMIT; beyond
+  that, and whenever events may have been lost (listener reconnect, a slow
+  client overflowing its queue), it gets a `reset` event and should reload
+  the offers with GET /api/products/<id>/offers/.
+
+The LISTEN connection must reach PostgreSQL directly: LISTEN does not work
+through pgbouncer in transaction pooling mode, point LIVE_UPDATES_DATABASE at
+a direct alias then. With LIVE_UPDATES = False (or another database engine)
+nothing is published.
+"""
+import asyncio
+import json
+import logging
+import select
+import threading
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import close_old_connections, connections
+
+logger = logging.getLogger(__name__)
+
+LIVE_ENTITIES = ("offer", "pricing_tier", "delivery_location")
+# NOTIFY payloads are limited to 8000 bytes
+MAX_PAYLOAD = 7900
+RESET = object()
+
+
+def channel():
+    return getattr(settings, "LIVE_UPDATES_CHANNEL", "catalog_live")
+
+
+def enabled(using=None):
+    return getattr(settings, "LIVE_UPDATES", True) and connections[using or "default"].vendor == "postgresql"
+
+
+# ---------------- publishing ----------------
+def notify(entries, using=None):
+    """pg_notify the live entries among `entries` (CatalogChange) in the current transaction."""
+    rows = [
+        [entry.seq, entry.entity, entry.object_id, entry.op, entry.product_id]
+        for entry in entries
+        if entry.entity in LIVE_ENTITIES and entry.product_id is not None
+    ]
+    if not rows or not enabled(using):
+        return
+    payloads, chunk, size = [], [], 2
+    for row in rows:
+        encoded = json.dumps(row, separators=(",", ":"))
+        if chunk and size + len(encoded) + 1 > MAX_PAYLOAD:
+            payloads.append("[" + ",".join(chunk) + "]")
+            chunk, size = [], 2
+        chunk.append(encoded)
+        size += len(encoded) + 1
+    payloads.append("[" + ",".join(chunk) + "]")
+    with connections[using or "default"].cursor() as cursor:
+        for payload in payloads:
+            cursor.execute("SELECT pg_notify(%s, %s)", [channel(), payload])
+
+
+# ---------------- fan-out ----------------
+class Subscription:
+    """Events for a set of product ids, consumed by one SSE connection on its event loop."""
+
+    def __init__(self, product_ids, loop, max_queue):
+        self.product_ids = frozenset(product_ids)
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.max_queue = max_queue
+        self.overflowed = False
+
+    def put(self, event):
+        # runs on self.loop
+        if self.overflowed:
+            return
+        if self.queue.qsize() >= self.max_queue:
+            # a client that cannot keep up is told to reload instead of buffering without bound
+            self.overflowed = True
+            self.queue.put_nowait(RESET)
+            return
+        self.queue.put_nowait(event)
+
+    def deliver(self, event):
+        # called from the listener thread
+        try:
+            self.loop.call_soon_threadsafe(self.put, event)
+        except RuntimeError:  # loop closed; the connection is gone
+            pass
+
+
+class LiveHub:
+    """Per-process registry of subscriptions plus the LISTEN thread feeding them."""
+
+    def __init__(self):
+        self._subscriptions = defaultdict(set)  # product id -> {Subscription}
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def subscribe(self, product_ids, loop):
+        subscription = Subscription(product_ids, loop, getattr(settings, "LIVE_MAX_QUEUE", 100))
+        with self._lock:
+            for product_id in subscription.product_ids:
+                self._subscriptions[product_id].add(subscription)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._listen, name="live-updates-listener", daemon=True)
+                self._thread.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            for product_id in subscription.product_ids:
+                subscribers = self._subscriptions.get(product_id)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self._subscriptions[product_id]
+
+    def watched(self, product_ids):
+        with self._lock:
+            return {product_id for product_id in product_ids if product_id in self._subscriptions}
+
+    def publish(self, events):
+        with self._lock:
+            targets = [(event, list(self._subscriptions.get(event["product_id"], ()))) for event in events]
+        for event, subscribers in targets:
+            for subscription in subscribers:
+                subscription.deliver(event)
+
+    def reset_all(self):
+        with self._lock:
+            subscriptions = {s for subscribers in self._subscriptions.values() for s in subscribers}
+        for subscription in subscriptions:
+            subscription.deliver(RESET)
+
+    # ---- listener thread ----
+    def _listen(self):
+        backoff = 1
+        connected_before = False
+        while True:
+            try:
+                conn = self._connect()
+            except Exception:
+                logger.exception("Live updates: cannot connect the LISTEN connection; retrying in %ss", backoff)
+                time.sleep(backoff)
+                backoff = min(backoff * 2, 30)
+                continue
+            backoff = 1
+            if connected_before:
+                # notifications sent while we were disconnected are lost
+                self.reset_all()
+            connected_before = True
+            try:
+                for payload in self._payloads(conn):
+                    try:
+                        self._dispatch(payload)
+                    except Exception:
+                        logger.exception("Live updates: could not dispatch a notification")
+                        self.reset_all()
+            except Exception:
+                logger.exception("Live updates: LISTEN connection lost; reconnecting")
+            finally:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def _connect(self):
+        alias = getattr(settings, "LIVE_UPDATES_DATABASE", "default")
+        wrapper = connections.create_connection(alias)
+        # a plain connection of the driver (never a pooled one): it stays in LISTEN for the process lifetime
+        conn = wrapper.Database.connect(**wrapper.get_connection_params())
+        conn.autocommit = True
+        with conn.cursor() as cursor:
+            cursor.execute(f'LISTEN "{channel()}"')
+        return conn
+
+    def _payloads(self, conn):
+        timeout = getattr(settings, "LIVE_LISTEN_TIMEOUT", 5.0)
+        if hasattr(conn, "notifies") and callable(conn.notifies):  # psycopg 3
+            while True:
+                for notify in conn.notifies(timeout=timeout):
+                    yield notify.payload
+                conn.execute("SELECT 1")  # detects a dead connection
+        else:  # psycopg2
+            while True:
+                if select.select([conn], [], [], timeout) == ([], [], []):
+                    conn.cursor().execute("SELECT 1")
+                    continue
+                conn.poll()
+                while conn.notifies:
+                    yield conn.notifies.pop(0).payload
+
+    def _dispatch(self, payload):
+        from . import changes
+        from .models import CatalogChange
+
+        try:
+            rows = json.loads(payload)
+        except ValueError:
+            logger.warning("Live updates: ignoring malformed payload %r", payload[:200])
+            return
+        watched = self.watched({row[4] for row in rows})
+        entries = [
+            CatalogChange(seq=seq, entity=entity, object_id=object_id, op=op, product_id=product_id)
+            for seq, entity, object_id, op, product_id in rows
+            if product_id in watched
+        ]
+        if not entries:
+            return
+        close_old_connections()
+        try:
+            events = changes.hydrate(entries)
+        finally:
+            close_old_connections()
+        self.publish(events)
+
+
+hub = LiveHub()
+
+
+def replay(product_ids, after_seq):
+    """Missed events of `product_ids` after `after_seq`, or None when more than LIVE_REPLAY_LIMIT entries."""
+    from . import changes
+    from .models import CatalogChange
+
+    limit = getattr(settings, "LIVE_REPLAY_LIMIT", 500)
+    entries = list(
+        CatalogChange.objects.filter(seq__gt=after_seq, product_id__in=product_ids, entity__in=LIVE_ENTITIES)
+        .order_by("seq")[:limit + 1]
+    )
+    if len(entries) > limit:
+        return None
+    return changes.hydrate(entries)
@@ -0,0 +1,221 @@
+# products/management/commands/bench_endpoints.py
+"""
+Benchmark the hot catalog endpoints in-process and compare against a stored baseline.
+
+For every scenario in products.benchmarks.SCENARIOS the command issues the request
+through the full Django stack (middleware, DRF, serializers, rendering) and records:
+- p50 / p95 / p99 latency (ms)
+- SQL query count and total SQL time (ms) per request, over every database
+  alias (reads routed to the "replica" alias by core.db_router included)
+
+Typical usage:
+    python manage.py seed_products --scale --count 100000 --seed 42
+    python manage.py bench_endpoints --save-baseline        # record a baseline
+    python manage.py bench_endpoints                        # fails on regressions
+
+A scenario regresses when its p95 latency exceeds the baseline by more than
+--tolerance (relative) and --slack-ms (absolute), when it runs more queries than
+the baseline, or when it exceeds its hard `max_queries` budget. Any non-2xx
+response (warmup included) fails its scenario: an error page is not a timing.
+
+Rate limits (settings.RATE_LIMITS) are disabled for the run: the token-obtain
+scenario alone posts warmup + iterations logins for the same user and ip.
+"""
+import json
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, connections
+from django.test import Client
+from django.test.utils import override_settings
+
+from products.benchmarks import BENCH_PASSWORD, BENCH_USERNAME, SCENARIOS, resolve_placeholders
+from products.models import Product
+from utils.benchmarking import summarize
+from utils.sql import QueryRecorder
+
+User = get_user_model()
+
+DEFAULT_BASELINE = Path(settings.BASE_DIR) / "benchmarks" / "endpoints_baseline.json"
+
+
+class Command(BaseCommand):
+    help = "Benchmark hot API endpoints (latency percentiles, query counts, SQL time) against a baseline JSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--iterations", type=int, default=30, help="Measured requests per scenario (default: 30).")
+        parser.add_argument("--warmup", type=int, default=3, help="Unmeasured requests per scenario (default: 3).")
+        parser.add_argument("--scenario", action="append", dest="scenarios", help="Only run the named scenario (repeatable).")
+        parser.add_argument("--baseline", default=str(DEFAULT_BASELINE), help=f"Baseline JSON path (default: {DEFAULT_BASELINE}).")
+        parser.add_argument("--save-baseline", action="store_true", help="Write the results as the new baseline instead of comparing.")
+        parser.add_argument("--output", help="Also write the raw results JSON to this path.")
+        parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative p95 increase over the baseline (default: 0.25).")
+        parser.add_argument("--slack-ms", type=float, default=2.0, help="Allowed absolute p95 increase in ms (default: 2.0).")
+        parser.add_argument(
+            "--dataset",
+            type=int,
+            default=0,
+            help="Ensure at least this many products exist, seeding with `seed_products --scale` when needed.",
+        )
+        parser.add_argument("--seed", type=int, default=42, help="Seed passed to seed_products when --dataset seeds (default: 42).")
+
+    def handle(self, *args, **options):
+        self._ensure_dataset(options["dataset"], options["seed"])
+        self._ensure_bench_user()
+
+        scenarios = SCENARIOS
+        if options.get("scenarios"):
+            wanted = set(options["scenarios"])
+            unknown = wanted - {s.name for s in SCENARIOS}
+            if unknown:
+                raise CommandError(f"Unknown scenario(s): {', '.join(sorted(unknown))}")
+            scenarios = [s for s in SCENARIOS if s.name in wanted]
+
+        placeholders = resolve_placeholders()
+        client = Client(SERVER_NAME="localhost")
+
+        results = {}
+        with override_settings(RATE_LIMITS={}):
+            for scenario in scenarios:
+                results[scenario.name] = self._run_scenario(
+                    client, scenario, placeholders, options["iterations"], options["warmup"]
+                )
+        self._print_table(results)
+
+        payload = {
+            "meta": {
+                "products": Product.objects.count(),
+                "iterations": options["iterations"],
+                "vendor": connection.vendor,
+                "aliases": list(connections),
+            },
+            "scenarios": results,
+        }
+        if options.get("output"):
+            self._write_json(Path(options["output"]), payload)
+
+        baseline_path = Path(options["baseline"])
+        failures = self._status_failures(results)
+        if failures and options["save_baseline"]:
+            self._fail(failures, "scenario(s) returned non-2xx responses; baseline not written.")
+        if options["save_baseline"]:
+            self._write_json(baseline_path, payload)
+            self.stdout.write(self.style.SUCCESS(f"Baseline written to {baseline_path}"))
+            return
+
+        failures += self._budget_failures(scenarios, results)
+        if baseline_path.exists():
+            baseline = json.loads(baseline_path.read_text())
+            failures += self._regressions(baseline.get("scenarios", {}), results, options["tolerance"], options["slack_ms"])
+        else:
+            self.stdout.write(self.style.WARNING(f"No baseline at {baseline_path}; only query budgets were checked."))
+
+        if failures:
+            self._fail(failures, "benchmark regression(s) detected.")
+        self.stdout.write(self.style.SUCCESS("No regressions."))
+
+    def _fail(self, failures, message):
+        for line in failures:
+            self.stderr.write(self.style.ERROR(f"  {line}"))
+        raise CommandError(f"{len(failures)} {message}")
+
+    # ----- setup -----
+    def _ensure_dataset(self, minimum, seed):
+        existing = Product.objects.count()
+        if minimum and existing < minimum:
+            self.stdout.write(self.style.NOTICE(f"Dataset has {existing} products; seeding {minimum - existing} more..."))
+            call_command("seed_products", scale=True, count=minimum - existing, seed=seed, stdout=self.stdout)
+
+    def _ensure_bench_user(self):
+        user, created = User.objects.get_or_create(username=BENCH_USERNAME, defaults={"is_active": True})
+        if created or not user.check_password(BENCH_PASSWORD):
+            user.set_password(BENCH_PASSWORD)
+            user.is_active = True
+            user.save()
+
+    # ----- measuring -----
+    def _run_scenario(self, client, scenario, placeholders, iterations, warmup):
+        path = scenario.path.format(**placeholders)
+        send = getattr(client, scenario.method)
+        kwargs = {"data": scenario.data, "content_type": "application/json"} if scenario.method != "get" else {}
+
+        failed_statuses = set()
+        for _ in range(warmup):
+            status_code = send(path, **kwargs).status_code
+            if not 200 <= status_code < 300:
+                failed_statuses.add(status_code)
+
+        latencies, query_counts, sql_times = [], [], []
+        status_code = None
+        for _ in range(iterations):
+            recorder = QueryRecorder(fingerprints=False)
+            with recorder.installed():
+                started = time.perf_counter()
+                response = send(path, **kwargs)
+                latencies.append((time.perf_counter() - started) * 1000)
+            status_code = response.status_code
+            if not 200 <= status_code < 300:
+                failed_statuses.add(status_code)
+            query_counts.append(recorder.count)
+            sql_times.append(recorder.total_time * 1000)
+
+        latency = summarize(latencies)
+        return {
+            "path": path,
+            # the lowest failing status when any request failed, else the last (2xx) one
+            "status": min(failed_statuses) if failed_statuses else status_code,
+            "failed_statuses": sorted(failed_statuses),
+            "p50_ms": round(latency["p50"], 3),
+            "p95_ms": round(latency["p95"], 3),
+            "p99_ms": round(latency["p99"], 3),
+            "queries": max(query_counts) if query_counts else 0,
+            "sql_ms": round(summarize(sql_times)["p50"], 3),
+        }
+
+    # ----- comparing -----
+    def _status_failures(self, results):
+        return [
+            f"{name}: non-2xx response(s) {', '.join(map(str, result['failed_statuses']))}"
+            for name, result in results.items()
+            if result["failed_statuses"]
+        ]
+
+    def _budget_failures(self, scenarios, results):
+        failures = []
+        for scenario in scenarios:
+            result = results[scenario.name]
+            if scenario.max_queries is not None and result["queries"] > scenario.max_queries:
+                failures.append(f"{scenario.name}: {result['queries']} queries exceeds budget of {scenario.max_queries}")
+        return failures
+
+    def _regressions(self, baseline, results, tolerance, slack_ms):
+        failures = []
+        for name, result in results.items():
+            base = baseline.get(name)
+            if not base:
+                continue
+            limit = base["p95_ms"] * (1 + tolerance) + slack_ms
+            if result["p95_ms"] > limit:
+                failures.append(f"{name}: p95 {result['p95_ms']:.2f}ms > {limit:.2f}ms (baseline {base['p95_ms']:.2f}ms)")
+            if result["queries"] > base["queries"]:
+                failures.append(f"{name}: {result['queries']} queries > baseline {base['queries']}")
+        return failures
+
+    # ----- output -----
+    def _print_table(self, results):
+        header = f"{'scenario':<32} {'status':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'queries':>8} {'sql ms':>8}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for name, r in results.items():
+            self.stdout.write(
+                f"{name:<32} {r['status']:>6} {r['p50_ms']:>9.2f} {r['p95_ms']:>9.2f} {r['p99_ms']:>9.2f} {r['queries']:>8} {r['sql_ms']:>8.2f}"
+            )
+        self.stdout.write(f"queries / sql ms: all database aliases ({', '.join(connections)})")
+
+    def _write_json(self, path, payload):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(payload, indent=2, sort_keys=True))
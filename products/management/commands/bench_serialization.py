@@ -0,0 +1,160 @@
+# products/management/commands/bench_serialization.py
+"""
+Measure the product list page when many products share a few sellers,
+with and without the serialization memo (core.identity).
+
+A throwaway dataset is created inside a transaction that is rolled back at the
+end: --products products (default 100), each with --offers-per-product offers
+from a pool of --sellers sellers (default 5), spread over a few categories and
+standards. The page is then built the way ProductViewSet.list builds it (same
+queryset, ProductListSerializer) and for each mode the command reports:
+
+- queries per page
+- serializer CPU time (time.process_time around serializer.data), p50/p95
+- seller/category/standard dicts rendered vs referenced in the payload
+
+Example:
+    python manage.py bench_serialization --products 100 --sellers 5 --iterations 50
+"""
+import random
+import time
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.test import override_settings
+from rest_framework.request import Request
+from rest_framework.test import APIRequestFactory
+
+from products import refdata
+from products.models import (
+    DeliveryLocation, Offer, PricingTier, Product, ProductCategory, ProductSpecification, ProductStandard, Seller,
+)
+from products.serializers import ProductListSerializer
+from products.views import ProductViewSet
+from utils.benchmarking import summarize
+from utils.sql import QueryRecorder
+
+User = get_user_model()
+
+PREFIX = "bench-shared-"
+MODES = ("plain", "memo")
+
+
+class Command(BaseCommand):
+    help = "Benchmark serializer CPU time and queries of a product page sharing a few sellers, with and without the serialization memo."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--products", type=int, default=100, help="Products on the page (default: 100).")
+        parser.add_argument("--sellers", type=int, default=5, help="Sellers shared by the products (default: 5).")
+        parser.add_argument("--offers-per-product", type=int, default=2, help="Offers per product (default: 2).")
+        parser.add_argument("--categories", type=int, default=3, help="Categories shared by the products (default: 3).")
+        parser.add_argument("--iterations", type=int, default=30, help="Measured pages per mode (default: 30).")
+        parser.add_argument("--warmup", type=int, default=3, help="Unmeasured pages per mode (default: 3).")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        if options["products"] < 1 or options["sellers"] < 1:
+            raise CommandError("--products and --sellers must be positive.")
+        offers_per_product = max(1, min(options["offers_per_product"], options["sellers"]))
+
+        with transaction.atomic():
+            product_ids = self._build_fixture(
+                options["products"], options["sellers"], offers_per_product, max(1, options["categories"]), options["seed"]
+            )
+            # the fixture's categories/standards are not committed: drop the process copy now and after the rollback
+            refdata.invalidate_all()
+            results = {mode: self._run(product_ids, mode, options["iterations"], options["warmup"]) for mode in MODES}
+            transaction.set_rollback(True)
+        refdata.invalidate_all()
+
+        self.stdout.write(
+            f"{options['products']} products, {options['sellers']} sellers, {offers_per_product} offers per product"
+        )
+        header = f"{'mode':<6} {'queries':>8} {'cpu p50 ms':>11} {'cpu p95 ms':>11} {'sellers':>9} {'categories':>11} {'standards':>10}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        for mode, r in results.items():
+            self.stdout.write(
+                f"{mode:<6} {r['queries']:>8} {r['cpu']['p50'] * 1000:>11.2f} {r['cpu']['p95'] * 1000:>11.2f} "
+                f"{r['sellers']:>9} {r['categories']:>11} {r['standards']:>10}"
+            )
+        self.stdout.write("(sellers/categories/standards: distinct rendered dicts / references in the payload)")
+        plain, memo = results["plain"]["cpu"]["p50"], results["memo"]["cpu"]["p50"]
+        if plain:
+            self.stdout.write(self.style.SUCCESS(f"memo: serializer CPU time {(1 - memo / plain) * 100:.0f}% lower at p50"))
+
+    # ----- dataset -----
+    def _build_fixture(self, product_count, seller_count, offers_per_product, category_count, seed):
+        rng = random.Random(seed)
+        users = User.objects.bulk_create([User(username=f"{PREFIX}{n}", is_active=True) for n in range(seller_count)])
+        sellers = Seller.objects.bulk_create(
+            [Seller(user=user, company_name=f"Shared Seller {n}", location="Tehran") for n, user in enumerate(users)]
+        )
+        # mptt needs save() to maintain the tree fields
+        categories = [ProductCategory.objects.create(name=f"{PREFIX}category-{n}") for n in range(category_count)]
+        standards = ProductStandard.objects.bulk_create(
+            [ProductStandard(name=f"{PREFIX}std-{n}"[:50], description="benchmark") for n in range(category_count)]
+        )
+
+        products = Product.objects.bulk_create([
+            Product(category=rng.choice(categories), name=f"Shared product {n}", slug=f"{PREFIX}product-{n}",
+                    short_description="benchmark", description="benchmark")
+            for n in range(product_count)
+        ])
+        ProductSpecification.objects.bulk_create([
+            ProductSpecification(product=p, material_type="sheet", steel_grade="ST37", standard=rng.choice(standards),
+                                 thickness_mm=Decimal("10.00"))
+            for p in products
+        ])
+        offers = Offer.objects.bulk_create([
+            Offer(product=p, seller=seller)
+            for p in products for seller in rng.sample(sellers, offers_per_product)
+        ])
+        PricingTier.objects.bulk_create([
+            PricingTier(offer=offer, tier_name="Tier 1", unit_price=Decimal(rng.randint(400, 900)), minimum_quantity=1)
+            for offer in offers
+        ])
+        DeliveryLocation.objects.bulk_create([
+            DeliveryLocation(offer=offer, incoterm="FOB", country="Iran", city="Bandar Abbas", port="Bandar Abbas Port")
+            for offer in offers
+        ])
+        return [p.pk for p in products]
+
+    # ----- measuring -----
+    def _run(self, product_ids, mode, iterations, warmup):
+        factory = APIRequestFactory()
+        cpu_times, query_counts = [], []
+        data = None
+        with override_settings(SERIALIZATION_MEMO=mode == "memo"):
+            for n in range(warmup + max(1, iterations)):
+                # a fresh request per page: the identity map and memo are request-scoped
+                request = Request(factory.get("/api/products/", {"page_size": len(product_ids)}))
+                view = ProductViewSet(request=request, format_kwarg=None, action="list", kwargs={})
+                # every alias: reads may be routed to the replica (core.db_router)
+                recorder = QueryRecorder(fingerprints=False)
+                with recorder.installed():
+                    page = list(view.get_queryset().filter(pk__in=product_ids).order_by("pk"))
+                    view.prepare_for_serialization(page)
+                    started = time.process_time()
+                    data = ProductListSerializer(page, many=True, context={"request": request, "view": view}).data
+                    elapsed = time.process_time() - started
+                if n >= warmup:
+                    cpu_times.append(elapsed)
+                    query_counts.append(recorder.count)
+
+        sellers = [offer["seller"] for product in data for offer in product["offers"]]
+        categories = [product["category"] for product in data if product["category"]]
+        standards = [product["specification"]["standard"] for product in data
+                     if product["specification"] and product["specification"]["standard"]]
+        return {
+            "queries": max(query_counts),
+            "cpu": summarize(cpu_times),
+            "sellers": self._reuse(sellers),
+            "categories": self._reuse(categories),
+            "standards": self._reuse(standards),
+        }
+
+    def _reuse(self, dicts):
+        return f"{len({id(d) for d in dicts})}/{len(dicts)}"
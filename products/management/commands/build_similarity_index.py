@@ -0,0 +1,35 @@
+# products/management/commands/build_similarity_index.py
+"""
+Build the similar-products index (products.similarity) into SIMILARITY_INDEX_DIR:
+every material type, or only the given ones. Partitions are also rebuilt by
+jobs after specification changes; run the full build after deploying and
+periodically (e.g. nightly from cron) to repair lost updates.
+
+Examples:
+    python manage.py build_similarity_index
+    python manage.py build_similarity_index --material ورق --material لوله
+"""
+import json
+import time
+
+from django.core.management.base import BaseCommand
+
+from products import similarity
+
+
+class Command(BaseCommand):
+    help = "Build the memory-mapped similar-products index."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--material", action="append", help="Only rebuild this material type (repeatable).")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        report = similarity.build(options["material"])
+        summary = {
+            "directory": str(similarity.index_dir()),
+            "partitions": report,
+            "rows": sum(report.values()),
+            "seconds": round(time.monotonic() - started, 2),
+        }
+        self.stdout.write(self.style.SUCCESS(json.dumps(summary, ensure_ascii=False)))
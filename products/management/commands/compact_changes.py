@@ -0,0 +1,30 @@
+# products/management/commands/compact_changes.py
+"""
+Drop change log entries (products.CatalogChange) older than
+CHANGES_COMPACT_AFTER_DAYS that a later entry of the same row supersedes.
+The last entry per row, tombstones included, is kept, so consumers syncing
+from any position still converge. Run daily from cron.
+
+Examples:
+    python manage.py compact_changes
+    python manage.py compact_changes --days 7
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from products import changes
+
+
+class Command(BaseCommand):
+    help = "Compact the catalog change log."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--days", type=int, help="Age of the entries to compact (default: CHANGES_COMPACT_AFTER_DAYS).")
+
+    def handle(self, *args, **options):
+        days = options["days"] if options["days"] is not None else getattr(settings, "CHANGES_COMPACT_AFTER_DAYS", 30)
+        deleted = changes.compact(timezone.now() - timedelta(days=days))
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} superseded change log entries."))
@@ -0,0 +1,78 @@
+# products/management/commands/compare_async_load.py
+"""
+Load comparison of the WSGI catalog endpoints and their async (ASGI) counterparts.
+
+Unlike bench_endpoints (in-process, one request at a time) this drives two
+running servers over HTTP with --concurrency parallel clients, which is where
+the thread-per-request and the event-loop models differ. Start both with the
+same number of workers, e.g.
+
+    gunicorn tg1.wsgi -w 4 -b 127.0.0.1:8000
+    gunicorn tg1.asgi:application -k uvicorn.workers.UvicornWorker -w 4 -b 127.0.0.1:8001
+    python manage.py compare_async_load --concurrency 64 --requests 2000
+
+For every scenario in products.benchmarks.ASYNC_SCENARIOS the sync path is sent
+to --wsgi-url and the /api/async/ path to --asgi-url; the command reports
+throughput, latency percentiles and errors for both.
+"""
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.benchmarks import ASYNC_SCENARIOS, SCENARIOS, async_path, resolve_placeholders
+from utils.benchmarking import summarize
+
+
+def _fetch(url, timeout):
+    started = time.perf_counter()
+    try:
+        with urllib.request.urlopen(url, timeout=timeout) as response:
+            response.read()
+            ok = response.status < 400
+    except (urllib.error.URLError, OSError):
+        ok = False
+    return time.perf_counter() - started, ok
+
+
+class Command(BaseCommand):
+    help = "Compare throughput and latency of the WSGI catalog endpoints with their /api/async/ counterparts under ASGI."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--wsgi-url", default="http://127.0.0.1:8000", help="Base URL of the WSGI server.")
+        parser.add_argument("--asgi-url", default="http://127.0.0.1:8001", help="Base URL of the ASGI server.")
+        parser.add_argument("--concurrency", type=int, default=32, help="Parallel clients (default: 32).")
+        parser.add_argument("--requests", type=int, default=500, help="Requests per scenario and server (default: 500).")
+        parser.add_argument("--timeout", type=float, default=30.0, help="Per-request timeout in seconds (default: 30).")
+        parser.add_argument("--scenario", action="append", dest="scenarios", help="Only run the named scenario (repeatable).")
+
+    def handle(self, *args, **options):
+        names = options["scenarios"] or ASYNC_SCENARIOS
+        unknown = set(names) - set(ASYNC_SCENARIOS)
+        if unknown:
+            raise CommandError(f"No async counterpart for: {', '.join(sorted(unknown))}")
+        placeholders = resolve_placeholders()
+        scenarios = [s for s in SCENARIOS if s.name in names]
+
+        header = f"{'scenario':<32} {'server':<5} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'errors':>7}"
+        self.stdout.write(header)
+        self.stdout.write("-" * len(header))
+        with ThreadPoolExecutor(max_workers=max(1, options["concurrency"])) as pool:
+            for scenario in scenarios:
+                path = scenario.path.format(**placeholders)
+                for server, url in (
+                    ("wsgi", options["wsgi_url"].rstrip("/") + path),
+                    ("asgi", options["asgi_url"].rstrip("/") + async_path(path)),
+                ):
+                    _fetch(url, options["timeout"])  # warm up
+                    started = time.perf_counter()
+                    results = list(pool.map(lambda _: _fetch(url, options["timeout"]), range(options["requests"])))
+                    wall = time.perf_counter() - started
+                    stats = summarize(elapsed for elapsed, _ in results)
+                    errors = sum(1 for _, ok in results if not ok)
+                    self.stdout.write(
+                        f"{scenario.name:<32} {server:<5} {len(results) / wall:>8.1f} {stats['p50'] * 1000:>8.1f} "
+                        f"{stats['p95'] * 1000:>8.1f} {stats['p99'] * 1000:>8.1f} {errors:>7}"
+                    )
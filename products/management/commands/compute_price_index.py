@@ -0,0 +1,62 @@
+# products/management/commands/compute_price_index.py
+"""
+Compute the daily market price index (products.price_index): today's rows
+from the current tier prices, or past days from the price history with
+--backfill. Re-running a day replaces its rows.
+
+Examples:
+    python manage.py compute_price_index
+    python manage.py compute_price_index --backfill 2025-01-01
+    python manage.py compute_price_index --backfill 2025-01-01 --until 2025-03-31
+"""
+import json
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date
+
+from products import price_index
+
+
+def _date(value):
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise CommandError(f"{value!r} is not a date (YYYY-MM-DD).")
+    return day
+
+
+class Command(BaseCommand):
+    help = "Compute the daily steel price index (p10/p50/p90 per grade, material and incoterm)."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backfill", metavar="FROM", type=_date, help="Recompute the days from this date on.")
+        parser.add_argument("--until", type=_date, help="Last day to backfill (default: yesterday).")
+        parser.add_argument("--chunk-size", type=int, default=10000, help="Price history rows fetched per round trip.")
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        universe = price_index.load_universe()
+        if options["backfill"] is None:
+            if options["until"] is not None:
+                raise CommandError("--until needs --backfill.")
+            report = {str(timezone.localdate()): price_index.compute_today(universe)}
+        else:
+            until = options["until"] or timezone.localdate() - timedelta(days=1)
+            if until < options["backfill"]:
+                raise CommandError("--until is before the backfill start.")
+            days = price_index.backfill(options["backfill"], until, chunk_size=options["chunk_size"], universe=universe)
+            report = {str(day): rows for day, rows in days.items()}
+        summary = {
+            "tiers": len(universe.tier_ids),
+            "days": len(report),
+            "rows": sum(report.values()),
+            "seconds": round(time.monotonic() - started, 2),
+        }
+        if len(report) <= 31:
+            summary["rows_per_day"] = report
+        self.stdout.write(self.style.SUCCESS(json.dumps(summary)))
@@ -0,0 +1,48 @@
+# products/management/commands/export_catalog.py
+"""
+Export the catalog (products, specifications, offers, pricing tiers) as CSV
+or NDJSON to a file or stdout; same output as GET /api/export/products.<fmt>
+(see products.export).
+
+Examples:
+    python manage.py export_catalog --format ndjson --output catalog.ndjson
+    python manage.py export_catalog --format csv --gzip --output catalog.csv.gz
+    python manage.py export_catalog --format csv --active-only | head
+"""
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products import export
+from products.models import Product
+
+
+class Command(BaseCommand):
+    help = "Stream the catalog as CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=("csv", "ndjson"), default="ndjson")
+        parser.add_argument("--output", "-o", default="-", help="Output file, or - for stdout (default).")
+        parser.add_argument("--gzip", action="store_true", help="Gzip-compress the output.")
+        parser.add_argument("--chunk-size", type=int, help="Products per fetch (default: EXPORT_CHUNK_SIZE).")
+        parser.add_argument("--active-only", action="store_true", help="Skip inactive products.")
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.all()
+        if options["active_only"]:
+            queryset = queryset.filter(is_active=True)
+        products = export.iter_products(export.export_queryset(queryset), chunk_size=options["chunk_size"])
+        blocks = export.encode(export.export_lines(options["format"], products), gzip=options["gzip"])
+
+        if options["output"] == "-":
+            stream = sys.stdout.buffer
+            for block in blocks:
+                stream.write(block)
+            stream.flush()
+            return
+        try:
+            with open(options["output"], "wb") as stream:
+                for block in blocks:
+                    stream.write(block)
+        except OSError as exc:
+            raise CommandError(str(exc))
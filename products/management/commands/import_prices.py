@@ -0,0 +1,59 @@
+# products/management/commands/import_prices.py
+"""
+Bulk reprice pricing tiers from a CSV or NDJSON file (or stdin).
+
+Same row format and semantics as POST /api/offers/bulk-prices/ (see
+products.bulk_pricing), without the seller scoping unless --seller is given.
+
+Examples:
+    python manage.py import_prices prices.csv --seller 12
+    python manage.py import_prices prices.ndjson --batch-size 5000
+    zcat prices.csv.gz | python manage.py import_prices - --format csv
+"""
+import json
+import sys
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from products.bulk_pricing import BulkRepricer, parser_for
+from products.models import Seller
+
+
+class Command(BaseCommand):
+    help = "Reprice / upsert pricing tiers in bulk from CSV or NDJSON."
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Input file, or - for stdin.")
+        parser.add_argument("--format", choices=("csv", "ndjson"), help="Input format (default: from the file extension).")
+        parser.add_argument("--seller", type=int, help="Only allow rows of this seller id (rows by product default to it).")
+        parser.add_argument("--batch-size", type=int, help="Rows per transaction (default: BULK_PRICES_BATCH_SIZE).")
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        fmt = options["format"]
+        if fmt is None:
+            suffix = Path(path).suffix.lower()
+            fmt = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}.get(suffix)
+            if fmt is None:
+                raise CommandError("Cannot tell the format from the file name; pass --format csv|ndjson.")
+        if options["seller"] is not None and not Seller.objects.filter(pk=options["seller"]).exists():
+            raise CommandError(f"Seller {options['seller']} does not exist.")
+
+        repricer = BulkRepricer(seller_id=options["seller"], batch_size=options["batch_size"])
+        if path == "-":
+            report = repricer.run(parser_for(fmt)(sys.stdin))
+        else:
+            try:
+                with open(path, encoding="utf-8-sig", newline="") as stream:
+                    report = repricer.run(parser_for(fmt)(stream))
+            except OSError as exc:
+                raise CommandError(str(exc))
+
+        for line in report["error_rows"]:
+            self.stderr.write(f"  line {line['line']}: {line['error']}")
+        if report["errors"] > len(report["error_rows"]):
+            self.stderr.write(f"  ... {report['errors'] - len(report['error_rows'])} more")
+        summary = {key: value for key, value in report.items() if key != "error_rows"}
+        style = self.style.WARNING if report["errors"] else self.style.SUCCESS
+        self.stdout.write(style(json.dumps(summary)))
@@ -0,0 +1,30 @@
+# products/management/commands/recompute_popularity.py
+"""
+Recompute the decayed popularity / trending scores of all products from the
+daily view counts, and delete counts older than POPULARITY_KEEP_DAYS (see
+products.popularity). Run from cron, e.g. every 15 minutes.
+
+Examples:
+    python manage.py recompute_popularity
+    python manage.py recompute_popularity --no-prune
+"""
+from django.core.management.base import BaseCommand
+
+from products import popularity
+
+
+class Command(BaseCommand):
+    help = "Recompute product popularity scores from the daily view counts."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--no-prune", action="store_true", help="Keep old daily counts.")
+        parser.add_argument("--batch-size", type=int, default=1000, help="Scores per upsert statement (default: 1000).")
+
+    def handle(self, *args, **options):
+        # counts buffered by this process (none, unless run in-process) go in first
+        popularity.buffer.flush()
+        updated, removed = popularity.recompute(batch_size=options["batch_size"])
+        pruned = 0 if options["no_prune"] else popularity.prune()
+        self.stdout.write(self.style.SUCCESS(
+            f"Scored {updated} products, removed {removed} stale scores, pruned {pruned} daily counts."
+        ))
@@ -0,0 +1,58 @@
+# products/management/commands/reconcile_seller_stats.py
+"""
+Recompute the dashboard rollups (SellerStats) of every seller, or of the given
+ones, from their offers. The rows are normally refreshed by jobs after each
+write (products.stats); run this periodically (e.g. nightly from cron) to
+repair drift. Reports how many rows were missing or out of date.
+
+Examples:
+    python manage.py reconcile_seller_stats
+    python manage.py reconcile_seller_stats --seller 12 --seller 15
+"""
+import json
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from products import stats
+from products.models import Seller, SellerStats
+
+COMPARED_FIELDS = (
+    "offer_count", "active_offer_count", "product_count", "tier_count", "min_price", "max_price",
+    "price_ranges", "delivery_coverage",
+)
+
+
+class Command(BaseCommand):
+    help = "Recompute seller dashboard statistics and report drift."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--seller", type=int, action="append", help="Only this seller id (repeatable).")
+
+    def handle(self, *args, **options):
+        sellers = Seller.objects.order_by("pk").values_list("pk", flat=True)
+        if options["seller"]:
+            sellers = sellers.filter(pk__in=options["seller"])
+        report = {"sellers": 0, "created": 0, "updated": 0, "unchanged": 0}
+        for seller_id in sellers.iterator(chunk_size=1000):
+            report["sellers"] += 1
+            values = stats.compute(seller_id)
+            current = SellerStats.objects.filter(seller_id=seller_id).first()
+            if current is None:
+                SellerStats.objects.create(seller_id=seller_id, refreshed_at=timezone.now(), **values)
+                report["created"] += 1
+            elif any(self.normalized(getattr(current, name)) != self.normalized(values[name]) for name in COMPARED_FIELDS):
+                for name, value in values.items():
+                    setattr(current, name, value)
+                current.refreshed_at = timezone.now()
+                current.save()
+                report["updated"] += 1
+            else:
+                report["unchanged"] += 1
+        style = self.style.WARNING if report["created"] or report["updated"] else self.style.SUCCESS
+        self.stdout.write(style(json.dumps(report)))
+
+    @staticmethod
+    def normalized(value):
+        # JSON round trip: stored rows have string keys / values, fresh ones Decimals
+        return json.loads(json.dumps(value, default=str))
@@ -8,15 +8,23 @@ Features:
 - --clean option to remove previously created sample data (sellers created by this script, products with names containing '#', standards created by script, categories with sample hscodes).
 - --count option to specify how many products to create (default 30).
 - Uses transactions where appropriate.
+- --scale mode for benchmark-sized datasets (e.g. --scale --count 1000000):
+  rows are generated deterministically from --seed and written with
+  bulk_create in batches of --batch-size, optionally across --workers
+  processes. Offers per product and tiers per offer follow a skewed
+  distribution so query plans resemble production.
 """
 
 from django.core.management.base import BaseCommand, CommandError
 from django.contrib.auth import get_user_model
-from django.db import transaction
+from django.contrib.auth.hashers import make_password
+from django.db import connections, transaction
 from decimal import Decimal
 from django.utils.text import slugify
 from django.utils import timezone
+import multiprocessing
 import random
+import time
 
 from products.models import (
     Seller, ProductCategory, Product, ProductSpecification,
@@ -72,6 +80,124 @@ def create_or_update_spec(product, spec_data):
     ProductSpecification.objects.update_or_create(product=product, defaults=spec_data)
 
 
+# ----- scale mode helpers -----
+# Products generated by --scale carry this marker in their name so they never
+# collide with the small demo rows and are still removed by --clean ('#').
+SCALE_NAME_MARKER = "#S"
+SCALE_SELLER_PREFIX = "seller_scale_"
+
+STEEL_GRADES = ["ST37", "ST52", "A36", "S235", "S355"]
+MATERIAL_TYPES = ["sheet", "rebar", "beam", "pipe", "coil"]
+# bulk_create skips field validation: only the values DeliveryLocation.incoterm accepts
+INCOTERMS = [value for value, _ in DeliveryLocation._meta.get_field("incoterm").choices]
+COUNTRIES = ["Iran", "Turkey", "China", "UAE", "Iraq"]
+CITIES = ["Tehran", "Bandar Abbas", "Shanghai", "Dubai", "Basra"]
+
+# tiers per offer: 1..5 with most offers having one or two bands
+TIER_COUNTS = (1, 2, 3, 4, 5)
+TIER_WEIGHTS = (35, 30, 20, 10, 5)
+TIER_BANDS = [(1, 50), (51, 200), (201, 500), (501, 2000), (2001, None)]
+
+
+def _scale_offer_count(rng, max_offers):
+    """
+    Long-tailed number of offers for one product: ~10% of products have no
+    offer, most have one or two and a few popular ones are offered by many
+    sellers (Pareto tail, capped at the number of sellers).
+    """
+    if rng.random() < 0.1:
+        return 0
+    return min(int(rng.paretovariate(1.5)), max_offers)
+
+
+def _seed_scale_chunk(start, stop, seed, seller_ids, category_ids, standard_ids, batch_size):
+    """
+    Generate and insert products [start, stop) with their specification,
+    offers, pricing tiers and delivery locations.
+
+    The RNG is derived from (seed, start) so a chunk always produces the same
+    rows regardless of how many workers run or in which order chunks finish.
+    Returns (products, offers, tiers) counts.
+    """
+    rng = random.Random(f"{seed}:{start}")
+
+    products = []
+    spec_rows = []
+    for i in range(start, stop):
+        mat = rng.choice(MATERIAL_TYPES)
+        grade = rng.choice(STEEL_GRADES)
+        name = f"{grade} {mat.capitalize()} {SCALE_NAME_MARKER}{i}"
+        products.append(Product(
+            category_id=rng.choice(category_ids),
+            name=name,
+            slug=slugify(name),
+            short_description=f"{mat.capitalize()} {grade} suitable for structural applications. Sample {SCALE_NAME_MARKER}{i}",
+            description=f"{name} - Detailed spec and use cases. Generated benchmark data (seed={seed}).",
+            is_active=rng.random() < 0.95,
+        ))
+        spec_rows.append({
+            "material_type": mat,
+            "steel_grade": grade,
+            "standard_id": rng.choice(standard_ids),
+            "thickness_mm": Decimal(str(round(rng.uniform(2.0, 50.0), 2))),
+            "width_mm": Decimal(str(round(rng.uniform(10.0, 2000.0), 2))),
+            "length_mm": Decimal(str(round(rng.uniform(100.0, 12000.0), 2))),
+            "weight_kg_per_unit": Decimal(str(round(rng.uniform(5.0, 2000.0), 2))),
+            "surface_finish": rng.choice(["black", "galvanized", "painted"]),
+            "manufacturing_process": rng.choice(["hot rolled", "cold rolled", "welded", "seamless"]),
+        })
+
+    with transaction.atomic():
+        Product.objects.bulk_create(products, batch_size=batch_size)
+        ProductSpecification.objects.bulk_create(
+            [ProductSpecification(product=p, **row) for p, row in zip(products, spec_rows)],
+            batch_size=batch_size,
+        )
+
+        offers = []
+        for p in products:
+            for seller_id in rng.sample(seller_ids, _scale_offer_count(rng, len(seller_ids))):
+                offers.append(Offer(product=p, seller_id=seller_id, is_active=rng.random() < 0.9))
+        Offer.objects.bulk_create(offers, batch_size=batch_size)
+
+        tiers = []
+        deliveries = []
+        for offer in offers:
+            base_price = Decimal(rng.randint(400, 900))
+            tier_count = rng.choices(TIER_COUNTS, weights=TIER_WEIGHTS)[0]
+            for idx, (min_q, max_q) in enumerate(TIER_BANDS[:tier_count]):
+                # the last generated band is always open-ended
+                if idx == tier_count - 1:
+                    max_q = None
+                unit_price = max(base_price - Decimal(idx * rng.randint(5, 30)), Decimal("10.00"))
+                tiers.append(PricingTier(
+                    offer=offer,
+                    tier_name=f"Tier {idx + 1}",
+                    unit_price=unit_price,
+                    minimum_quantity=min_q,
+                    maximum_quantity=max_q,
+                    is_negotiable=rng.random() < 0.1,
+                ))
+            for _ in range(rng.choice([1, 1, 2, 3])):
+                city = rng.choice(CITIES)
+                deliveries.append(DeliveryLocation(
+                    offer=offer,
+                    incoterm=rng.choice(INCOTERMS),
+                    country=rng.choice(COUNTRIES),
+                    city=city,
+                    port=f"{city} Port",
+                ))
+        PricingTier.objects.bulk_create(tiers, batch_size=batch_size)
+        DeliveryLocation.objects.bulk_create(deliveries, batch_size=batch_size)
+
+    return len(products), len(offers), len(tiers)
+
+
+def _seed_scale_chunk_star(args):
+    # multiprocessing.Pool.imap passes a single argument
+    return _seed_scale_chunk(*args)
+
+
 # ----- management command -----
 class Command(BaseCommand):
     help = "Seed the database with sample categories, sellers, products, offers, pricing tiers and delivery locations."
@@ -88,6 +214,35 @@ class Command(BaseCommand):
             action="store_true",
             help="If set, remove previously created sample data (sellers created by this script, products with '#', sample categories/standards)."
         )
+        parser.add_argument(
+            "--scale",
+            action="store_true",
+            help="Generate a large benchmark dataset of --count products using batched bulk_create instead of per-row get_or_create."
+        )
+        parser.add_argument(
+            "--seed",
+            type=int,
+            default=None,
+            help="Random seed; the same seed and --count always produce the same rows (default: 42 in --scale mode, random otherwise)."
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Products generated per chunk and rows per INSERT in --scale mode (default: 5000)."
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Number of parallel worker processes in --scale mode (default: 1)."
+        )
+        parser.add_argument(
+            "--sellers",
+            type=int,
+            default=50,
+            help="Number of sellers to spread offers over in --scale mode (default: 50)."
+        )
 
     def handle(self, *args, **options):
         count = options.get("count", 30)
@@ -99,6 +254,19 @@ class Command(BaseCommand):
                 self._clean_sample_data()
                 self.stdout.write(self.style.SUCCESS("Clean complete."))
 
+            if options.get("scale"):
+                self._seed_scale(
+                    count=count,
+                    seed=options["seed"] if options.get("seed") is not None else 42,
+                    batch_size=max(1, options.get("batch_size") or 5000),
+                    workers=max(1, options.get("workers") or 1),
+                    seller_count=max(1, options.get("sellers") or 50),
+                )
+                return
+
+            if options.get("seed") is not None:
+                random.seed(options["seed"])
+
             self.stdout.write(self.style.NOTICE(f"Starting seeding sample data (products={count})..."))
 
             with transaction.atomic():
@@ -206,7 +374,7 @@ class Command(BaseCommand):
                 self.stdout.write(self.style.SUCCESS(f"Created/updated {len(created_products)} products."))
 
                 # --- For each product create offers, tiers, delivery locations ---
-                incoterms = ["FOB", "CIF", "EXW", "DDP"]
+                incoterms = INCOTERMS
                 for p in created_products:
                     # create 1-2 offers
                     offer_count = random.choice([1, 1, 2])
@@ -264,9 +432,100 @@ class Command(BaseCommand):
 
             self.stdout.write(self.style.SUCCESS("Seeding completed successfully."))
 
+        except CommandError:
+            raise
         except Exception as exc:
             raise CommandError(f"Seeding failed: {exc}")
 
+    # ----- scale mode -----
+    def _seed_scale(self, count, seed, batch_size, workers, seller_count):
+        """
+        Bulk-generate `count` products (plus specs, offers, tiers, deliveries).
+        Row contents are fully determined by (seed, count, batch_size); with
+        several workers only the primary keys depend on insert order.
+        """
+        if Product.objects.filter(name__contains=SCALE_NAME_MARKER).exists():
+            raise CommandError("Scale data already exists; run with --clean first.")
+
+        self.stdout.write(self.style.NOTICE(
+            f"Seeding scale dataset: products={count} seed={seed} batch_size={batch_size} workers={workers}"
+        ))
+        started = time.monotonic()
+
+        with transaction.atomic():
+            seller_ids = self._ensure_scale_sellers(seller_count)
+            metals, _ = get_or_create_category(name="Metals & Alloys", parent=None, hscode="7200")
+            steel, _ = get_or_create_category(name="Steel", parent=metals, hscode="7201")
+            categories = [
+                get_or_create_category(name="Carbon Steel", parent=steel, hscode="7202")[0],
+                get_or_create_category(name="Stainless Steel", parent=steel, hscode="7203")[0],
+                get_or_create_category(name="Pipes & Tubes", parent=steel, hscode="7306")[0],
+                get_or_create_category(name="Beams & Profiles", parent=steel, hscode="7208")[0],
+            ]
+            standards = [
+                ProductStandard.objects.get_or_create(name=code, defaults={"description": desc})[0]
+                for code, desc in [("DIN", "Germany Standard"), ("ASTM", "American Standard"), ("EN", "European Norm")]
+            ]
+        category_ids = sorted(c.id for c in categories)
+        standard_ids = sorted(s.id for s in standards)
+
+        chunks = [
+            (start, min(start + batch_size, count + 1), seed, seller_ids, category_ids, standard_ids, batch_size)
+            for start in range(1, count + 1, batch_size)
+        ]
+
+        totals = [0, 0, 0]
+
+        def report(result, done):
+            for idx, value in enumerate(result):
+                totals[idx] += value
+            elapsed = time.monotonic() - started
+            self.stdout.write(
+                f"  chunk {done}/{len(chunks)}: products={totals[0]} offers={totals[1]} tiers={totals[2]} "
+                f"({totals[0] / elapsed if elapsed else 0:.0f} products/s)"
+            )
+
+        if workers > 1 and "fork" in multiprocessing.get_all_start_methods():
+            # forked children must not share the parent's DB sockets
+            connections.close_all()
+            with multiprocessing.get_context("fork").Pool(workers) as pool:
+                for done, result in enumerate(pool.imap_unordered(_seed_scale_chunk_star, chunks), start=1):
+                    report(result, done)
+        else:
+            for done, chunk in enumerate(chunks, start=1):
+                report(_seed_scale_chunk(*chunk), done)
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Scale seeding completed in {time.monotonic() - started:.1f}s: "
+            f"{totals[0]} products, {totals[1]} offers, {totals[2]} pricing tiers."
+        ))
+
+    def _ensure_scale_sellers(self, seller_count):
+        """
+        Create (or reuse) `seller_count` seller users and return their Seller ids
+        ordered by username so the chunk generators see a stable list.
+        """
+        password = make_password("sellerpass")  # hash once; PBKDF2 per user is slow
+        usernames = [f"{SCALE_SELLER_PREFIX}{n}" for n in range(1, seller_count + 1)]
+        existing = set(User.objects.filter(username__in=usernames).values_list("username", flat=True))
+        User.objects.bulk_create([
+            User(username=u, email=f"{u}@example.com", password=password)
+            for u in usernames if u not in existing
+        ])
+        users = User.objects.filter(username__in=usernames).order_by("username")
+        have_seller = set(Seller.objects.filter(user__in=users).values_list("user_id", flat=True))
+        Seller.objects.bulk_create([
+            Seller(
+                user=user,
+                company_name=f"Scale Steel {user.username[len(SCALE_SELLER_PREFIX):]}",
+                business_type="Supplier",
+                location=random.Random(user.username).choice(["Tehran", "Isfahan", "Tabriz"]),
+                is_verified=True,
+            )
+            for user in users if user.id not in have_seller
+        ])
+        return list(Seller.objects.filter(user__in=users).order_by("user__username").values_list("id", flat=True))
+
     # ----- cleaning helper -----
     def _clean_sample_data(self):
         """
@@ -280,7 +539,7 @@ class Command(BaseCommand):
         """
         # sellers/users
         usernames = ["seller_kaveh", "seller_mobarakeh", "seller_persia"]
-        users = User.objects.filter(username__in=usernames)
+        users = User.objects.filter(username__in=usernames) | User.objects.filter(username__startswith=SCALE_SELLER_PREFIX)
         # remove sellers pointing to these users
         Seller.objects.filter(user__in=users).delete()
         # delete the users themselves
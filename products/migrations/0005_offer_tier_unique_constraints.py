@@ -0,0 +1,61 @@
+# Generated by Django 5.2.18 on 2026-10-19 00:57
+
+from django.db import migrations, models
+from django.db.models import Count, Min
+
+
+def merge_duplicate_offers(apps, schema_editor):
+    # keep the oldest offer per (product, seller) and move the tiers/delivery options of the others to it
+    Offer = apps.get_model('products', 'Offer')
+    PricingTier = apps.get_model('products', 'PricingTier')
+    DeliveryLocation = apps.get_model('products', 'DeliveryLocation')
+    duplicates = (
+        Offer.objects.values('product_id', 'seller_id')
+        .annotate(n=Count('id'), keep=Min('id'))
+        .filter(n__gt=1)
+    )
+    for row in duplicates:
+        others = list(
+            Offer.objects.filter(product_id=row['product_id'], seller_id=row['seller_id'])
+            .exclude(pk=row['keep'])
+            .values_list('pk', flat=True)
+        )
+        PricingTier.objects.filter(offer_id__in=others).update(offer_id=row['keep'])
+        DeliveryLocation.objects.filter(offer_id__in=others).update(offer_id=row['keep'])
+        Offer.objects.filter(pk__in=others).delete()
+
+
+def rename_duplicate_tiers(apps, schema_editor):
+    # tier names must be unique per offer; suffix the newer duplicates instead of dropping prices
+    PricingTier = apps.get_model('products', 'PricingTier')
+    duplicates = (
+        PricingTier.objects.values('offer_id', 'tier_name')
+        .annotate(n=Count('id'), keep=Min('id'))
+        .filter(n__gt=1)
+    )
+    for row in duplicates:
+        tiers = PricingTier.objects.filter(offer_id=row['offer_id'], tier_name=row['tier_name']).exclude(pk=row['keep'])
+        for tier in tiers:
+            suffix = f' #{tier.pk}'
+            tier.tier_name = tier.tier_name[:100 - len(suffix)] + suffix
+            tier.save(update_fields=['tier_name'])
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0004_alter_offer_created_at_alter_product_created_at_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(merge_duplicate_offers, migrations.RunPython.noop),
+        migrations.RunPython(rename_duplicate_tiers, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='offer',
+            constraint=models.UniqueConstraint(fields=('product', 'seller'), name='products_offer_product_seller_uniq'),
+        ),
+        migrations.AddConstraint(
+            model_name='pricingtier',
+            constraint=models.UniqueConstraint(fields=('offer', 'tier_name'), name='products_pricingtier_offer_tier_uniq'),
+        ),
+    ]
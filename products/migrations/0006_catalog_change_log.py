@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:03
+
+import products.models
+from django.db import migrations, models
+
+SEED_BATCH = 5000
+
+
+def seed_change_log(apps, schema_editor):
+    # one upsert entry per existing row, so since=0 is a full snapshot for new consumers
+    CatalogChange = apps.get_model('products', 'CatalogChange')
+    entities = [
+        ('Seller', 'seller'), ('Product', 'product'), ('ProductSpecification', 'specification'),
+        ('Offer', 'offer'), ('PricingTier', 'pricing_tier'), ('DeliveryLocation', 'delivery_location'),
+    ]
+    for model_name, entity in entities:
+        ids = apps.get_model('products', model_name).objects.order_by('pk').values_list('pk', flat=True)
+        batch = []
+        for pk in ids.iterator(chunk_size=SEED_BATCH):
+            batch.append(CatalogChange(entity=entity, object_id=pk, op='upsert'))
+            if len(batch) >= SEED_BATCH:
+                CatalogChange.objects.bulk_create(batch)
+                batch = []
+        CatalogChange.objects.bulk_create(batch)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0005_offer_tier_unique_constraints'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='offer',
+            name='updated_at',
+            field=products.models.JalaliDateTimeField(auto_now=True),
+        ),
+        migrations.AddField(
+            model_name='pricingtier',
+            name='updated_at',
+            field=products.models.JalaliDateTimeField(auto_now=True),
+        ),
+        migrations.CreateModel(
+            name='CatalogChange',
+            fields=[
+                ('seq', models.BigAutoField(primary_key=True, serialize=False)),
+                ('entity', models.CharField(max_length=30)),
+                ('object_id', models.BigIntegerField()),
+                ('op', models.CharField(choices=[('upsert', 'upsert'), ('delete', 'delete')], max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['entity', 'object_id', 'seq'], name='products_change_row_idx')],
+            },
+        ),
+        migrations.RunPython(seed_change_log, migrations.RunPython.noop),
+    ]
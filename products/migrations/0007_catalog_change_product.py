@@ -0,0 +1,33 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:06
+
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_product_ids(apps, schema_editor):
+    CatalogChange = apps.get_model('products', 'CatalogChange')
+    CatalogChange.objects.filter(entity='product').update(product_id=models.F('object_id'))
+    for entity, model_name, path in [
+        ('specification', 'ProductSpecification', 'product_id'),
+        ('offer', 'Offer', 'product_id'),
+        ('pricing_tier', 'PricingTier', 'offer__product_id'),
+        ('delivery_location', 'DeliveryLocation', 'offer__product_id'),
+    ]:
+        rows = apps.get_model('products', model_name).objects.filter(pk=OuterRef('object_id')).values(path)[:1]
+        CatalogChange.objects.filter(entity=entity).update(product_id=Subquery(rows))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_catalog_change_log'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='catalogchange',
+            name='product_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_product_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,48 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:09
+
+import django.db.models.deletion
+from django.db import migrations, models
+from django.db.models import OuterRef, Subquery
+
+
+def backfill_seller_ids(apps, schema_editor):
+    CatalogChange = apps.get_model('products', 'CatalogChange')
+    CatalogChange.objects.filter(entity='seller').update(seller_id=models.F('object_id'))
+    for entity, model_name, path in [
+        ('offer', 'Offer', 'seller_id'),
+        ('pricing_tier', 'PricingTier', 'offer__seller_id'),
+        ('delivery_location', 'DeliveryLocation', 'offer__seller_id'),
+    ]:
+        rows = apps.get_model('products', model_name).objects.filter(pk=OuterRef('object_id')).values(path)[:1]
+        CatalogChange.objects.filter(entity=entity).update(seller_id=Subquery(rows))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0007_catalog_change_product'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SellerStats',
+            fields=[
+                ('seller', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='products.seller')),
+                ('offer_count', models.PositiveIntegerField(default=0)),
+                ('active_offer_count', models.PositiveIntegerField(default=0)),
+                ('product_count', models.PositiveIntegerField(default=0)),
+                ('tier_count', models.PositiveIntegerField(default=0)),
+                ('min_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('max_price', models.DecimalField(blank=True, decimal_places=2, max_digits=12, null=True)),
+                ('price_ranges', models.JSONField(blank=True, default=dict)),
+                ('delivery_coverage', models.JSONField(blank=True, default=dict)),
+                ('refreshed_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='catalogchange',
+            name='seller_id',
+            field=models.BigIntegerField(blank=True, null=True),
+        ),
+        migrations.RunPython(backfill_seller_ids, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:12
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0008_seller_stats'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductPopularity',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='popularity_score', serialize=False, to='products.product')),
+                ('score', models.FloatField(db_index=True, default=0)),
+                ('trending', models.FloatField(db_index=True, default=0)),
+                ('views', models.PositiveBigIntegerField(default=0)),
+                ('computed_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ProductViewCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('views', models.PositiveBigIntegerField(default=0)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='view_counts', to='products.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='products_viewcount_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('product', 'day'), name='products_viewcount_product_day_uniq')],
+            },
+        ),
+    ]
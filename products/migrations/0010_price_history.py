@@ -0,0 +1,62 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:17
+
+import django.utils.timezone
+from django.db import migrations, models
+
+SEED_BATCH = 5000
+
+
+def seed_price_history(apps, schema_editor):
+    # the current price of every tier as the first point of its history
+    PricingTier = apps.get_model('products', 'PricingTier')
+    PriceHistory = apps.get_model('products', 'PriceHistory')
+    now = django.utils.timezone.now()
+    tiers = PricingTier.objects.order_by('pk').values_list('pk', 'offer_id', 'offer__product_id', 'offer__seller_id', 'unit_price')
+    batch = []
+    for pk, offer_id, product_id, seller_id, unit_price in tiers.iterator(chunk_size=SEED_BATCH):
+        batch.append(PriceHistory(tier_id=pk, offer_id=offer_id, product_id=product_id, seller_id=seller_id,
+                                  unit_price=unit_price, recorded_at=now))
+        if len(batch) >= SEED_BATCH:
+            PriceHistory.objects.bulk_create(batch)
+            batch = []
+    PriceHistory.objects.bulk_create(batch)
+
+
+def create_brin_index(apps, schema_editor):
+    # time-ordered appends: a BRIN index covers time range scans (the price index job) at a few pages
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(
+            'CREATE INDEX products_pricehist_time_brin ON products_pricehistory USING brin (recorded_at)'
+        )
+
+
+def drop_brin_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute('DROP INDEX IF EXISTS products_pricehist_time_brin')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0009_product_popularity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceHistory',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('tier_id', models.BigIntegerField()),
+                ('offer_id', models.BigIntegerField()),
+                ('product_id', models.BigIntegerField()),
+                ('seller_id', models.BigIntegerField()),
+                ('unit_price', models.DecimalField(decimal_places=2, max_digits=12)),
+                ('recorded_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['product_id', 'recorded_at'], name='products_pricehist_product_idx'), models.Index(fields=['tier_id', 'id'], name='products_pricehist_tier_idx')],
+            },
+        ),
+        migrations.RunPython(create_brin_index, drop_brin_index),
+        migrations.RunPython(seed_price_history, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 5.2.18 on 2026-10-19 01:19
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_price_history'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PriceIndex',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField()),
+                ('steel_grade', models.CharField(max_length=50)),
+                ('material_type', models.CharField(max_length=100)),
+                ('incoterm', models.CharField(max_length=10)),
+                ('offers', models.PositiveIntegerField()),
+                ('p10', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('p50', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('p90', models.DecimalField(decimal_places=2, max_digits=14)),
+                ('computed_at', models.DateTimeField()),
+            ],
+            options={
+                'indexes': [models.Index(fields=['day'], name='products_priceindex_day_idx')],
+                'constraints': [models.UniqueConstraint(fields=('steel_grade', 'material_type', 'incoterm', 'day'), name='products_priceindex_series_day_uniq')],
+            },
+        ),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.conf import settings
 from mptt.models import MPTTModel, TreeForeignKey
+from django.utils import timezone
 from django.utils.text import slugify
 
 # Optional Jalali support using the `jdatetime` package
@@ -155,6 +156,13 @@ class Offer(models.Model):
     seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name="offers")
     is_active = models.BooleanField(default=True)
     created_at = JalaliDateTimeField(auto_now_add=True)
+    updated_at = JalaliDateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # one offer per seller and product; bulk price imports upsert on it
+            models.UniqueConstraint(fields=["product", "seller"], name="products_offer_product_seller_uniq"),
+        ]
 
     def __str__(self):
         return f"{self.product.name} - by {self.seller.company_name}"
@@ -168,6 +176,13 @@ class PricingTier(models.Model):
     minimum_quantity = models.IntegerField()
     maximum_quantity = models.IntegerField(null=True, blank=True)
     is_negotiable = models.BooleanField(default=False)
+    updated_at = JalaliDateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            # tiers are addressed by name within an offer (bulk price imports upsert on it)
+            models.UniqueConstraint(fields=["offer", "tier_name"], name="products_pricingtier_offer_tier_uniq"),
+        ]
 
     def __str__(self):
         return f"{self.offer.product.name} - {self.tier_name}"
@@ -195,3 +210,128 @@ class ProductDocument(models.Model):
     product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='documents')
     title = models.CharField(max_length=255)
     file = models.FileField(upload_to='products/documents/')
+
+
+# ----------- بازدید و محبوبیت محصول -----------
+class ProductViewCount(models.Model):
+    """Views of a product per day, written in aggregated batches; see products/popularity.py."""
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name="view_counts")
+    day = models.DateField()
+    views = models.PositiveBigIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            # flushes upsert on it (views = views + batch)
+            models.UniqueConstraint(fields=["product", "day"], name="products_viewcount_product_day_uniq"),
+        ]
+        indexes = [models.Index(fields=["day"], name="products_viewcount_day_idx")]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.day}: {self.views}"
+
+
+class ProductPopularity(models.Model):
+    """Decayed view scores of a product, recomputed in bulk (`manage.py recompute_popularity`)."""
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name="popularity_score")
+    score = models.FloatField(default=0, db_index=True)      # "most viewed": POPULARITY_HALF_LIFE_DAYS
+    trending = models.FloatField(default=0, db_index=True)   # "trending": POPULARITY_TRENDING_HALF_LIFE_DAYS
+    views = models.PositiveBigIntegerField(default=0)        # raw views inside POPULARITY_WINDOW_DAYS
+    computed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.product_id}: {self.score:.2f}"
+
+
+# ----------- تاریخچهٔ قیمت -----------
+class PriceHistory(models.Model):
+    """Append-only unit prices of pricing tiers, one row per change; see products/price_history.py."""
+    id = models.BigAutoField(primary_key=True)
+    # plain ids: the history outlives deleted tiers and offers
+    tier_id = models.BigIntegerField()
+    offer_id = models.BigIntegerField()
+    product_id = models.BigIntegerField()
+    seller_id = models.BigIntegerField()
+    unit_price = models.DecimalField(max_digits=12, decimal_places=2)
+    recorded_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        # plus a BRIN index on recorded_at on PostgreSQL (migration 0010): rows are appended in time order
+        indexes = [
+            models.Index(fields=["product_id", "recorded_at"], name="products_pricehist_product_idx"),
+            # the last recorded price of a tier (skip unchanged prices)
+            models.Index(fields=["tier_id", "id"], name="products_pricehist_tier_idx"),
+        ]
+
+    def __str__(self):
+        return f"tier {self.tier_id} @ {self.recorded_at}: {self.unit_price}"
+
+
+# ----------- شاخص روزانهٔ قیمت بازار -----------
+class PriceIndex(models.Model):
+    """Daily price per tonne percentiles of one (grade, material, incoterm); see products/price_index.py."""
+    day = models.DateField()
+    steel_grade = models.CharField(max_length=50)       # normalized: ST37, S235JR
+    material_type = models.CharField(max_length=100)
+    incoterm = models.CharField(max_length=10)
+    offers = models.PositiveIntegerField()
+    p10 = models.DecimalField(max_digits=14, decimal_places=2)
+    p50 = models.DecimalField(max_digits=14, decimal_places=2)
+    p90 = models.DecimalField(max_digits=14, decimal_places=2)
+    computed_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            # one row per series and day; also serves the series charts (day ranges)
+            models.UniqueConstraint(
+                fields=["steel_grade", "material_type", "incoterm", "day"], name="products_priceindex_series_day_uniq"
+            ),
+        ]
+        indexes = [models.Index(fields=["day"], name="products_priceindex_day_idx")]
+
+    def __str__(self):
+        return f"{self.day} {self.steel_grade} {self.material_type} {self.incoterm}: {self.p50}"
+
+
+# ----------- آمار تجمیعی فروشنده (داشبورد) -----------
+class SellerStats(models.Model):
+    """Per-seller dashboard rollup, recomputed from the seller's offers; see products/stats.py."""
+    seller = models.OneToOneField(Seller, on_delete=models.CASCADE, primary_key=True, related_name="stats")
+    offer_count = models.PositiveIntegerField(default=0)
+    active_offer_count = models.PositiveIntegerField(default=0)
+    product_count = models.PositiveIntegerField(default=0)
+    tier_count = models.PositiveIntegerField(default=0)
+    min_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    max_price = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True)
+    # {product_id: {"offers", "active_offers", "tiers", "min_price", "max_price"}}
+    price_ranges = models.JSONField(default=dict, blank=True)
+    # {incoterm: {"offers", "countries": [...]}}
+    delivery_coverage = models.JSONField(default=dict, blank=True)
+    refreshed_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"Stats of seller {self.seller_id}"
+
+
+# ----------- لاگ تغییرات کاتالوگ (delta sync) -----------
+class CatalogChange(models.Model):
+    """Append-only log of catalog row changes, see products/changes.py."""
+    UPSERT = "upsert"
+    DELETE = "delete"
+
+    seq = models.BigAutoField(primary_key=True)
+    entity = models.CharField(max_length=30)  # product, offer, pricing_tier, ...
+    object_id = models.BigIntegerField()
+    # product / seller the row belongs to (live updates, seller stats); None when it has none
+    product_id = models.BigIntegerField(null=True, blank=True)
+    seller_id = models.BigIntegerField(null=True, blank=True)
+    op = models.CharField(max_length=10, choices=[(UPSERT, "upsert"), (DELETE, "delete")])
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            # compaction looks up the later entries of a row
+            models.Index(fields=["entity", "object_id", "seq"], name="products_change_row_idx"),
+        ]
+
+    def __str__(self):
+        return f"#{self.seq} {self.op} {self.entity} {self.object_id}"
@@ -1,6 +1,24 @@
 # products/permissions.py
 from rest_framework import permissions
 
+
+# request.user is usually an accounts.authentication.ClaimsUser built from the JWT:
+# seller_id and role come from the token, so these checks need no queries.
+# Session/basic auth users (admin, browsable API) fall back to the database.
+def user_seller_id(user):
+    """Seller pk of the user, or None."""
+    if hasattr(user, "token"):
+        return user.seller_id
+    seller = getattr(user, "seller_profile", None)
+    return seller.pk if seller is not None else None
+
+
+def user_role(user):
+    if hasattr(user, "token"):
+        return user.role
+    profile = getattr(user, "profile", None)
+    return profile.role if profile is not None else None
+
 class IsAdminOrReadOnly(permissions.BasePermission):
     """
     خواندن برای همه. نوشتن فقط برای staff / superuser.
@@ -36,21 +54,11 @@ class HasSellerProfile(permissions.BasePermission):
             return False
 
         # 1) explicit seller model (seller_profile) exists
-        if hasattr(user, "seller_profile"):
+        if user_seller_id(user) is not None:
             return True
 
         # 2) profile.role allows seller actions
-        profile = getattr(user, "profile", None)
-        if profile is not None:
-            # profile.Role might be an enum-like class on Profile
-            try:
-                role_value = profile.role
-            except Exception:
-                role_value = None
-            if role_value in ("SELLER", "BOTH"):
-                return True
-
-        return False
+        return user_role(user) in ("SELLER", "BOTH")
 
 
 class IsOfferOwner(permissions.BasePermission):
@@ -70,35 +78,21 @@ class IsOfferOwner(permissions.BasePermission):
         if user and (user.is_staff or user.is_superuser):
             return True
 
-        # Find seller (robustly)
-        seller = None
+        # Find the owning seller id without loading the seller row
+        seller_id = None
 
-        # Direct Offer model with seller attribute
-        if hasattr(obj, "seller"):
-            seller = getattr(obj, "seller", None)
+        # Direct Offer model with seller FK
+        if hasattr(obj, "seller_id"):
+            seller_id = obj.seller_id
         # Models linked to an offer (PricingTier, DeliveryLocation, etc.)
         elif hasattr(obj, "offer"):
             offer = getattr(obj, "offer", None)
             if offer is not None:
-                seller = getattr(offer, "seller", None)
-        # Sometimes obj could be PricingTier with .offer attribute -> covered above
+                seller_id = offer.seller_id
 
-        if not seller:
+        if seller_id is None:
             return False
-
-        # Compare either by seller.user or by seller instance equality with request.user.seller_profile
-        try:
-            # if seller has a user FK
-            if hasattr(seller, "user") and seller.user == user:
-                return True
-        except Exception:
-            pass
-
-        # or compare seller object with request.user.seller_profile
-        if hasattr(user, "seller_profile") and user.seller_profile == seller:
-            return True
-
-        return False
+        return seller_id == user_seller_id(user)
 
 
 class IsSellerOwnerOrAdmin(permissions.BasePermission):
@@ -121,5 +115,5 @@ class IsSellerOwnerOrAdmin(permissions.BasePermission):
             return True
 
         # obj expected to be Seller instance with 'user' FK
-        owner_user = getattr(obj, "user", None)
-        return owner_user == user
+        owner_id = getattr(obj, "user_id", None)
+        return owner_id is not None and owner_id == user.pk
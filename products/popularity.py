@@ -0,0 +1,199 @@
+# products/popularity.py
+"""
+Product view counters and popularity scores.
+
+Counting: every successful product detail read (ProductViewSet.retrieve and
+the async detail view) calls `record_view()`, which only increments an
+in-process counter. A daemon thread per process flushes the counters every
+POPULARITY_FLUSH_INTERVAL seconds (or sooner when POPULARITY_BUFFER_MAX
+products are pending) as one aggregated upsert into ProductViewCount:
+
+    INSERT ... ON CONFLICT (product_id, day) DO UPDATE SET views = views + excluded.views
+
+so a popular product costs one row write per flush and process instead of a
+row lock per view. Counts of a process that dies between flushes are lost
+(at most one interval); a failed flush puts its counts back in the buffer.
+
+Scoring: `manage.py recompute_popularity` (cron, e.g. every 15 minutes)
+recomputes ProductPopularity for all products in bulk from the last
+POPULARITY_WINDOW_DAYS days of counts, each day weighted by
+0.5 ** (age_days / half_life):
+- score:    half life POPULARITY_HALF_LIFE_DAYS ("most viewed")
+- trending: half life POPULARITY_TRENDING_HALF_LIFE_DAYS ("trending")
+
+Products and summaries accept ordering=-popularity / -trending (most popular
+first); the scores are joined only when ordering by them.
+"""
+import atexit
+import logging
+import math
+import threading
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Case, F, FloatField, Sum, Value, When
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import Product, ProductPopularity, ProductViewCount
+
+logger = logging.getLogger(__name__)
+
+ORDERING_FIELDS = ("popularity", "trending")
+
+
+# ---------------- counting ----------------
+class ViewCounterBuffer:
+    """Per-process {(product_id, day): views} buffer with a background flusher."""
+
+    def __init__(self):
+        self._counts = Counter()
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread = None
+
+    def add(self, product_id, views=1):
+        with self._lock:
+            self._counts[(product_id, timezone.localdate())] += views
+            pending = len(self._counts)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="view-counter-flusher", daemon=True)
+                self._thread.start()
+                atexit.register(self.flush)
+        if pending >= getattr(settings, "POPULARITY_BUFFER_MAX", 10000):
+            self._wakeup.set()
+
+    def take(self):
+        with self._lock:
+            counts, self._counts = self._counts, Counter()
+        return counts
+
+    def put_back(self, counts):
+        with self._lock:
+            self._counts.update(counts)
+
+    def flush(self):
+        """Write the buffered counts; returns the number of (product, day) rows written."""
+        counts = self.take()
+        if not counts:
+            return 0
+        try:
+            write_counts(counts)
+        except Exception:
+            logger.exception("Could not flush %d product view counters; keeping them for the next flush", len(counts))
+            self.put_back(counts)
+            return 0
+        return len(counts)
+
+    def _run(self):
+        while True:
+            self._wakeup.wait(getattr(settings, "POPULARITY_FLUSH_INTERVAL", 10))
+            self._wakeup.clear()
+            close_old_connections()
+            try:
+                self.flush()
+            finally:
+                close_old_connections()
+
+
+buffer = ViewCounterBuffer()
+
+
+def record_view(product_id):
+    """Count one view of the product (in memory; never queries or raises)."""
+    if not getattr(settings, "POPULARITY_TRACKING", True):
+        return
+    try:
+        buffer.add(int(product_id))
+    except (TypeError, ValueError):
+        pass
+
+
+def write_counts(counts, batch_size=1000):
+    """Add {(product_id, day): views} to ProductViewCount with upserts that increment."""
+    table = connection.ops.quote_name(ProductViewCount._meta.db_table)
+    # products deleted since the view was counted are skipped (no FK violation)
+    existing = set(Product.objects.filter(pk__in={pk for pk, _ in counts}).values_list("pk", flat=True))
+    rows = [(pk, day, views) for (pk, day), views in sorted(counts.items()) if pk in existing]
+    with transaction.atomic():
+        with connection.cursor() as cursor:
+            for start in range(0, len(rows), batch_size):
+                batch = rows[start:start + batch_size]
+                placeholders = ", ".join(["(%s, %s, %s)"] * len(batch))
+                cursor.execute(
+                    f"INSERT INTO {table} (product_id, day, views) VALUES {placeholders} "
+                    f"ON CONFLICT (product_id, day) DO UPDATE SET views = {table}.views + excluded.views",
+                    [value for row in batch for value in row],
+                )
+
+
+# ---------------- scoring ----------------
+def _weights(today, window_days, half_life):
+    return {today - timedelta(days=age): math.pow(0.5, age / half_life) for age in range(window_days)}
+
+
+def _decayed_sum(weights):
+    return Sum(
+        Case(*[When(day=day, then=Value(weight)) for day, weight in weights.items()], default=Value(0.0),
+             output_field=FloatField()) * F("views"),
+        output_field=FloatField(),
+    )
+
+
+def recompute(batch_size=1000):
+    """Recompute ProductPopularity of every product with views in the window; returns (updated, removed)."""
+    today = timezone.localdate()
+    window = getattr(settings, "POPULARITY_WINDOW_DAYS", 30)
+    score_weights = _weights(today, window, getattr(settings, "POPULARITY_HALF_LIFE_DAYS", 7))
+    trending_weights = _weights(today, window, getattr(settings, "POPULARITY_TRENDING_HALF_LIFE_DAYS", 1))
+    started = timezone.now()
+
+    rows = (
+        ProductViewCount.objects.filter(day__gt=today - timedelta(days=window), day__lte=today)
+        .values("product_id")
+        .annotate(views_total=Sum("views"), score=_decayed_sum(score_weights), trending=_decayed_sum(trending_weights))
+        .order_by("product_id")
+    )
+    updated, batch = 0, []
+    for row in rows.iterator(chunk_size=batch_size):
+        batch.append(ProductPopularity(
+            product_id=row["product_id"], score=row["score"] or 0, trending=row["trending"] or 0,
+            views=row["views_total"] or 0, computed_at=started,
+        ))
+        if len(batch) >= batch_size:
+            updated += _upsert(batch)
+            batch = []
+    updated += _upsert(batch)
+    # products without views in the window drop out of the rails
+    removed, _ = ProductPopularity.objects.filter(computed_at__lt=started).delete()
+    return updated, removed
+
+
+def _upsert(rows):
+    if rows:
+        ProductPopularity.objects.bulk_create(
+            rows, update_conflicts=True, unique_fields=["product"],
+            update_fields=["score", "trending", "views", "computed_at"],
+        )
+    return len(rows)
+
+
+def prune(keep_days=None):
+    """Delete daily counts older than POPULARITY_KEEP_DAYS; returns the number of rows deleted."""
+    keep_days = keep_days or getattr(settings, "POPULARITY_KEEP_DAYS", 90)
+    deleted, _ = ProductViewCount.objects.filter(day__lt=timezone.localdate() - timedelta(days=keep_days)).delete()
+    return deleted
+
+
+# ---------------- ordering ----------------
+def annotate_for_ordering(queryset, request):
+    """Join the scores only when ?ordering= asks for them (OrderingFilter then sorts on the annotation)."""
+    ordering = request.query_params.get("ordering", "") if request is not None else ""
+    terms = {term.strip().lstrip("-") for term in ordering.split(",")}
+    if "popularity" in terms:
+        queryset = queryset.annotate(popularity=Coalesce("popularity_score__score", Value(0.0)))
+    if "trending" in terms:
+        queryset = queryset.annotate(trending=Coalesce("popularity_score__trending", Value(0.0)))
+    return queryset
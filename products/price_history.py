@@ -0,0 +1,97 @@
+# products/price_history.py
+"""
+Price history of pricing tiers (PriceHistory) and the chart endpoint
+GET /api/products/<id>/price-history/?bucket=day|week (ProductViewSet.price_history).
+
+Recording: products.changes.record() calls `record_prices()` for every tier
+upsert it logs, in the writing transaction, so single saves, offer writes
+(OfferWriteSerializer) and bulk reprices (products.bulk_pricing) are all
+covered. Two statements per call: the tiers whose price differs from their
+last recorded one are read together with their owners, then appended with
+bulk_create. Unchanged prices (a tier saved for its quantities) add nothing.
+Deleting a tier keeps its history.
+
+The table is narrow (ids, price, timestamp) and append-only, so rows are
+physically in time order: on PostgreSQL a BRIN index on recorded_at (a few
+pages for years of rows) serves time range scans, and a (product_id,
+recorded_at) B-tree serves the per-product charts.
+
+Charts: `bucket_stats()` reads the product's points with the bucket
+truncated in SQL (TIME_ZONE days, weeks starting Monday) and sorted by
+(bucket, price), then computes count/min/median/max of every bucket at once
+with NumPy index arithmetic over the sorted arrays.
+"""
+from datetime import datetime, time, timedelta
+
+import numpy as np
+from django.db.models import F, OuterRef, Q, Subquery
+from django.db.models.functions import TruncDay, TruncWeek
+from django.utils import timezone
+
+from .models import PriceHistory, PricingTier
+
+BUCKETS = {"day": TruncDay, "week": TruncWeek}
+
+
+def record_prices(tier_ids, using=None):
+    """Append the current price of the tiers in `tier_ids` whose price changed since their last entry."""
+    if not tier_ids:
+        return 0
+    last_price = PriceHistory.objects.using(using).filter(tier_id=OuterRef("pk")).order_by("-id").values("unit_price")[:1]
+    changed = (
+        PricingTier.objects.using(using).filter(pk__in=list(tier_ids))
+        .annotate(last_price=Subquery(last_price))
+        .filter(Q(last_price__isnull=True) | ~Q(unit_price=F("last_price")))
+        .values_list("pk", "offer_id", "offer__product_id", "offer__seller_id", "unit_price")
+    )
+    rows = [
+        PriceHistory(tier_id=pk, offer_id=offer_id, product_id=product_id, seller_id=seller_id, unit_price=unit_price)
+        for pk, offer_id, product_id, seller_id, unit_price in changed
+    ]
+    PriceHistory.objects.using(using).bulk_create(rows)
+    return len(rows)
+
+
+def bucket_stats(product_id, bucket="day", since=None, until=None, seller_id=None):
+    """
+    [{"bucket": date, "count", "min", "median", "max"}] of the product's recorded
+    prices per bucket, oldest first; `since` / `until` are inclusive dates.
+    """
+    points = PriceHistory.objects.filter(product_id=product_id)
+    if seller_id is not None:
+        points = points.filter(seller_id=seller_id)
+    # bounds as timestamps, so the range is an index range on recorded_at
+    if since is not None:
+        points = points.filter(recorded_at__gte=timezone.make_aware(datetime.combine(since, time.min)))
+    if until is not None:
+        points = points.filter(recorded_at__lt=timezone.make_aware(datetime.combine(until + timedelta(days=1), time.min)))
+    points = points.annotate(bucket=BUCKETS[bucket]("recorded_at"))
+    rows = list(points.order_by("bucket", "unit_price").values_list("bucket", "unit_price"))
+    if not rows:
+        return []
+
+    buckets = np.array(
+        [value.date() if isinstance(value, datetime) else value for value, _ in rows], dtype="datetime64[D]"
+    )
+    prices = np.fromiter((price for _, price in rows), dtype=np.float64, count=len(rows))
+    # rows are sorted by (bucket, price): every bucket is a sorted run of prices
+    is_start = np.ones(len(rows), dtype=bool)
+    is_start[1:] = buckets[1:] != buckets[:-1]
+    starts = np.flatnonzero(is_start)
+    counts = np.diff(np.append(starts, len(rows)))
+    minimums = prices[starts]
+    maximums = prices[starts + counts - 1]
+    medians = (prices[starts + (counts - 1) // 2] + prices[starts + counts // 2]) / 2
+    return [
+        {
+            "bucket": buckets[start].item(),
+            "count": int(count),
+            # amounts as strings with 2 decimals, like the price fields of the API
+            "min": f"{low:.2f}",
+            "median": f"{median:.2f}",
+            "max": f"{high:.2f}",
+        }
+        for start, count, low, median, high in zip(
+            starts.tolist(), counts.tolist(), minimums.tolist(), medians.tolist(), maximums.tolist()
+        )
+    ]
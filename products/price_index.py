@@ -0,0 +1,265 @@
+# products/price_index.py
+"""
+Daily market price index (PriceIndex): p10 / p50 / p90 of the price per tonne
+and the number of offers, per (steel grade, material type, incoterm, day),
+served by GET /api/price-index/ (products.views.PriceIndexView).
+
+Computed in batch by `manage.py compute_price_index` (cron, e.g. daily at
+23:50 for today's prices), never on request:
+
+- the candidate tiers (active offers of active products whose specification
+  has a weight per unit) are read once with their grade, material and
+  weight, plus the incoterms each offer delivers under;
+- each offer contributes one price per incoterm it offers: its base tier
+  (lowest minimum quantity), converted to a price per tonne with
+  weight_kg_per_unit. Offers without delivery options are left out;
+- grouping and percentiles (linear interpolation, like numpy.percentile) are
+  computed with NumPy over the sorted arrays of all groups at once.
+  Series with fewer than PRICE_INDEX_MIN_OFFERS offers are not published.
+
+Today's index uses the current tier prices. `--backfill FROM` recomputes
+past days from the price history (products.price_history) in one stream of
+PriceHistory rows ordered by time, replaying the prices per tier and
+snapshotting them at the end of every day. Grades, materials, weights,
+incoterms and which offers are active are not historized: the backfill uses
+their current values and the tiers that still exist. Days before the price
+history was introduced have no data.
+
+Grades are normalized (case, spaces and dashes ignored: "St 37" -> "ST37");
+the read endpoint normalizes its steel_grade filter the same way.
+"""
+import bisect
+from dataclasses import dataclass
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import DeliveryLocation, PriceHistory, PriceIndex, PricingTier
+
+PERCENTILES = {"p10": 0.10, "p50": 0.50, "p90": 0.90}
+CENT = Decimal("0.01")
+
+
+def grade_key(grade):
+    return "".join((grade or "").split()).replace("-", "").upper()
+
+
+def day_end(day):
+    """Start of the next day in TIME_ZONE: the index of `day` uses the prices in effect then."""
+    return timezone.make_aware(datetime.combine(day + timedelta(days=1), time.min))
+
+
+@dataclass
+class Universe:
+    """Column arrays of the candidate tiers (sorted by tier id) and the (offer, incoterm) pairs."""
+    tier_ids: np.ndarray
+    offer_ids: np.ndarray
+    minimum_quantities: np.ndarray
+    current_prices: np.ndarray
+    weights: np.ndarray
+    grade_codes: np.ndarray
+    material_codes: np.ndarray
+    grades: np.ndarray
+    materials: np.ndarray
+    pair_offer_ids: np.ndarray
+    pair_incoterm_codes: np.ndarray
+    incoterms: np.ndarray
+
+
+def load_universe():
+    spec = "offer__product__specifications__"
+    rows = list(
+        PricingTier.objects.filter(
+            offer__is_active=True, offer__product__is_active=True, **{f"{spec}weight_kg_per_unit__gt": 0}
+        )
+        .order_by("pk")
+        .values_list("pk", "offer_id", "minimum_quantity", "unit_price",
+                     f"{spec}weight_kg_per_unit", f"{spec}steel_grade", f"{spec}material_type")
+    )
+    columns = list(zip(*rows)) if rows else [()] * 7
+    grades, grade_codes = np.unique(np.array([grade_key(g) for g in columns[5]], dtype=object), return_inverse=True)
+    materials, material_codes = np.unique(
+        np.array([(m or "").strip() for m in columns[6]], dtype=object), return_inverse=True
+    )
+
+    pairs = list(
+        DeliveryLocation.objects.filter(
+            offer__is_active=True, offer__product__is_active=True, **{f"{spec}weight_kg_per_unit__gt": 0}
+        )
+        .values_list("offer_id", "incoterm")
+        .distinct()
+        .order_by("offer_id", "incoterm")
+    )
+    pair_columns = list(zip(*pairs)) if pairs else [(), ()]
+    incoterms, pair_incoterm_codes = np.unique(np.array(pair_columns[1], dtype=object), return_inverse=True)
+    return Universe(
+        tier_ids=np.array(columns[0], dtype=np.int64),
+        offer_ids=np.array(columns[1], dtype=np.int64),
+        minimum_quantities=np.array(columns[2], dtype=np.int64),
+        current_prices=np.array(columns[3], dtype=np.float64),
+        weights=np.array(columns[4], dtype=np.float64),
+        grade_codes=grade_codes.astype(np.int64),
+        material_codes=material_codes.astype(np.int64),
+        grades=grades,
+        materials=materials,
+        pair_offer_ids=np.array(pair_columns[0], dtype=np.int64),
+        pair_incoterm_codes=pair_incoterm_codes.astype(np.int64),
+        incoterms=incoterms,
+    )
+
+
+def _percentile(values, starts, counts, q):
+    position = (counts - 1) * q
+    low = np.floor(position).astype(np.int64)
+    high = np.minimum(low + 1, counts - 1)
+    fraction = position - low
+    return values[starts + low] + (values[starts + high] - values[starts + low]) * fraction
+
+
+def compute(universe, prices, min_offers=None):
+    """
+    Index rows [{"steel_grade", "material_type", "incoterm", "offers", "p10", "p50", "p90"}]
+    for the tier `prices` (aligned with universe.tier_ids, NaN = no price).
+    """
+    min_offers = min_offers or getattr(settings, "PRICE_INDEX_MIN_OFFERS", 3)
+    candidates = np.flatnonzero(np.isfinite(prices) & (prices > 0))
+    if not len(candidates) or not len(universe.pair_offer_ids):
+        return []
+    # base tier of every offer: lowest minimum quantity, then lowest tier id
+    order = candidates[np.lexsort((
+        universe.tier_ids[candidates], universe.minimum_quantities[candidates], universe.offer_ids[candidates]
+    ))]
+    first = np.ones(len(order), dtype=bool)
+    first[1:] = universe.offer_ids[order][1:] != universe.offer_ids[order][:-1]
+    base = order[first]
+    base_offer_ids = universe.offer_ids[base]  # sorted
+    per_tonne = prices[base] / universe.weights[base] * 1000
+
+    # one value per (offer, incoterm)
+    position = np.searchsorted(base_offer_ids, universe.pair_offer_ids)
+    found = position < len(base_offer_ids)
+    found[found] = base_offer_ids[position[found]] == universe.pair_offer_ids[found]
+    position = position[found]
+    incoterm_codes = universe.pair_incoterm_codes[found]
+    n_materials, n_incoterms = len(universe.materials), len(universe.incoterms)
+    groups = (universe.grade_codes[base][position] * n_materials + universe.material_codes[base][position]) \
+        * n_incoterms + incoterm_codes
+    values = per_tonne[position]
+    if not len(values):
+        return []
+
+    order = np.lexsort((values, groups))
+    groups, values = groups[order], values[order]
+    is_start = np.ones(len(groups), dtype=bool)
+    is_start[1:] = groups[1:] != groups[:-1]
+    starts = np.flatnonzero(is_start)
+    counts = np.diff(np.append(starts, len(groups)))
+    published = counts >= min_offers
+    starts, counts = starts[published], counts[published]
+    percentiles = {name: _percentile(values, starts, counts, q) for name, q in PERCENTILES.items()}
+
+    keys = groups[starts]
+    rows = []
+    for i, key in enumerate(keys.tolist()):
+        grade_material, incoterm = divmod(key, n_incoterms)
+        grade, material = divmod(grade_material, n_materials)
+        row = {
+            "steel_grade": universe.grades[grade],
+            "material_type": universe.materials[material],
+            "incoterm": universe.incoterms[incoterm],
+            "offers": int(counts[i]),
+        }
+        row.update({name: Decimal(repr(float(array[i]))).quantize(CENT) for name, array in percentiles.items()})
+        rows.append(row)
+    return rows
+
+
+def store(day, rows, computed_at=None):
+    """Replace the index rows of `day`; returns the number of rows stored."""
+    computed_at = computed_at or timezone.now()
+    with transaction.atomic():
+        PriceIndex.objects.filter(day=day).delete()
+        PriceIndex.objects.bulk_create([PriceIndex(day=day, computed_at=computed_at, **row) for row in rows])
+    return len(rows)
+
+
+def compute_today(universe=None):
+    """Index of today from the current tier prices; returns the number of rows stored."""
+    universe = universe or load_universe()
+    return store(timezone.localdate(), compute(universe, universe.current_prices))
+
+
+def backfill(start, end, chunk_size=10000, universe=None):
+    """
+    Recompute the days start..end (inclusive) from the price history in one
+    time-ordered pass; returns {day: rows stored}.
+    """
+    universe = universe or load_universe()
+    prices = np.full(len(universe.tier_ids), np.nan)
+    history = (
+        PriceHistory.objects.filter(recorded_at__lt=day_end(end))
+        .order_by("recorded_at", "id")
+        .values_list("tier_id", "unit_price", "recorded_at")
+    )
+    report = {}
+    day = None
+    boundary = None
+
+    def close_days(until):
+        # snapshot every day that ends at or before `until` (a timestamp), in order
+        nonlocal day, boundary
+        while day is not None and day <= end and boundary <= until:
+            if day >= start:
+                report[day] = store(day, compute(universe, prices))
+            day += timedelta(days=1)
+            boundary = day_end(day)
+
+    chunk = []
+
+    def apply(chunk):
+        nonlocal day, boundary
+        tier_ids = np.fromiter((row[0] for row in chunk), dtype=np.int64, count=len(chunk))
+        values = np.fromiter((row[1] for row in chunk), dtype=np.float64, count=len(chunk))
+        stamps = [row[2] for row in chunk]
+        if day is None:
+            day = timezone.localtime(stamps[0]).date()
+            boundary = day_end(day)
+        segment_start = 0
+        while segment_start < len(chunk):
+            # rows up to the current day's end belong to it (stamps are sorted)
+            segment_end = bisect.bisect_left(stamps, boundary, lo=segment_start)
+            _replay(universe, prices, tier_ids[segment_start:segment_end], values[segment_start:segment_end])
+            segment_start = segment_end
+            if segment_start < len(chunk):
+                close_days(stamps[segment_start])
+
+    for row in history.iterator(chunk_size=chunk_size):
+        chunk.append(row)
+        if len(chunk) >= chunk_size:
+            apply(chunk)
+            chunk = []
+    if chunk:
+        apply(chunk)
+
+    if day is None or day < start:
+        day, boundary = start, day_end(start)
+    close_days(day_end(end))
+    return report
+
+
+def _replay(universe, prices, tier_ids, values):
+    """Set the latest price of each tier of a time-ordered segment."""
+    if not len(tier_ids):
+        return
+    # last occurrence per tier (fancy assignment does not guarantee which duplicate wins)
+    reversed_ids = tier_ids[::-1]
+    unique_ids, last = np.unique(reversed_ids, return_index=True)
+    latest = values[::-1][last]
+    position = np.searchsorted(universe.tier_ids, unique_ids)
+    known = position < len(universe.tier_ids)
+    known[known] = universe.tier_ids[position[known]] == unique_ids[known]
+    prices[position[known]] = latest[known]
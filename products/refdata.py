@@ -0,0 +1,183 @@
+# products/refdata.py
+"""
+In-process cache of the small reference tables: categories, standards and
+specification attributes.
+
+Each table is loaded wholesale (one query) into every worker process and
+served from memory to the serializers (RefDataPrimaryKeyRelatedField for
+category / standard_id / attribute_id), the filters (category_name) and the
+catalog read path (attach(), instead of JOINing the rows into every product).
+ProductCategorySerializer.parent keeps its query: mptt reads the tree fields
+of the parent instance when saving, and the cached copies may be stale there.
+
+Freshness is coordinated through a version number per table in the shared
+cache (REFDATA_CACHE, Redis in production):
+
+- saves/deletes of a reference row bump the version after the transaction
+  commits (signals below); the writing process also drops its own copy, so
+  it reads its writes immediately;
+- every process compares its copy's version with the shared one at most
+  every REFDATA_VERSION_TTL seconds and reloads the table when they differ.
+
+Writes that bypass signals (queryset.update(), bulk_create, raw SQL, mptt
+rebuilds) must call `invalidate()` for the table themselves. When the shared
+cache is unreachable the tables are reloaded from the database on every
+version check, so the data is never staler than REFDATA_VERSION_TTL.
+
+The cached instances are shared between requests and threads: treat them as
+read-only.
+"""
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError as DjangoValidationError
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from mptt.signals import node_moved
+from rest_framework import serializers
+
+from core.identity import follow_path
+from core.metrics import record_cache_lookup
+from .models import ProductCategory, ProductStandard, SpecificationAttribute
+
+logger = logging.getLogger(__name__)
+
+
+class ReferenceTable:
+    """All rows of `model` by pk, reloaded when the shared version changes."""
+
+    def __init__(self, name, model):
+        self.name = name
+        self.model = model
+        self.version_key = f"refdata:{name}:version"
+        self._rows = None
+        self._version = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def __deepcopy__(self, memo):
+        # DRF deep-copies field arguments per serializer; the table is a process singleton
+        return self
+
+    @property
+    def cache(self):
+        return caches[getattr(settings, "REFDATA_CACHE", "default")]
+
+    def shared_version(self):
+        """Current version in the shared cache (created on first use), or None if the cache is down."""
+        try:
+            version = self.cache.get(self.version_key)
+            if version is None:
+                # a fresh, unique start value: an evicted counter must not come back as an old version
+                self.cache.add(self.version_key, time.time_ns(), timeout=None)
+                version = self.cache.get(self.version_key)
+            return version
+        except Exception:
+            logger.exception("Reference data cache unavailable; reloading %s from the database", self.name)
+            return None
+
+    def rows(self):
+        """{pk: instance} snapshot of the table; take it once per operation, not per lookup."""
+        now = time.monotonic()
+        rows = self._rows
+        if rows is not None and now - self._checked_at < getattr(settings, "REFDATA_VERSION_TTL", 1.0):
+            record_cache_lookup(f"refdata:{self.name}", True)
+            return rows
+        version = self.shared_version()
+        with self._lock:
+            if self._rows is not None and version is not None and version == self._version:
+                self._checked_at = now
+                record_cache_lookup(f"refdata:{self.name}", True)
+                return self._rows
+            # the version is read before loading: a change committed during the load bumps it
+            # again and the next check reloads
+            rows = {obj.pk: obj for obj in self.model._default_manager.all()}
+            self._rows, self._version, self._checked_at = rows, version, now
+        record_cache_lookup(f"refdata:{self.name}", False)
+        return rows
+
+    def get(self, pk):
+        return self.rows().get(pk)
+
+    def all(self):
+        return list(self.rows().values())
+
+    def invalidate(self):
+        """Make every process reload the table (call after committed writes that bypass signals)."""
+        with self._lock:
+            self._rows = None
+        try:
+            self.cache.incr(self.version_key)
+        except ValueError:  # no counter yet (or evicted)
+            self.cache.set(self.version_key, time.time_ns(), timeout=None)
+        except Exception:
+            logger.exception("Could not bump the reference data version of %s", self.name)
+
+    def attach(self, instances, path):
+        """
+        Set the FK at `path` ("category", "specifications.standard") of
+        `instances` from the table instead of a JOIN or query.
+        """
+        parents, field_name = follow_path(instances, path)
+        if not parents:
+            return instances
+        field = parents[0]._meta.get_field(field_name)
+        rows = self.rows()
+        for obj in parents:
+            field.set_cached_value(obj, rows.get(getattr(obj, field.attname)))
+        return instances
+
+
+categories = ReferenceTable("categories", ProductCategory)
+standards = ReferenceTable("standards", ProductStandard)
+attributes = ReferenceTable("attributes", SpecificationAttribute)
+
+TABLES = {table.model: table for table in (categories, standards, attributes)}
+
+
+def invalidate_all():
+    for table in TABLES.values():
+        table.invalidate()
+
+
+def _invalidate_on_commit(sender, **kwargs):
+    table = TABLES.get(sender)
+    if table is not None:
+        transaction.on_commit(table.invalidate, using=kwargs.get("using"))
+
+
+for _model in TABLES:
+    post_save.connect(_invalidate_on_commit, sender=_model, dispatch_uid=f"refdata-save-{_model._meta.label}")
+    post_delete.connect(_invalidate_on_commit, sender=_model, dispatch_uid=f"refdata-delete-{_model._meta.label}")
+# mptt moves update parent/tree fields with queries, not save()
+node_moved.connect(_invalidate_on_commit, sender=ProductCategory, dispatch_uid="refdata-move-category")
+
+
+class RefDataPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """
+    PrimaryKeyRelatedField validated against a ReferenceTable instead of a
+    query. `queryset` is still set (browsable API choices, OPTIONS).
+    """
+
+    def __init__(self, table, **kwargs):
+        self.table = table
+        if not kwargs.get("read_only"):
+            kwargs.setdefault("queryset", table.model._default_manager.all())
+        super().__init__(**kwargs)
+
+    def to_internal_value(self, data):
+        if self.pk_field is not None:
+            data = self.pk_field.to_internal_value(data)
+        if isinstance(data, bool):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        try:
+            pk = self.table.model._meta.pk.to_python(data)
+        except (DjangoValidationError, TypeError, ValueError):
+            self.fail("incorrect_type", data_type=type(data).__name__)
+        instance = self.table.get(pk)
+        if instance is None:
+            self.fail("does_not_exist", pk_value=data)
+        return instance
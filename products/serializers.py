@@ -1,17 +1,22 @@
 # products/serializers.py
 from rest_framework import serializers
 from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from core.identity import MemoizedSerializerMixin
+from . import changes, refdata
+from .refdata import RefDataPrimaryKeyRelatedField
 from .models import (
     Product, ProductCategory, ProductImage, ProductSpecification,
     ProductStandard, SpecificationAttribute, SpecificationValue,
-    Offer, PricingTier, DeliveryLocation, ProductDocument, Seller
+    Offer, PricingTier, DeliveryLocation, ProductDocument, Seller, SellerStats, PriceIndex
 )
 
 
 # -------------------------
 # Category
 # -------------------------
-class ProductCategorySerializer(serializers.ModelSerializer):
+class ProductCategorySerializer(MemoizedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ProductCategory
         fields = ("id", "name", "parent", "hscode")
@@ -24,7 +29,7 @@ class ProductCategorySerializer(serializers.ModelSerializer):
 # -------------------------
 # Seller
 # -------------------------
-class SellerSerializer(serializers.ModelSerializer):
+class SellerSerializer(MemoizedSerializerMixin, serializers.ModelSerializer):
     user_id = serializers.PrimaryKeyRelatedField(source="user", read_only=True)
 
     class Meta:
@@ -32,10 +37,31 @@ class SellerSerializer(serializers.ModelSerializer):
         fields = ("id", "user_id", "company_name", "business_type", "location", "is_verified", "created_at")
 
 
+class SellerStatsSerializer(serializers.ModelSerializer):
+    seller_id = serializers.IntegerField(read_only=True)
+    inactive_offer_count = serializers.SerializerMethodField()
+
+    class Meta:
+        model = SellerStats
+        fields = (
+            "seller_id", "offer_count", "active_offer_count", "inactive_offer_count", "product_count", "tier_count",
+            "min_price", "max_price", "price_ranges", "delivery_coverage", "refreshed_at",
+        )
+
+    def get_inactive_offer_count(self, obj):
+        return obj.offer_count - obj.active_offer_count
+
+
+class PriceIndexSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = PriceIndex
+        fields = ("day", "steel_grade", "material_type", "incoterm", "offers", "p10", "p50", "p90", "computed_at")
+
+
 # -------------------------
 # Standards & Attributes
 # -------------------------
-class ProductStandardSerializer(serializers.ModelSerializer):
+class ProductStandardSerializer(MemoizedSerializerMixin, serializers.ModelSerializer):
     class Meta:
         model = ProductStandard
         fields = ("id", "name", "description")
@@ -50,7 +76,7 @@ class SpecificationAttributeSerializer(serializers.ModelSerializer):
 class SpecificationValueSerializer(serializers.ModelSerializer):
     # نمایش attribute به صورت nested کوچک
     attribute = SpecificationAttributeSerializer(read_only=True)
-    attribute_id = serializers.PrimaryKeyRelatedField(source="attribute", queryset=SpecificationAttribute.objects.all(), write_only=True)
+    attribute_id = RefDataPrimaryKeyRelatedField(refdata.attributes, source="attribute", write_only=True)
 
     class Meta:
         model = SpecificationValue
@@ -63,7 +89,7 @@ class SpecificationValueSerializer(serializers.ModelSerializer):
 # -------------------------
 class ProductSpecificationSerializer(serializers.ModelSerializer):
     standard = ProductStandardSerializer(read_only=True)
-    standard_id = serializers.PrimaryKeyRelatedField(source="standard", queryset=ProductStandard.objects.all(), write_only=True, allow_null=True, required=False)
+    standard_id = RefDataPrimaryKeyRelatedField(refdata.standards, source="standard", write_only=True, allow_null=True, required=False)
 
     class Meta:
         model = ProductSpecification
@@ -143,6 +169,19 @@ class PricingTierSerializer(serializers.ModelSerializer):
         fields = ("id", "offer", "tier_name", "unit_price", "minimum_quantity", "maximum_quantity", "is_negotiable")
         read_only_fields = ("offer",)  # اگر بخوای API جدا برای PricingTier بذاریم، offer لازم است؛ در Offer nested creation انجام نمی‌شود فعلاً.
 
+    def validate(self, attrs):
+        # tier names are unique per offer (products_pricingtier_offer_tier_uniq); the offer of a new
+        # tier comes from the view (context["offer"]), an update keeps the instance's offer
+        offer_id = self.instance.offer_id if self.instance is not None else getattr(self.context.get("offer"), "pk", None)
+        tier_name = attrs.get("tier_name")
+        if offer_id is not None and tier_name is not None:
+            others = PricingTier.objects.filter(offer_id=offer_id, tier_name=tier_name)
+            if self.instance is not None:
+                others = others.exclude(pk=self.instance.pk)
+            if others.exists():
+                raise serializers.ValidationError({"tier_name": ["This offer already has a tier with this name."]})
+        return attrs
+
 
 class DeliveryLocationSerializer(serializers.ModelSerializer):
     class Meta:
@@ -167,16 +206,185 @@ class OfferReadSerializer(serializers.ModelSerializer):
         read_only_fields = ("created_at", "product")
 
 
+class PricingTierNestedSerializer(serializers.ModelSerializer):
+    # id is sent back on update to keep (and modify) an existing tier; tiers without id are created
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = PricingTier
+        fields = ("id", "tier_name", "unit_price", "minimum_quantity", "maximum_quantity", "is_negotiable")
+
+    def validate(self, attrs):
+        minimum, maximum = attrs.get("minimum_quantity"), attrs.get("maximum_quantity")
+        if minimum is not None and minimum < 0:
+            raise serializers.ValidationError({"minimum_quantity": "must not be negative."})
+        if maximum is not None and minimum is not None and maximum < minimum:
+            raise serializers.ValidationError({"maximum_quantity": "must be greater than or equal to minimum_quantity."})
+        return attrs
+
+
+class DeliveryLocationNestedSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(required=False)
+
+    class Meta:
+        model = DeliveryLocation
+        fields = ("id", "incoterm", "country", "city", "port")
+
+
 class OfferWriteSerializer(serializers.ModelSerializer):
-    # برای ایجاد/به‌روزرسانی: seller و product به صورت id ارسال می‌شوند
+    """
+    برای ایجاد/به‌روزرسانی: seller و product به صورت id ارسال می‌شوند.
+
+    pricing_tiers and delivery_options may be sent with the offer, so an offer is
+    published in one request and one transaction (bulk inserts) instead of one
+    request per tier/destination. On update a list that is sent replaces the
+    current one: items with an "id" of this offer are updated (when changed),
+    items without id are created, and current items missing from the list are
+    deleted. A list that is not sent is left untouched (PATCH).
+    """
     product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.all())
     seller = serializers.PrimaryKeyRelatedField(queryset=Seller.objects.all())
+    pricing_tiers = PricingTierNestedSerializer(many=True, required=False)
+    delivery_options = DeliveryLocationNestedSerializer(many=True, required=False)
 
     class Meta:
         model = Offer
-        fields = ("id", "product", "seller", "is_active", "created_at")
+        fields = ("id", "product", "seller", "is_active", "created_at", "pricing_tiers", "delivery_options")
         read_only_fields = ("created_at",)
 
+    def validate_pricing_tiers(self, tiers):
+        self._check_unique_ids(tiers)
+        tiers = self._complete(tiers, PricingTier, PricingTierNestedSerializer.Meta.fields,
+                               required=("tier_name", "unit_price", "minimum_quantity"))
+        names = [tier.get("tier_name") for tier in tiers]
+        if len(names) != len(set(names)):
+            raise serializers.ValidationError("tier_name must be unique within an offer.")
+        # quantity bands [minimum, maximum] must not overlap; an open-ended band (no maximum) must be the last
+        bands = sorted(tiers, key=lambda tier: tier.get("minimum_quantity") or 0)
+        for previous, current in zip(bands, bands[1:]):
+            if previous.get("maximum_quantity") is None or (current.get("minimum_quantity") or 0) <= previous["maximum_quantity"]:
+                raise serializers.ValidationError(
+                    f"Quantity bands overlap: {previous.get('tier_name')!r} and {current.get('tier_name')!r}."
+                )
+        return tiers
+
+    def validate_delivery_options(self, options):
+        self._check_unique_ids(options)
+        options = self._complete(options, DeliveryLocation, DeliveryLocationNestedSerializer.Meta.fields,
+                                 required=("incoterm", "country"))
+        seen = set()
+        for option in options:
+            key = (option.get("incoterm"), (option.get("country") or "").strip().lower(),
+                   (option.get("city") or "").strip().lower(), (option.get("port") or "").strip().lower())
+            if key in seen:
+                raise serializers.ValidationError(
+                    f"Duplicate delivery option {option.get('incoterm')} {option.get('country')}."
+                )
+            seen.add(key)
+        return options
+
+    def _check_unique_ids(self, items):
+        ids = [item["id"] for item in items if "id" in item]
+        if len(ids) != len(set(ids)):
+            raise serializers.ValidationError("Each id may appear only once.")
+
+    def _complete(self, items, model, fields, required):
+        """
+        Items as full rows: on PATCH the nested serializers are partial, so an item
+        with an id is merged over the current row and a new item must be complete.
+        """
+        if not self.partial:
+            return items
+        ids = [item["id"] for item in items if "id" in item]
+        current = model.objects.filter(offer=self.instance, pk__in=ids).in_bulk() if ids and self.instance else {}
+        completed = []
+        for item in items:
+            if "id" in item:
+                row = current.get(item["id"])
+                if row is None:
+                    raise serializers.ValidationError(f"Unknown id for this offer: {item['id']}.")
+                item = dict({name: getattr(row, name) for name in fields if name != "id"}, **item)
+            else:
+                missing = [name for name in required if name not in item]
+                if missing:
+                    raise serializers.ValidationError(f"New items need {', '.join(missing)}.")
+            completed.append(item)
+        return completed
+
+    def create(self, validated_data):
+        tiers = validated_data.pop("pricing_tiers", [])
+        options = validated_data.pop("delivery_options", [])
+        with transaction.atomic():
+            offer = Offer.objects.create(**validated_data)
+            self._replace(offer, PricingTier, tiers, {})
+            self._replace(offer, DeliveryLocation, options, {})
+        return offer
+
+    def update(self, instance, validated_data):
+        tiers = validated_data.pop("pricing_tiers", None)
+        options = validated_data.pop("delivery_options", None)
+        with transaction.atomic():
+            if tiers is not None or options is not None:
+                # serialize concurrent updates of the same offer's children
+                Offer.objects.select_for_update().filter(pk=instance.pk).values_list("pk", flat=True).first()
+            instance = super().update(instance, validated_data)
+            # read the current children after taking the lock, not from the view's prefetch
+            if tiers is not None:
+                self._replace(instance, PricingTier, tiers, PricingTier.objects.filter(offer=instance).in_bulk())
+            if options is not None:
+                self._replace(instance, DeliveryLocation, options, DeliveryLocation.objects.filter(offer=instance).in_bulk())
+        return instance
+
+    def _replace(self, offer, model, items, existing):
+        """Make the offer's `model` rows equal to `items` with one bulk statement per kind of change."""
+        unknown = [item["id"] for item in items if "id" in item and item["id"] not in existing]
+        if unknown:
+            field = model._meta.get_field("offer").remote_field.name  # pricing_tiers / delivery_options
+            raise serializers.ValidationError({field: [f"Unknown id(s) for this offer: {unknown}."]})
+
+        to_create, to_update, keep = [], [], set()
+        changed_fields, renames = set(), set()
+        for item in items:
+            values = {name: value for name, value in item.items() if name != "id"}
+            if "id" not in item:
+                to_create.append(model(offer=offer, **values))
+                continue
+            obj = existing[item["id"]]
+            keep.add(obj.pk)
+            diff = {name: value for name, value in values.items() if getattr(obj, name) != value}
+            if "tier_name" in diff:
+                renames.add(obj.pk)
+            if diff:
+                for name, value in diff.items():
+                    setattr(obj, name, value)
+                changed_fields.update(diff)
+                to_update.append(obj)
+
+        stale = [pk for pk in existing if pk not in keep]
+        if stale:
+            model.objects.filter(offer=offer, pk__in=stale).delete()
+        # bulk statements skip auto_now and the change log signals
+        if to_update:
+            if "updated_at" in {field.name for field in model._meta.concrete_fields}:
+                now = timezone.now()
+                for obj in to_update:
+                    obj.updated_at = now
+                changed_fields.add("updated_at")
+            renamed = [obj for obj in to_update if obj.pk in renames]
+            if renamed:
+                # names may move between rows (swaps): park the renamed rows on unique placeholder
+                # names first, one UPDATE cannot pass through a state violating (offer, tier_name)
+                model.objects.bulk_update(
+                    [model(pk=obj.pk, tier_name=f"~renaming~{obj.pk}") for obj in renamed], ["tier_name"]
+                )
+            model.objects.bulk_update(to_update, sorted(changed_fields))
+            changes.record(model, [obj.pk for obj in to_update],
+                           owners={obj.pk: (offer.product_id, offer.seller_id) for obj in to_update})
+        if to_create:
+            model.objects.bulk_create(to_create)
+            changes.record(model, [obj.pk for obj in to_create],
+                           owners={obj.pk: (offer.product_id, offer.seller_id) for obj in to_create})
+
 
 # -------------------------
 # Product (main serializer)
@@ -217,7 +425,7 @@ class ProductDetailSerializer(ProductListSerializer):
 # Simple serializers for CRUD where client supplies IDs
 # -------------------------
 class ProductWriteSerializer(serializers.ModelSerializer):
-    category = serializers.PrimaryKeyRelatedField(queryset=ProductCategory.objects.all(), allow_null=True, required=False)
+    category = RefDataPrimaryKeyRelatedField(refdata.categories, allow_null=True, required=False)
 
     class Meta:
         model = Product
@@ -234,7 +442,9 @@ class ProductSummarySerializer(serializers.ModelSerializer):
         fields = ["id", "name", "min_price", "thumbnail"]
 
     def get_thumbnail(self, obj):
-        first_image = obj.images.first()
+        # pick from the prefetched images (same as .first(): lowest pk) instead of
+        # issuing one query per product
+        first_image = min(obj.images.all(), key=lambda image: image.pk, default=None)
         return self.context["request"].build_absolute_uri(first_image.image.url) if first_image else None
 # -------------------------
 # Utility: small factory mapping for views
@@ -0,0 +1,335 @@
+# products/similarity.py
+"""
+"Similar products" index: GET /api/products/<id>/similar/ (ProductViewSet.similar).
+
+Products are compared within their material type only (sheet with sheet,
+rebar with rebar). Each ProductSpecification becomes a float32 vector of
+log(1 + thickness, width, length, weight), standardized per material type
+(missing values count as the average); the distance is the weighted
+Euclidean distance (SIMILARITY_WEIGHTS) plus SIMILARITY_GRADE_PENALTY when the
+steel grades differ (grades listed together in SIMILARITY_EQUIVALENT_GRADES
+count as equal) and SIMILARITY_STANDARD_PENALTY when both products name a
+standard and the standards differ. Inactive products are never suggested.
+
+Storage: SIMILARITY_INDEX_DIR holds one partition per material type as plain
+.npy files (sorted product ids, vectors, grade/standard/active attributes) and
+a manifest.json naming the current files. Every worker memory-maps the files
+read-only, so the page cache holds one copy for all processes of the host,
+and a lookup is a binary search plus one vectorized pass over the partition.
+Workers stat the manifest at most every SIMILARITY_RELOAD_INTERVAL seconds
+and remap the partitions whose files changed.
+
+Building: `manage.py build_similarity_index` (all partitions, or --material).
+Partitions are rewritten to new files and swapped in by replacing the
+manifest, so readers never see a half-written partition. Updates are
+incremental per material type: after a product or specification write
+commits, the `products.update_similarity_index` job (jobs app, delayed by
+SIMILARITY_UPDATE_DELAY seconds, one pending job per material type) rebuilds
+the partitions the product left and joined. Run the full build from cron as
+well to repair a lost update. Without an index the endpoint returns no
+results.
+"""
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+import warnings
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+from django.conf import settings
+
+from jobs import enqueue
+from jobs.models import Job
+
+from .changes import catalog_changed
+from .models import CatalogChange, ProductSpecification
+
+logger = logging.getLogger(__name__)
+
+UPDATE_TASK = "products.update_similarity_index"
+DIMENSIONS = ("thickness_mm", "width_mm", "length_mm", "weight_kg_per_unit")
+MANIFEST = "manifest.json"
+# unreferenced partition files are deleted once older than this (a worker may still be opening them)
+STALE_FILE_AGE = 60 * 60
+NO_STANDARD = -1
+
+
+def index_dir():
+    return Path(getattr(settings, "SIMILARITY_INDEX_DIR", Path(settings.BASE_DIR) / "var" / "similarity"))
+
+
+def normalize_grade(grade):
+    """Grade key for comparisons: case, spaces and dashes ignored, equivalent grades share their group's first name."""
+    key = "".join((grade or "").split()).replace("-", "").upper()
+    for group in getattr(settings, "SIMILARITY_EQUIVALENT_GRADES", ()):
+        names = ["".join(name.split()).replace("-", "").upper() for name in group]
+        if key in names:
+            return names[0]
+    return key
+
+
+# ---------------- building ----------------
+def _partition_arrays(material_type):
+    """(ids, vectors, attrs, stats) of one material type; ids sorted, None when it has no products."""
+    rows = list(
+        ProductSpecification.objects.filter(material_type=material_type)
+        .order_by("product_id")
+        .values_list("product_id", *DIMENSIONS, "steel_grade", "standard_id", "product__is_active")
+    )
+    if not rows:
+        return None
+    count = len(DIMENSIONS)
+    ids = np.fromiter((row[0] for row in rows), dtype=np.int64, count=len(rows))
+    raw = np.array(
+        [[np.nan if value is None else float(value) for value in row[1:1 + count]] for row in rows],
+        dtype=np.float64,
+    )
+    # sizes span orders of magnitude (2 mm sheet vs 12 m length): compare them on a log scale
+    values = np.log1p(np.clip(raw, 0, None))
+    with _quiet_nan_warnings():
+        mean = np.nanmean(values, axis=0)
+        scale = np.nanstd(values, axis=0)
+    mean = np.where(np.isnan(mean), 0.0, mean)
+    scale = np.where(np.isnan(scale) | (scale == 0), 1.0, scale)
+    vectors = (values - mean) / scale
+    vectors = np.where(np.isnan(vectors), 0.0, vectors).astype(np.float32)
+
+    grade_names = sorted({normalize_grade(row[1 + count]) for row in rows})
+    grade_codes = {name: code for code, name in enumerate(grade_names)}
+    attrs = np.empty((len(rows), 3), dtype=np.int32)
+    attrs[:, 0] = [grade_codes[normalize_grade(row[1 + count])] for row in rows]
+    attrs[:, 1] = [NO_STANDARD if row[2 + count] is None else row[2 + count] for row in rows]
+    attrs[:, 2] = [1 if row[3 + count] else 0 for row in rows]
+    stats = {"rows": len(rows), "grades": grade_names, "mean": mean.tolist(), "scale": scale.tolist()}
+    return ids, vectors, attrs, stats
+
+
+@contextmanager
+def _quiet_nan_warnings():
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore", category=RuntimeWarning)  # all-NaN columns
+        yield
+
+
+@contextmanager
+def _manifest_lock(directory):
+    directory.mkdir(parents=True, exist_ok=True)
+    with open(directory / ".lock", "w") as lock:
+        fcntl.flock(lock, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock, fcntl.LOCK_UN)
+
+
+def read_manifest(directory=None):
+    directory = directory or index_dir()
+    try:
+        with open(directory / MANIFEST, encoding="utf-8") as stream:
+            return json.load(stream)
+    except FileNotFoundError:
+        return {"partitions": {}}
+
+
+def _write_manifest(directory, manifest):
+    tmp = directory / f"{MANIFEST}.{os.getpid()}.tmp"
+    with open(tmp, "w", encoding="utf-8") as stream:
+        json.dump(manifest, stream, ensure_ascii=False, indent=1)
+        stream.flush()
+        os.fsync(stream.fileno())
+    os.replace(tmp, directory / MANIFEST)
+
+
+def _save_partition(directory, material_type, arrays):
+    ids, vectors, attrs, stats = arrays
+    prefix = f"{hashlib.sha1(material_type.encode('utf-8')).hexdigest()[:12]}-{time.time_ns()}"
+    for name, array in (("ids", ids), ("vectors", vectors), ("attrs", attrs)):
+        path = directory / f"{prefix}.{name}.npy"
+        with open(path, "wb") as stream:
+            np.save(stream, array)
+            stream.flush()
+            os.fsync(stream.fileno())
+    return dict(stats, prefix=prefix)
+
+
+def _remove_stale_files(directory, manifest):
+    referenced = {entry["prefix"] for entry in manifest["partitions"].values()}
+    cutoff = time.time() - STALE_FILE_AGE
+    for path in directory.glob("*.npy"):
+        if path.name.split(".", 1)[0] not in referenced and path.stat().st_mtime < cutoff:
+            path.unlink(missing_ok=True)
+
+
+def build(material_types=None):
+    """
+    Rebuild the partitions of `material_types` (all material types when None) and
+    swap them in; returns {material_type: rows} (0 for partitions removed).
+    """
+    directory = index_dir()
+    if material_types is None:
+        material_types = set(ProductSpecification.objects.values_list("material_type", flat=True).distinct())
+        full = True
+    else:
+        material_types, full = set(material_types), False
+    # read before taking the lock: writers of other partitions are not held up by the queries
+    built = {material_type: _partition_arrays(material_type) for material_type in sorted(material_types)}
+
+    with _manifest_lock(directory):
+        manifest = read_manifest(directory)
+        partitions = manifest["partitions"]
+        report = {}
+        for material_type, arrays in built.items():
+            if arrays is None:
+                partitions.pop(material_type, None)
+                report[material_type] = 0
+            else:
+                partitions[material_type] = _save_partition(directory, material_type, arrays)
+                report[material_type] = partitions[material_type]["rows"]
+        if full:
+            for material_type in set(partitions) - material_types:
+                del partitions[material_type]
+                report[material_type] = 0
+        manifest["dimensions"] = list(DIMENSIONS)
+        _write_manifest(directory, manifest)
+        _remove_stale_files(directory, manifest)
+    return report
+
+
+# ---------------- incremental updates ----------------
+def schedule(material_types):
+    """Enqueue a partition rebuild per material type, unless one is already pending."""
+    if not material_types:
+        return
+    pending = {
+        payload.get("material_type")
+        for payload in Job.objects.filter(
+            task=UPDATE_TASK, status=Job.Status.PENDING, payload__material_type__in=list(material_types)
+        ).values_list("payload", flat=True)
+    }
+    for material_type in sorted(set(material_types) - pending):
+        enqueue(UPDATE_TASK, {"material_type": material_type}, delay=getattr(settings, "SIMILARITY_UPDATE_DELAY", 30))
+
+
+def _schedule_changed(sender, changes, **kwargs):
+    product_ids = {
+        entry.product_id for entry in changes
+        if entry.product_id is not None and entry.entity in ("product", "specification")
+    }
+    if not product_ids:
+        return
+    # the partition a product is in now, and the one the index still has it in (material changed / deleted)
+    material_types = set(
+        ProductSpecification.objects.filter(product_id__in=product_ids).values_list("material_type", flat=True)
+    )
+    material_types |= index.partitions_of(product_ids)
+    schedule(material_types)
+
+
+catalog_changed.connect(_schedule_changed, sender=CatalogChange, dispatch_uid="similarity-schedule")
+
+
+# ---------------- lookups ----------------
+class Partition:
+    """Memory-mapped arrays of one material type."""
+
+    def __init__(self, directory, entry):
+        self.prefix = entry["prefix"]
+        self.ids = np.load(directory / f"{self.prefix}.ids.npy", mmap_mode="r")
+        self.vectors = np.load(directory / f"{self.prefix}.vectors.npy", mmap_mode="r")
+        attrs = np.load(directory / f"{self.prefix}.attrs.npy", mmap_mode="r")
+        self.grades, self.standards, self.active = attrs[:, 0], attrs[:, 1], attrs[:, 2]
+
+    def row_of(self, product_id):
+        row = int(np.searchsorted(self.ids, product_id))
+        if row < len(self.ids) and self.ids[row] == product_id:
+            return row
+        return None
+
+    def nearest(self, row, limit, weights, grade_penalty, standard_penalty):
+        delta = self.vectors - self.vectors[row]
+        distance = (delta * delta) @ weights
+        distance += grade_penalty * (self.grades != self.grades[row])
+        standard = self.standards[row]
+        if standard != NO_STANDARD:
+            distance += standard_penalty * ((self.standards != standard) & (self.standards != NO_STANDARD))
+        distance[self.active == 0] = np.inf
+        distance[row] = np.inf
+        limit = min(limit, len(distance) - 1)
+        if limit <= 0:
+            return []
+        candidates = np.argpartition(distance, limit - 1)[:limit]
+        candidates = candidates[np.argsort(distance[candidates], kind="stable")]
+        return [
+            (int(self.ids[i]), float(np.sqrt(distance[i])))
+            for i in candidates if np.isfinite(distance[i])
+        ]
+
+
+class SimilarityIndex:
+    """The current partitions of this process, remapped when the manifest changes."""
+
+    def __init__(self):
+        self._partitions = {}
+        self._manifest_mtime = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def partitions(self):
+        now = time.monotonic()
+        if now - self._checked_at >= getattr(settings, "SIMILARITY_RELOAD_INTERVAL", 5):
+            with self._lock:
+                if now - self._checked_at >= getattr(settings, "SIMILARITY_RELOAD_INTERVAL", 5):
+                    self._reload()
+                    self._checked_at = now
+        return self._partitions
+
+    def _reload(self):
+        directory = index_dir()
+        try:
+            mtime = (directory / MANIFEST).stat().st_mtime_ns
+        except FileNotFoundError:
+            self._partitions, self._manifest_mtime = {}, None
+            return
+        if mtime == self._manifest_mtime:
+            return
+        partitions = {}
+        for material_type, entry in read_manifest(directory)["partitions"].items():
+            current = self._partitions.get(material_type)
+            try:
+                partitions[material_type] = current if current and current.prefix == entry["prefix"] else Partition(directory, entry)
+            except OSError:
+                logger.exception("Similarity index: cannot map the %r partition", material_type)
+        self._partitions, self._manifest_mtime = partitions, mtime
+
+    def invalidate(self):
+        with self._lock:
+            self._checked_at = 0.0
+
+    def partitions_of(self, product_ids):
+        return {
+            material_type
+            for material_type, partition in self.partitions().items()
+            if any(partition.row_of(product_id) is not None for product_id in product_ids)
+        }
+
+    def similar(self, product_id, limit):
+        """[(product_id, distance)] nearest first; None when the product is not indexed."""
+        weights_by_name = getattr(settings, "SIMILARITY_WEIGHTS", {})
+        weights = np.array([weights_by_name.get(name, 1.0) for name in DIMENSIONS], dtype=np.float32)
+        for partition in self.partitions().values():
+            row = partition.row_of(product_id)
+            if row is not None:
+                return partition.nearest(
+                    row, limit, weights,
+                    getattr(settings, "SIMILARITY_GRADE_PENALTY", 1.0),
+                    getattr(settings, "SIMILARITY_STANDARD_PENALTY", 0.5),
+                )
+        return None
+
+
+index = SimilarityIndex()
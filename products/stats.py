@@ -0,0 +1,122 @@
+# products/stats.py
+"""
+Seller dashboard rollups (SellerStats): offer counts (all / active), products,
+tiers, the overall price range, price ranges per product and delivery
+coverage per incoterm, served by GET /api/sellers/<id>/stats/ as one row.
+
+A seller's row is recomputed from its offers by the `products.refresh_seller_stats`
+job (jobs app, `manage.py run_jobs`). Jobs are enqueued after commit for the
+sellers named by the change log entries of a transaction (products.changes:
+offer, tier, delivery option and seller writes, bulk imports included),
+delayed by SELLER_STATS_REFRESH_DELAY seconds so a burst of writes costs one
+recompute; a seller with a pending job gets no second one. The job reads the
+committed state when it runs, so the last job after a write always sees it.
+
+`manage.py reconcile_seller_stats` recomputes every seller (and removes
+nothing else): run it periodically to repair drift from writes that bypass
+the change log, or a lost enqueue.
+"""
+from decimal import Decimal
+
+from django.conf import settings
+from django.db.models import Count, Max, Min, Q
+from django.utils import timezone
+
+from jobs import enqueue
+from jobs.models import Job
+
+from .changes import catalog_changed
+from .models import CatalogChange, DeliveryLocation, Offer, PricingTier, Seller, SellerStats
+
+REFRESH_TASK = "products.refresh_seller_stats"
+
+
+CENT = Decimal("0.01")
+
+
+def _money(value):
+    # aggregates may drop the scale (SQLite); store and compare amounts with 2 decimals like the model fields
+    return None if value is None else Decimal(value).quantize(CENT)
+
+
+def compute(seller_id):
+    """Rollup values of one seller (the SellerStats fields) from its offers, tiers and delivery options."""
+    offers = Offer.objects.filter(seller_id=seller_id)
+    totals = offers.aggregate(
+        offer_count=Count("id"),
+        active_offer_count=Count("id", filter=Q(is_active=True)),
+        product_count=Count("product_id", distinct=True),
+    )
+    tiers = PricingTier.objects.filter(offer__seller_id=seller_id)
+    totals.update(tiers.aggregate(tier_count=Count("id"), min_price=Min("unit_price"), max_price=Max("unit_price")))
+    totals["min_price"], totals["max_price"] = _money(totals["min_price"]), _money(totals["max_price"])
+
+    price_ranges = {
+        str(row["product_id"]): {
+            "offers": row["offers"],
+            "active_offers": row["active_offers"],
+            "tiers": row["tiers"],
+            "min_price": None if row["min_price"] is None else str(_money(row["min_price"])),
+            "max_price": None if row["max_price"] is None else str(_money(row["max_price"])),
+        }
+        for row in offers.values("product_id").annotate(
+            offers=Count("id", distinct=True),
+            active_offers=Count("id", distinct=True, filter=Q(is_active=True)),
+            tiers=Count("pricing_tiers"),
+            min_price=Min("pricing_tiers__unit_price"),
+            max_price=Max("pricing_tiers__unit_price"),
+        ).order_by("product_id")
+    }
+
+    # one pass over the distinct (incoterm, country, offer) rows; offers are counted once per incoterm
+    coverage, coverage_offers = {}, {}
+    for incoterm, country, offer_id in (
+        DeliveryLocation.objects.filter(offer__seller_id=seller_id)
+        .values_list("incoterm", "country", "offer_id")
+        .distinct()
+        .order_by("incoterm", "country", "offer_id")
+    ):
+        entry = coverage.setdefault(incoterm, {"offers": 0, "countries": []})
+        if not entry["countries"] or entry["countries"][-1] != country:
+            entry["countries"].append(country)
+        coverage_offers.setdefault(incoterm, set()).add(offer_id)
+    for incoterm, offer_ids in coverage_offers.items():
+        coverage[incoterm]["offers"] = len(offer_ids)
+
+    return dict(totals, price_ranges=price_ranges, delivery_coverage=coverage)
+
+
+def refresh(seller_id):
+    """Recompute and store the row of one seller; returns it (None if the seller is gone)."""
+    if not Seller.objects.filter(pk=seller_id).exists():
+        SellerStats.objects.filter(seller_id=seller_id).delete()
+        return None
+    values = compute(seller_id)
+    values["refreshed_at"] = timezone.now()
+    stats, _ = SellerStats.objects.update_or_create(seller_id=seller_id, defaults=values)
+    return stats
+
+
+def schedule(seller_ids):
+    """Enqueue a refresh job per seller, unless one is already pending."""
+    if not seller_ids:
+        return
+    pending = {
+        payload.get("seller_id")
+        for payload in Job.objects.filter(
+            task=REFRESH_TASK, status=Job.Status.PENDING, payload__seller_id__in=list(seller_ids)
+        ).values_list("payload", flat=True)
+    }
+    for seller_id in sorted(set(seller_ids) - pending):
+        enqueue(REFRESH_TASK, {"seller_id": seller_id}, delay=getattr(settings, "SELLER_STATS_REFRESH_DELAY", 5))
+
+
+def _schedule_changed(sender, changes, **kwargs):
+    seller_ids = {
+        entry.seller_id for entry in changes
+        if entry.seller_id is not None and entry.entity in ("seller", "offer", "pricing_tier", "delivery_location")
+    }
+    schedule(seller_ids)
+
+
+catalog_changed.connect(_schedule_changed, sender=CatalogChange, dispatch_uid="seller-stats-schedule")
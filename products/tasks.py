@@ -0,0 +1,17 @@
+# products/tasks.py
+# background tasks of the products app (run by `manage.py run_jobs`, see jobs/)
+from jobs import task
+
+from . import similarity, stats
+
+
+@task(queue="default", max_attempts=3)
+def refresh_seller_stats(seller_id):
+    """بازمحاسبهٔ آمار داشبورد یک فروشنده (SellerStats) پس از تغییر offers / tiers."""
+    stats.refresh(seller_id)
+
+
+@task(queue="default", max_attempts=3)
+def update_similarity_index(material_type):
+    """بازسازی بخش یک نوع متریال در ایندکس محصولات مشابه پس از تغییر مشخصات محصولات."""
+    similarity.build([material_type])
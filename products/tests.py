@@ -1,3 +1,250 @@
-from django.test import TestCase
+import json
+from decimal import Decimal
+
+from django.contrib.auth import get_user_model
+from django.test import AsyncClient, TestCase
+from rest_framework.test import APIClient
+
+from accounts.authentication import tokens_for_user
+from .models import DeliveryLocation, Offer, PricingTier, Product, Seller
+
+User = get_user_model()
+
+
+class SellerOwnershipTests(TestCase):
+    """The owner check compares the token's user id claim (a string in the JWT) with Seller.user_id."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username="owner", password="x")
+        cls.other = User.objects.create_user(username="other", password="x")
+        cls.seller = Seller.objects.create(user=cls.owner, company_name="Owner Steel")
+
+    def client_for(self, user):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(user)['access']}")
+        return client
+
+    def test_owner_can_update_seller(self):
+        response = self.client_for(self.owner).patch(
+            f"/api/sellers/{self.seller.pk}/", {"company_name": "Renamed"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.seller.refresh_from_db()
+        self.assertEqual(self.seller.company_name, "Renamed")
+
+    def test_other_user_cannot_update_seller(self):
+        response = self.client_for(self.other).patch(
+            f"/api/sellers/{self.seller.pk}/", {"company_name": "Hijacked"}, format="json"
+        )
+        self.assertEqual(response.status_code, 403)
+
+
+class OfferNestedPatchTests(TestCase):
+    """PATCH /api/offers/<id>/ with nested pricing tiers / delivery options."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username="seller", password="x")
+        cls.seller = Seller.objects.create(user=cls.owner, company_name="Seller Steel")
+        cls.product = Product.objects.create(name="Sheet 2mm", description="")
+        cls.offer = Offer.objects.create(product=cls.product, seller=cls.seller)
+        cls.small = PricingTier.objects.create(
+            offer=cls.offer, tier_name="small", unit_price="10.00", minimum_quantity=1, maximum_quantity=9
+        )
+        cls.large = PricingTier.objects.create(
+            offer=cls.offer, tier_name="large", unit_price="8.00", minimum_quantity=10
+        )
+        cls.option = DeliveryLocation.objects.create(offer=cls.offer, incoterm="FOB", country="Iran")
+
+    def patch(self, data):
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(self.owner)['access']}")
+        return client.patch(f"/api/offers/{self.offer.pk}/", data, format="json")
+
+    def tiers(self):
+        return list(self.offer.pricing_tiers.order_by("minimum_quantity").values_list("tier_name", "unit_price"))
+
+    def test_partial_tier_items_are_merged_with_the_current_rows(self):
+        response = self.patch({"pricing_tiers": [{"id": self.small.pk, "unit_price": "9.50"}, {"id": self.large.pk}]})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual(self.tiers(), [("small", Decimal("9.50")), ("large", Decimal("8.00"))])
+
+    def test_partial_delivery_option_items_are_merged(self):
+        response = self.patch({"delivery_options": [{"id": self.option.pk, "city": "Bandar Abbas"}]})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.option.refresh_from_db()
+        self.assertEqual((self.option.incoterm, self.option.country, self.option.city), ("FOB", "Iran", "Bandar Abbas"))
+
+    def test_new_items_must_be_complete(self):
+        response = self.patch({"pricing_tiers": [{"id": self.small.pk}, {"id": self.large.pk}, {"tier_name": "bulk"}]})
+        self.assertEqual(response.status_code, 400)
+
+    def test_unknown_id_is_rejected(self):
+        response = self.patch({"pricing_tiers": [{"id": 999999, "unit_price": "1"}]})
+        self.assertEqual(response.status_code, 400)
+
+    def test_tier_names_can_be_swapped(self):
+        response = self.patch({"pricing_tiers": [
+            {"id": self.small.pk, "tier_name": "large"},
+            {"id": self.large.pk, "tier_name": "small"},
+        ]})
+        self.assertEqual(response.status_code, 200, response.content)
+        self.assertEqual([name for name, _ in self.tiers()], ["large", "small"])
+
+
+class PricingTierNameTests(TestCase):
+    """Tier names are unique per offer: every write path answers 400, not an IntegrityError."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username="tiers", password="x")
+        cls.seller = Seller.objects.create(user=cls.owner, company_name="Tier Steel")
+        cls.offer = Offer.objects.create(product=Product.objects.create(name="Beam", description=""), seller=cls.seller)
+        cls.small = PricingTier.objects.create(offer=cls.offer, tier_name="small", unit_price="10.00", minimum_quantity=1)
+        cls.large = PricingTier.objects.create(offer=cls.offer, tier_name="large", unit_price="8.00", minimum_quantity=10)
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(self.owner)['access']}")
+
+    def test_create_with_taken_name(self):
+        response = self.api.post(
+            "/api/pricing-tiers/",
+            {"offer": self.offer.pk, "tier_name": "small", "unit_price": "9.00", "minimum_quantity": 5},
+            format="json",
+        )
+        self.assertEqual(response.status_code, 400)
+        self.assertIn("tier_name", response.data)
+
+    def test_rename_to_taken_name(self):
+        for method in ("patch", "put"):
+            response = getattr(self.api, method)(
+                f"/api/pricing-tiers/{self.large.pk}/",
+                {"tier_name": "small", "unit_price": "8.00", "minimum_quantity": 10},
+                format="json",
+            )
+            self.assertEqual(response.status_code, 400, method)
+            self.assertIn("tier_name", response.data)
+
+    def test_update_keeping_own_name(self):
+        response = self.api.patch(
+            f"/api/pricing-tiers/{self.large.pk}/", {"tier_name": "large", "unit_price": "7.50"}, format="json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.large.refresh_from_db()
+        self.assertEqual(self.large.unit_price, Decimal("7.50"))
+
+
+class BulkPricesTests(TestCase):
+    """POST /api/offers/bulk-prices/: CSV / NDJSON rows applied for the caller's own seller only."""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user(username="bulk", password="x")
+        cls.seller = Seller.objects.create(user=cls.owner, company_name="Bulk Steel")
+        cls.rival = Seller.objects.create(
+            user=User.objects.create_user(username="rival", password="x"), company_name="Rival Steel"
+        )
+        cls.product = Product.objects.create(name="Coil", description="")
+        cls.new_product = Product.objects.create(name="Pipe", description="")
+        cls.offer = Offer.objects.create(product=cls.product, seller=cls.seller)
+        cls.foreign = Offer.objects.create(product=cls.product, seller=cls.rival)
+        cls.tier = PricingTier.objects.create(offer=cls.offer, tier_name="small", unit_price="10.00", minimum_quantity=1)
+        cls.foreign_tier = PricingTier.objects.create(
+            offer=cls.foreign, tier_name="small", unit_price="10.00", minimum_quantity=1
+        )
+
+    def setUp(self):
+        self.api = APIClient()
+        self.api.credentials(HTTP_AUTHORIZATION=f"Bearer {tokens_for_user(self.owner)['access']}")
+
+    def post(self, body, content_type):
+        return self.api.post("/api/offers/bulk-prices/", body, content_type=content_type)
+
+    def test_csv(self):
+        body = "\n".join([
+            "offer,tier_name,unit_price,minimum_quantity,maximum_quantity",
+            f"{self.offer.pk},small,9.50,,",
+            f"{self.offer.pk},bulk,7.00,50,",
+            f"{self.foreign.pk},small,1.00,,",
+            f"{self.offer.pk},small,abc,,",
+            f"{self.offer.pk},missing,5.00,,",
+            f"{self.offer.pk},small,9.25,,",  # same tier again: the last row wins
+        ]) + "\n"
+        response = self.post(body, "text/csv")
+        self.assertEqual(response.status_code, 200)
+        report = response.data
+        self.assertEqual(
+            {key: report[key] for key in ("rows", "upserted", "updated", "offers_created", "errors")},
+            {"rows": 6, "upserted": 1, "updated": 1, "offers_created": 0, "errors": 3},
+        )
+        self.assertEqual(
+            [(error["line"], error["error"]) for error in report["error_rows"]],
+            [
+                (5, "unit_price must be a decimal number"),
+                (4, f"offer {self.foreign.pk} belongs to another seller"),
+                (6, f"offer {self.offer.pk} has no tier 'missing' (send minimum_quantity to create it)"),
+            ],
+        )
+        self.tier.refresh_from_db()
+        self.assertEqual(self.tier.unit_price, Decimal("9.25"))
+        bulk = PricingTier.objects.get(offer=self.offer, tier_name="bulk")
+        self.assertEqual((bulk.unit_price, bulk.minimum_quantity), (Decimal("7.00"), 50))
+        self.foreign_tier.refresh_from_db()
+        self.assertEqual(self.foreign_tier.unit_price, Decimal("10.00"))
+
+    def test_ndjson(self):
+        body = "\n".join([
+            json.dumps({"product_id": self.new_product.pk, "tier": "base", "unit_price": "12.5", "minimum_quantity": 1}),
+            json.dumps({"product": self.product.pk, "seller": self.rival.pk, "tier_name": "small", "unit_price": "1"}),
+            "{not json",
+            json.dumps({"offer": self.offer.pk, "tier_name": "band", "unit_price": "8", "minimum_quantity": 10,
+                        "maximum_quantity": 5}),
+            json.dumps({"offer": self.foreign.pk, "tier_name": "small", "unit_price": "2", "minimum_quantity": 1}),
+        ])
+        response = self.post(body, "application/x-ndjson")
+        self.assertEqual(response.status_code, 200)
+        report = response.data
+        self.assertEqual(
+            {key: report[key] for key in ("rows", "upserted", "updated", "offers_created", "errors")},
+            {"rows": 5, "upserted": 1, "updated": 0, "offers_created": 1, "errors": 4},
+        )
+        self.assertEqual(
+            sorted((error["line"], error["error"]) for error in report["error_rows"]),
+            [
+                (2, "seller must be your own seller"),
+                (3, "invalid JSON"),
+                (4, "maximum_quantity must be greater than or equal to minimum_quantity"),
+                (5, f"offer {self.foreign.pk} belongs to another seller"),
+            ],
+        )
+        offer = Offer.objects.get(product=self.new_product, seller=self.seller)
+        self.assertEqual(offer.pricing_tiers.get().unit_price, Decimal("12.50"))
+        self.foreign_tier.refresh_from_db()
+        self.assertEqual(self.foreign_tier.unit_price, Decimal("10.00"))
+        self.assertFalse(Offer.objects.filter(product=self.new_product, seller=self.rival).exists())
+
+    def test_unsupported_content_type(self):
+        self.assertEqual(self.post("{}", "application/json").status_code, 415)
+
+
+class CatalogExportTests(TestCase):
+    """GET /api/export/products.<fmt> streams without buffering under both handlers."""
+
+    @classmethod
+    def setUpTestData(cls):
+        Product.objects.create(name="Rebar 12mm", description="")
+
+    def test_wsgi_streams_sync_iterator(self):
+        response = self.client.get("/api/export/products.csv")
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.is_async)
+        self.assertIn(b"Rebar 12mm", b"".join(response.streaming_content))
+
+    async def test_asgi_streams_async_iterator(self):
+        response = await AsyncClient().get("/api/export/products.csv")
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.is_async)
+        self.assertIn(b"Rebar 12mm", b"".join([block async for block in response.streaming_content]))
 
-# Create your tests here.
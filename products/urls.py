@@ -1,14 +1,17 @@
 # products/urls.py
 from rest_framework.routers import DefaultRouter
-from django.urls import path, include
+from django.urls import path, re_path, include
 from .views import (
     ProductViewSet, ProductCategoryViewSet, ProductImageViewSet,
     ProductSpecificationViewSet, ProductStandardViewSet,
     SpecificationAttributeViewSet, SpecificationValueViewSet,
     OfferViewSet, PricingTierViewSet, DeliveryLocationViewSet,
-    ProductDocumentViewSet, SellerViewSet
+    ProductDocumentViewSet, SellerViewSet, CatalogExportView, ChangeFeedView, PriceIndexView
 )
 from .api_views import ProductSummaryViewSet
+from .async_views import (
+    AsyncProductListView, AsyncProductDetailView, AsyncProductSummaryListView, AsyncOfferListView, LiveOffersView
+)
 
 
 router = DefaultRouter()
@@ -27,4 +30,17 @@ router.register(r'sellers', SellerViewSet, basename='seller')
 router.register(r'products-summary', ProductSummaryViewSet, basename='product-summary')
 urlpatterns = [
     path('', include(router.urls)),
+    # async (ASGI) read path for the hot catalog endpoints, see products/async_views.py
+    path('async/products/', AsyncProductListView.as_view(), name='async-product-list'),
+    path('async/products/<int:pk>/', AsyncProductDetailView.as_view(), name='async-product-detail'),
+    path('async/products-summary/', AsyncProductSummaryListView.as_view(), name='async-product-summary-list'),
+    path('async/offers/', AsyncOfferListView.as_view(), name='async-offer-list'),
+    # Server-Sent Events with offer/tier changes of product pages, see products/live.py
+    path('live/offers/', LiveOffersView.as_view(), name='live-offers'),
+    # delta sync change feed, see products/changes.py
+    path('changes/', ChangeFeedView.as_view(), name='change-feed'),
+    # daily price index per grade / material / incoterm, see products/price_index.py
+    path('price-index/', PriceIndexView.as_view(), name='price-index'),
+    # streaming CSV / NDJSON export, see products/export.py
+    re_path(r'^export/products\.(?P<fmt>csv|ndjson)$', CatalogExportView.as_view(), name='catalog-export'),
 ]
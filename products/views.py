@@ -4,7 +4,14 @@ from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
 from django_filters.rest_framework import DjangoFilterBackend
 from django.shortcuts import get_object_or_404
+from django.conf import settings
 from rest_framework.decorators import action
+from rest_framework.views import APIView
+from django.core.handlers.asgi import ASGIRequest
+from django.http import StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.dateparse import parse_date
+from core.throttling import RateLimitMixin
 
 from django.db.models import Min
 
@@ -12,7 +19,7 @@ from django.db.models import Min
 from .models import (
     Product, ProductCategory, ProductImage, ProductSpecification,
     ProductStandard, SpecificationAttribute, SpecificationValue,
-    Offer, PricingTier, DeliveryLocation, ProductDocument, Seller
+    Offer, PricingTier, DeliveryLocation, ProductDocument, Seller, SellerStats, PriceIndex
 )
 
 # سریالایزرها (باید فایل serializers.py را مطابق نیازت داشته باشی)
@@ -21,12 +28,18 @@ from .serializers import (
     ProductCategorySerializer, ProductImageSerializer, ProductSpecificationSerializer,
     ProductStandardSerializer, SpecificationAttributeSerializer, SpecificationValueSerializer,
     OfferReadSerializer, OfferWriteSerializer, PricingTierSerializer, DeliveryLocationSerializer,
-    ProductDocumentSerializer, SellerSerializer
+    ProductDocumentSerializer, SellerSerializer, SellerStatsSerializer, PriceIndexSerializer
 )
 
+from core.identity import share_related
+from . import refdata
+from .bulk_pricing import BulkRepricer, format_for_content_type, parser_for
+from . import changes, export, popularity, price_history, similarity, stats
+from core.instrumentation import InstrumentedViewMixin
+
 # فیلترها و مجوزها (permissions)
-from .filters import ProductFilter, OfferFilter  
-from .permissions import IsAdminOrReadOnly, HasSellerProfile, IsOfferOwner, IsSellerOwnerOrAdmin
+from .filters import ProductFilter, OfferFilter, PriceIndexFilter  
+from .permissions import IsAdminOrReadOnly, HasSellerProfile, IsOfferOwner, IsSellerOwnerOrAdmin, user_seller_id
 
 # ---------------- Pagination استاندارد برای viewset ها ----------------
 class StandardResultsSetPagination(PageNumberPagination):
@@ -36,7 +49,7 @@ class StandardResultsSetPagination(PageNumberPagination):
 
 
 # ---------------- ProductCategoryViewSet ----------------
-class ProductCategoryViewSet(viewsets.ModelViewSet):
+class ProductCategoryViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """
     مدیریت دسته‌بندی‌ها (درختی با mptt).
     - فقط admin می‌تواند دسته جدید بسازد/ویرایش کند (IsAdminOrReadOnly).
@@ -52,22 +65,28 @@ class ProductCategoryViewSet(viewsets.ModelViewSet):
 
 
 # ---------------- ProductViewSet ----------------
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """
     عملیات CRUD روی محصولات:
     - queryset با select_related/prefetch_related برای کارایی بهتر
     - همچنین annotate برای min_price تا فرانت سریع‌تر کمترین قیمت محصول را دریافت کند
     - برای خواندن عمومی است؛ نوشتن فقط برای admin (IsAdminOrReadOnly)
     """
-    queryset = Product.objects.select_related("category").prefetch_related(
-        "images", "documents", "offers", "dynamic_specs"
+    # category and specifications.standard come from the reference data cache (prepare_for_serialization)
+    queryset = Product.objects.select_related("specifications").prefetch_related(
+        "images", "documents", "dynamic_specs",
+        # OfferReadSerializer (nested) needs seller, tiers and delivery options of every offer
+        "offers__seller", "offers__pricing_tiers", "offers__delivery_options",
     ).annotate(min_price=Min('offers__pricing_tiers__unit_price'))  # حداقل قیمت از بین offers -> pricing_tiers
     permission_classes = [IsAdminOrReadOnly]
     filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
     filterset_class = ProductFilter    
     search_fields = ["name", "short_description", "description", "slug"]
-    ordering_fields = ["created_at", "updated_at", "name", "min_price"]
+    # popularity / trending: decayed view scores (products/popularity.py), e.g. ordering=-popularity
+    ordering_fields = ["created_at", "updated_at", "name", "min_price", *popularity.ORDERING_FIELDS]
     pagination_class = StandardResultsSetPagination
+    # rows repeated across the products of a page: one instance (and one rendered dict) each per request
+    shared_relations = ("category", "specifications.standard", "offers.seller")
 
     def get_serializer_class(self):
         """
@@ -82,6 +101,28 @@ class ProductViewSet(viewsets.ModelViewSet):
             return ProductDetailSerializer
         return ProductWriteSerializer
 
+    def get_queryset(self):
+        # product_offers / similar / price_history only need the product row; skip the list prefetches
+        if self.action in ("product_offers", "similar", "price_history"):
+            return Product.objects.all()
+        return popularity.annotate_for_ordering(super().get_queryset(), self.request)
+
+    def retrieve(self, request, *args, **kwargs):
+        response = super().retrieve(request, *args, **kwargs)
+        # buffered in memory and flushed in batches, see products/popularity.py
+        popularity.record_view(kwargs.get(self.lookup_url_kwarg or self.lookup_field))
+        return response
+
+    def prepare_for_serialization(self, products):
+        refdata.categories.attach(products, "category")
+        refdata.standards.attach(products, "specifications.standard")
+        share_related(self.request, products, self.shared_relations)
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ("list", "retrieve") and args:
+            self.prepare_for_serialization(args[0])
+        return super().get_serializer(*args, **kwargs)
+
     def get_permissions(self):
         # allow authenticated sellers to create products (they will then create Offers)
         if self.action == 'create':
@@ -96,10 +137,137 @@ class ProductViewSet(viewsets.ModelViewSet):
         برگشت لیست offers که برای این محصول ثبت شده‌اند.
         """
         product = self.get_object()
-        offers = product.offers.select_related("seller").prefetch_related("pricing_tiers", "delivery_options").all()
+        offers = list(product.offers.select_related("seller").prefetch_related("pricing_tiers", "delivery_options").all())
+        share_related(request, offers, ("seller",))
         serializer = OfferReadSerializer(offers, many=True, context={"request": request})
         return Response(serializer.data)
 
+    @action(detail=True, methods=["get"], url_path="similar")
+    def similar(self, request, pk=None):
+        """
+        محصولات مشابه (همان نوع متریال، نزدیک‌ترین ابعاد و وزن، گرید/استاندارد سازگار):
+        GET /api/products/{pk}/similar/?limit=12
+        از ایندکس memory-mapped (products/similarity.py) خوانده می‌شود؛ نزدیک‌ترین اول.
+        """
+        product = self.get_object()
+        try:
+            limit = int(request.query_params.get("limit", getattr(settings, "SIMILARITY_DEFAULT_LIMIT", 12)))
+        except ValueError:
+            return Response({"detail": "limit must be an integer."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = max(1, min(limit, getattr(settings, "SIMILARITY_MAX_LIMIT", 50)))
+
+        neighbours = similarity.index.similar(product.pk, limit) or []
+        distances = dict(neighbours)
+        # the index may lag behind deactivations by one rebuild
+        products = {p.pk: p for p in super().get_queryset().filter(pk__in=distances, is_active=True)}
+        ordered = [products[pk] for pk, _ in neighbours if pk in products]
+        self.prepare_for_serialization(ordered)
+        data = ProductListSerializer(ordered, many=True, context=self.get_serializer_context()).data
+        for item in data:
+            item["distance"] = round(distances[item["id"]], 4)
+        return Response({"product_id": product.pk, "results": data})
+
+    @action(detail=True, methods=["get"], url_path="price-history")
+    def price_history(self, request, pk=None):
+        """
+        نمودار تاریخچهٔ قیمت محصول (همهٔ tierها و فروشنده‌ها):
+        GET /api/products/{pk}/price-history/?bucket=day|week&from=YYYY-MM-DD&to=YYYY-MM-DD&seller=<id>
+        برای هر بازه: تعداد، کمینه، میانه و بیشینهٔ قیمت‌های ثبت‌شده (products/price_history.py).
+        """
+        product = self.get_object()
+        bucket = request.query_params.get("bucket", "day")
+        if bucket not in price_history.BUCKETS:
+            return Response({"detail": "bucket must be day or week."}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            dates = {}
+            for name in ("from", "to"):
+                value = request.query_params.get(name)
+                dates[name] = parse_date(value) if value else None
+                if value and dates[name] is None:
+                    raise ValueError(name)
+            seller_id = int(request.query_params["seller"]) if request.query_params.get("seller") else None
+        except ValueError:
+            return Response({"detail": "from/to must be dates (YYYY-MM-DD) and seller an integer."},
+                            status=status.HTTP_400_BAD_REQUEST)
+        buckets = price_history.bucket_stats(
+            product.pk, bucket, since=dates["from"], until=dates["to"], seller_id=seller_id
+        )
+        return Response({"product_id": product.pk, "bucket": bucket, "results": buckets})
+
+
+# ---------------- CatalogExportView ----------------
+class CatalogExportView(RateLimitMixin, APIView):
+    """
+    GET /api/export/products.csv | /api/export/products.ndjson
+    کل کاتالوگ (محصول، مشخصات، offers و pricing tiers) به صورت stream؛
+    همان فیلترهای ProductFilter (category, is_active, steel_grade, ...) را می‌پذیرد.
+    Gzip-compressed on the fly when the client sends Accept-Encoding: gzip.
+    See products/export.py.
+    """
+    permission_classes = [permissions.AllowAny]
+    throttle_scope = "export"
+
+    def get(self, request, fmt):
+        filterset = ProductFilter(request.GET, queryset=Product.objects.all(), request=request)
+        if not filterset.is_valid():
+            return Response(filterset.errors, status=status.HTTP_400_BAD_REQUEST)
+        products = export.iter_products(export.export_queryset(filterset.qs))
+        use_gzip = "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "").lower()
+        blocks = export.encode(export.export_lines(fmt, products), gzip=use_gzip)
+        if isinstance(request._request, ASGIRequest):
+            # the ASGI handler would buffer a sync iterator whole; WSGI needs the sync one
+            blocks = export.aiter_blocks(blocks)
+        response = StreamingHttpResponse(blocks, content_type=export.CONTENT_TYPES[fmt])
+        response["Content-Disposition"] = f'attachment; filename="products.{fmt}"'
+        if use_gzip:
+            response["Content-Encoding"] = "gzip"
+        patch_vary_headers(response, ("Accept-Encoding",))
+        return response
+
+
+# ---------------- ChangeFeedView ----------------
+class ChangeFeedView(APIView):
+    """
+    GET /api/changes/?since=<seq>&limit=<n>
+    تغییرات کاتالوگ بعد از seq داده‌شده (delta sync برای indexer و کش اپلیکیشن موبایل):
+    upsert با ردیف فعلی و tombstone برای حذف‌ها، هر ردیف فقط یک بار.
+    Poll again with `next` until has_more is false; see products/changes.py.
+    """
+    permission_classes = [permissions.AllowAny]
+
+    def get(self, request):
+        try:
+            since = int(request.query_params.get("since", 0))
+            limit = int(request.query_params.get("limit", getattr(settings, "CHANGES_PAGE_SIZE", 500)))
+        except ValueError:
+            return Response({"detail": "since and limit must be integers."}, status=status.HTTP_400_BAD_REQUEST)
+        if since < 0 or limit < 1:
+            return Response({"detail": "since must be >= 0 and limit >= 1."}, status=status.HTTP_400_BAD_REQUEST)
+        limit = min(limit, getattr(settings, "CHANGES_MAX_PAGE_SIZE", 5000))
+        return Response(changes.read_changes(since, limit))
+
+
+# ---------------- PriceIndexView ----------------
+class PriceIndexPagination(PageNumberPagination):
+    # a year of one series per page
+    page_size = 366
+    page_size_query_param = "page_size"
+    max_page_size = 2000
+
+
+class PriceIndexView(generics.ListAPIView):
+    """
+    GET /api/price-index/?steel_grade=ST37&material_type=sheet&incoterm=FOB&from=2025-01-01&to=2025-03-31
+    شاخص روزانهٔ قیمت هر تن (p10 / p50 / p90 و تعداد offerها) به تفکیک گرید، نوع متریال و incoterm؛
+    به‌صورت batch با `manage.py compute_price_index` محاسبه می‌شود (products/price_index.py).
+    """
+    queryset = PriceIndex.objects.order_by("steel_grade", "material_type", "incoterm", "day")
+    serializer_class = PriceIndexSerializer
+    permission_classes = [permissions.AllowAny]
+    filter_backends = [DjangoFilterBackend]
+    filterset_class = PriceIndexFilter
+    pagination_class = PriceIndexPagination
+
 
 # ---------------- ProductSpecificationViewSet ----------------
 class ProductSpecificationViewSet(viewsets.ModelViewSet):
@@ -177,7 +345,7 @@ class ProductImageViewSet(viewsets.ModelViewSet):
         product = serializer.validated_data.get("product")
         user = self.request.user
         if product and hasattr(product, "seller"):
-            if not (user.is_staff or user.is_superuser or (hasattr(user, "seller_profile") and user.seller_profile == product.seller)):
+            if not (user.is_staff or user.is_superuser or user_seller_id(user) == product.seller_id):
                 raise PermissionError("You are not the owner of the product.")
         serializer.save()
 
@@ -202,7 +370,7 @@ class ProductDocumentViewSet(viewsets.ModelViewSet):
 
 
 # ---------------- OfferViewSet ----------------
-class OfferViewSet(viewsets.ModelViewSet):
+class OfferViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """
     مدیریت پیشنهاد فروش (Offer) که یک فروشنده برای یک محصول ثبت می‌کند.
     - list/retrieve: عمومی (AllowAny)
@@ -216,6 +384,15 @@ class OfferViewSet(viewsets.ModelViewSet):
     search_fields = ["product__name", "seller__company_name"]
     ordering_fields = ["created_at"]
     pagination_class = StandardResultsSetPagination
+    shared_relations = ("seller",)
+
+    def prepare_for_serialization(self, offers):
+        share_related(self.request, offers, self.shared_relations)
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ("list", "retrieve") and args:
+            self.prepare_for_serialization(args[0])
+        return super().get_serializer(*args, **kwargs)
 
     def get_serializer_class(self):
         # برای نمایش از OfferReadSerializer (شامل pricing tiers و delivery options)
@@ -235,20 +412,45 @@ class OfferViewSet(viewsets.ModelViewSet):
             return [permissions.AllowAny()]
         if self.action == "create":
             return [permissions.IsAuthenticated(), HasSellerProfile()]
+        if self.action == "bulk_prices":
+            # ownership is checked per row inside (sellers: own offers only; staff: any seller)
+            return [permissions.IsAuthenticated()]
         return [permissions.IsAuthenticated(), IsOfferOwner()]
 
+    @action(detail=False, methods=["post"], url_path="bulk-prices")
+    def bulk_prices(self, request):
+        """
+        POST /api/offers/bulk-prices/ with Content-Type text/csv or application/x-ndjson:
+        reprice / upsert many pricing tiers at once (format: products.bulk_pricing).
+        Sellers may only touch their own offers; staff without a seller may address any seller.
+        Returns {rows, upserted, updated, offers_created, errors, error_rows}.
+        """
+        fmt = format_for_content_type(request.content_type)
+        if fmt is None:
+            return Response(
+                {"detail": "Send the rows as text/csv or application/x-ndjson."},
+                status=status.HTTP_415_UNSUPPORTED_MEDIA_TYPE,
+            )
+        user = request.user
+        seller_id = user_seller_id(user)
+        if seller_id is None and not user.is_staff:
+            return Response({"detail": "User does not have a seller profile."}, status=status.HTTP_403_FORBIDDEN)
+        # rows are read line by line from the request stream; request.data is never parsed
+        report = BulkRepricer(seller_id=seller_id).run(parser_for(fmt)(request._request))
+        return Response(report, status=status.HTTP_200_OK)
+
     def perform_create(self, serializer):
         """
         هنگام ایجاد، seller از profile کاربر گرفته می‌شود (و ذخیره می‌شود).
         اگر کاربر seller profile نداشته باشد، HasSellerProfile معمولاً جلوی این مسیر را گرفته،
         اما اینجا هم چک ایمنی انجام می‌دهیم.
         """
-        user = self.request.user
-        if not hasattr(user, "seller_profile"):
+        seller_id = user_seller_id(self.request.user)
+        if seller_id is None:
             # اگر دوست داری پیام و نوع خطا را تغییر دهی، اینجا تنظیم کن
             raise PermissionError("User does not have a seller profile.")
-        seller = user.seller_profile
-        serializer.save(seller=seller)
+        # seller_id comes from the token claims; a pk-only instance avoids loading the row
+        serializer.save(seller=Seller(pk=seller_id))
 
 
 # ---------------- PricingTierViewSet ----------------
@@ -282,10 +484,11 @@ class PricingTierViewSet(viewsets.ModelViewSet):
         
         # مالکیت را بررسی می‌کنیم
         user = request.user
-        if not (user.is_staff or user.is_superuser or (hasattr(user, "seller_profile") and offer.seller == user.seller_profile)):
+        if not (user.is_staff or user.is_superuser or offer.seller_id == user_seller_id(user)):
             return Response({"detail": "You are not the owner of this offer."}, status=status.HTTP_403_FORBIDDEN)
         
-        serializer = self.get_serializer(data=request.data)
+        # the serializer checks the tier name against the other tiers of this offer
+        serializer = self.get_serializer(data=request.data, context={**self.get_serializer_context(), "offer": offer})
         serializer.is_valid(raise_exception=True)
         instance = serializer.save(offer=offer)  # offer را صریحاً پاس می‌دهیم
         headers = self.get_success_headers(serializer.data)
@@ -316,7 +519,7 @@ class DeliveryLocationViewSet(viewsets.ModelViewSet):
             return Response({"detail": "offer (id) is required."}, status=status.HTTP_400_BAD_REQUEST)
         offer = get_object_or_404(Offer, pk=offer_id)
         user = request.user
-        if not (user.is_staff or user.is_superuser or (hasattr(user, "seller_profile") and offer.seller == user.seller_profile)):
+        if not (user.is_staff or user.is_superuser or offer.seller_id == user_seller_id(user)):
             return Response({"detail": "You are not the owner of this offer."}, status=status.HTTP_403_FORBIDDEN)
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -337,7 +540,7 @@ class ProductStandardViewSet(viewsets.ModelViewSet):
     
 
 # ---------------- SellerViewSet ----------------
-class SellerViewSet(viewsets.ModelViewSet):
+class SellerViewSet(InstrumentedViewMixin, viewsets.ModelViewSet):
     """
     مدیریت پروفایل فروشندگان (Seller model).
     رفتار مجوزی:
@@ -354,6 +557,9 @@ class SellerViewSet(viewsets.ModelViewSet):
     def get_permissions(self):
         if self.action in ["list", "retrieve"]:
             return [permissions.AllowAny()]
+        if self.action == "seller_stats":
+            # owner / staff check is done in the action, without loading the seller
+            return [permissions.IsAuthenticated()]
         if self.action == "create":
             # برای ساخت صفحهٔ شرکت، کاربر باید لاگین کرده و HasSellerProfile را داشته باشد
             return [permissions.IsAuthenticated(), HasSellerProfile()]
@@ -384,7 +590,7 @@ class SellerViewSet(viewsets.ModelViewSet):
                 'is_verified': validated.get('is_verified', False),
             }
             with transaction.atomic():
-                seller_obj, created = Seller.objects.get_or_create(user=user, defaults=defaults)
+                seller_obj, created = Seller.objects.get_or_create(user_id=user.pk, defaults=defaults)
 
                 # If created is True, we should ensure any additional fields validated
                 # are saved (get_or_create already saved defaults).
@@ -395,12 +601,34 @@ class SellerViewSet(viewsets.ModelViewSet):
             # In rare race conditions, another transaction may have created the Seller
             # between our check and create. Try to fetch the existing Seller and attach it.
             try:
-                seller_obj = Seller.objects.get(user=user)
+                seller_obj = Seller.objects.get(user_id=user.pk)
                 serializer.instance = seller_obj
                 return
             except Seller.DoesNotExist:
                 # If we still can't find it, re-raise so the error surfaces for investigation
                 raise
+
+    @action(detail=True, methods=["get"], url_path="stats")
+    def seller_stats(self, request, pk=None):
+        """
+        GET /api/sellers/{pk}/stats/
+        آمار داشبورد فروشنده (فقط صاحب فروشگاه یا admin): یک ردیف از SellerStats،
+        که پس از هر تغییر offers / tiers در پس‌زمینه بازمحاسبه می‌شود (products/stats.py).
+        """
+        try:
+            seller_id = int(pk)
+        except ValueError:
+            return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        user = request.user
+        if not (user.is_staff or user.is_superuser or user_seller_id(user) == seller_id):
+            self.permission_denied(request, message="Only the owner seller or admin can see these stats.")
+        row = SellerStats.objects.filter(seller_id=seller_id).first()
+        if row is None:
+            # never computed yet (new seller, or before the first reconcile)
+            row = stats.refresh(seller_id)
+            if row is None:
+                return Response({"detail": "Not found."}, status=status.HTTP_404_NOT_FOUND)
+        return Response(SellerStatsSerializer(row).data)
             
 # use in account/urls
 class SellerDetailView(generics.RetrieveUpdateAPIView):
@@ -410,6 +638,6 @@ class SellerDetailView(generics.RetrieveUpdateAPIView):
 
     def get_object(self):
         obj = super().get_object()
-        if obj.user != self.request.user:
+        if obj.user_id != self.request.user.pk:
             self.permission_denied(self.request)
         return obj
\ No newline at end of file
@@ -3,6 +3,11 @@ ASGI config for tg1 project.
 
 It exposes the ASGI callable as a module-level variable named ``application``.
 
+Serves the async catalog endpoints and the live offer updates stream
+(/api/live/offers/, Server-Sent Events) of products.async_views; each worker
+process runs one LISTEN thread for the stream (products.live), e.g.
+    gunicorn tg1.asgi:application -k uvicorn.workers.UvicornWorker
+
 For more information on this file, see
 https://docs.djangoproject.com/en/5.0/howto/deployment/asgi/
 """
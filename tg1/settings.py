@@ -10,8 +10,12 @@ For the full list of settings and their values, see
 https://docs.djangoproject.com/en/5.0/ref/settings/
 """
 
+import importlib.util
+import os
 from pathlib import Path
 
+from corsheaders.defaults import default_headers
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
@@ -49,6 +53,7 @@ INSTALLED_APPS = [
     "corsheaders",
     'accounts',
     'tags',
+    'jobs',
     
 ]
 # Optionally enable drf-spectacular if it's installed in the environment.
@@ -78,9 +83,11 @@ REST_FRAMEWORK = {
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
 
-    # Authentication: include JWT (simplejwt) and session auth as fallbacks
+    # Authentication: include JWT (simplejwt) and session auth as fallbacks.
+    # The JWT carries authorization claims, so request.user needs no query
+    # (accounts/authentication.py).
     'DEFAULT_AUTHENTICATION_CLASSES': (
-        'rest_framework_simplejwt.authentication.JWTAuthentication',
+        'accounts.authentication.ClaimsJWTAuthentication',
         'rest_framework.authentication.SessionAuthentication',
         'rest_framework.authentication.BasicAuthentication',
     ),
@@ -96,7 +103,11 @@ if globals().get('SPECTACULAR_AVAILABLE'):
         'VERSION': '1.0.0',
     }
 MIDDLEWARE = [
+    'core.middleware.PrometheusMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'core.middleware.SQLInstrumentationMiddleware',
+    'core.middleware.NPlusOneDetectionMiddleware',
+    'core.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     "corsheaders.middleware.CorsMiddleware",
     'django.middleware.common.CommonMiddleware',
@@ -104,6 +115,8 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'core.middleware.RequestProfilerMiddleware',
+    'core.middleware.MemoryProfilerMiddleware',
 ]
 
 ROOT_URLCONF = 'tg1.urls'
@@ -130,16 +143,91 @@ WSGI_APPLICATION = 'tg1.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.0/ref/settings/#databases
 
+def env_bool(name, default=False):
+    value = os.environ.get(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# Connection handling (all optional, defaults match docker-compose.yml):
+#   DB_CONN_MAX_AGE     seconds a connection is reused across requests (0 = new connection per request)
+#   DB_HEALTH_CHECKS    ping reused connections before the first query of a request
+#   DB_POOL             psycopg 3 in-process pool (Django 5.1+); CONN_MAX_AGE is forced to 0,
+#                       the pool keeps the connections instead. DB_POOL_MIN_SIZE / DB_POOL_MAX_SIZE /
+#                       DB_POOL_TIMEOUT size it per worker process.
+#   DB_PGBOUNCER        running behind pgbouncer in transaction mode: no server-side cursors
+#                       (iterator() would lose its cursor between transactions) and no
+#                       prepared statements (psycopg 3 prepares repeated queries by default)
+DB_POOL = env_bool("DB_POOL")
+DB_PGBOUNCER = env_bool("DB_PGBOUNCER")
+
 DATABASES = {
     'default': {
-        'ENGINE': 'django.db.backends.postgresql_psycopg2', # موتور دیتابیس
-        'NAME': 'alibackend_db', # نام دیتابیس (همان که در docker-compose.yml تعریف کردید)
-        'USER': 'ariakh', # نام کاربری (همان که در docker-compose.yml تعریف کردید)
-        'PASSWORD': '123456', # رمز عبور (همان که در docker-compose.yml تعریف کردید)
-        'HOST': 'localhost', # نام سرویس دیتابیس در docker-compose.yml (نه localhost!)
-        'PORT': '5432', # پورت پیش فرض PostgreSQL
+        'ENGINE': 'django.db.backends.postgresql', # موتور دیتابیس
+        'NAME': os.environ.get('DB_NAME', 'alibackend_db'), # نام دیتابیس (همان که در docker-compose.yml تعریف کردید)
+        'USER': os.environ.get('DB_USER', 'ariakh'), # نام کاربری (همان که در docker-compose.yml تعریف کردید)
+        'PASSWORD': os.environ.get('DB_PASSWORD', '123456'), # رمز عبور (همان که در docker-compose.yml تعریف کردید)
+        'HOST': os.environ.get('DB_HOST', 'localhost'), # نام سرویس دیتابیس در docker-compose.yml (نه localhost!)
+        'PORT': os.environ.get('DB_PORT', '5432'), # پورت پیش فرض PostgreSQL
+        'CONN_MAX_AGE': 0 if DB_POOL else int(os.environ.get('DB_CONN_MAX_AGE', '60')),
+        'CONN_HEALTH_CHECKS': env_bool('DB_HEALTH_CHECKS', True),
+        'DISABLE_SERVER_SIDE_CURSORS': DB_PGBOUNCER,
+        'OPTIONS': {},
     }
 }
+if DB_POOL:
+    DATABASES['default']['OPTIONS']['pool'] = {
+        'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', '2')),
+        'max_size': int(os.environ.get('DB_POOL_MAX_SIZE', '10')),
+        'timeout': float(os.environ.get('DB_POOL_TIMEOUT', '10')),
+    }
+if DB_PGBOUNCER and importlib.util.find_spec('psycopg'):
+    # psycopg 3 only (Django prefers it when installed); psycopg2 never prepares statements
+    DATABASES['default']['OPTIONS']['prepare_threshold'] = None
+
+# Read replica (core.db_router / core.middleware.ReplicaRoutingMiddleware).
+#   DB_REPLICA_HOST (+ optional DB_REPLICA_PORT / _NAME / _USER / _PASSWORD) adds a "replica"
+#   alias; DB_REPLICA_SAME_AS_PRIMARY=1 points it at the primary database (for tests and
+#   local checks of the routing; TEST MIRROR keeps the test runner from creating a copy).
+if os.environ.get('DB_REPLICA_HOST') or env_bool('DB_REPLICA_SAME_AS_PRIMARY'):
+    DATABASES['replica'] = {
+        **DATABASES['default'],
+        'OPTIONS': dict(DATABASES['default']['OPTIONS']),
+        'TEST': {'MIRROR': 'default'},
+    }
+    if not env_bool('DB_REPLICA_SAME_AS_PRIMARY'):
+        for key in ('HOST', 'PORT', 'NAME', 'USER', 'PASSWORD'):
+            if os.environ.get(f'DB_REPLICA_{key}'):
+                DATABASES['replica'][key] = os.environ[f'DB_REPLICA_{key}']
+
+DATABASE_ROUTERS = ['core.db_router.ReplicaRouter']
+# paths always served from the primary, even for GET
+DB_PRIMARY_PATHS = ('/admin/', '/api/auth/', '/api/token/', '/api/me/')
+# after a successful write the client reads from the primary for this long
+DB_REPLICA_STICKY_SECONDS = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', '10'))
+DB_REPLICA_STICKY_COOKIE = 'db_primary'
+# the same pin for cross-origin clients (bearer tokens, no cookies): returned after a write,
+# echoed back by the client as a request header (allowed and exposed in the CORS settings)
+DB_REPLICA_STICKY_HEADER = 'X-DB-Primary-Until'
+
+
+# Shared cache (e.g. the rate limits of core.throttling). Without REDIS_URL every worker
+# process has its own local-memory cache.
+REDIS_URL = os.environ.get('REDIS_URL', '')
+if REDIS_URL:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': REDIS_URL,
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        }
+    }
 
 
 # Password validation
@@ -186,6 +274,9 @@ DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
 ]
+# replica read-your-writes pin (core.middleware.ReplicaRoutingMiddleware)
+CORS_ALLOW_HEADERS = (*default_headers, DB_REPLICA_STICKY_HEADER.lower())
+CORS_EXPOSE_HEADERS = [DB_REPLICA_STICKY_HEADER]
 
 # development email backend: print emails to console
 if DEBUG:
@@ -195,6 +286,120 @@ if DEBUG:
 FRONTEND_BASE = "http://localhost:3000"
 DEFAULT_FROM_EMAIL = "noreply@example.com"
 
-# Verification resend rate-limit defaults
-VERIFICATION_RESEND_WINDOW_HOURS = 24
-VERIFICATION_RESEND_MAX = 5
\ No newline at end of file
+# Background jobs (jobs app, worker: `manage.py run_jobs`)
+JOBS_POLL_INTERVAL = 1.0
+# a job still "running" after this many seconds is considered abandoned and claimed again
+JOBS_LOCK_TIMEOUT = 10 * 60
+# retry delay: JOBS_BACKOFF_BASE * 2 ** (attempt - 1) seconds, at most JOBS_BACKOFF_MAX
+JOBS_BACKOFF_BASE = 10
+JOBS_BACKOFF_MAX = 60 * 60
+JOBS_KEEP_DONE_DAYS = 7
+
+# Rows per transaction of bulk price imports (products.bulk_pricing)
+BULK_PRICES_BATCH_SIZE = 1000
+
+# Products per server-side cursor fetch (and per offers/tiers prefetch) of catalog exports (products.export)
+EXPORT_CHUNK_SIZE = 500
+
+# Catalog change feed (products.changes, GET /api/changes/)
+CHANGES_PAGE_SIZE = 500
+CHANGES_MAX_PAGE_SIZE = 5000
+# a gap in the sequence younger than this may still be an open transaction; the feed waits for it
+CHANGES_GAP_TIMEOUT = 60
+# `manage.py compact_changes` drops superseded entries older than this
+CHANGES_COMPACT_AFTER_DAYS = 30
+
+# Live offer updates over SSE (products.live, GET /api/live/offers/, ASGI only): changes are
+# published with pg_notify and each ASGI process LISTENs on one connection of LIVE_UPDATES_DATABASE
+# (must be a direct connection, not through pgbouncer transaction pooling)
+LIVE_UPDATES = True
+LIVE_UPDATES_DATABASE = "default"
+LIVE_UPDATES_CHANNEL = "catalog_live"
+LIVE_MAX_PRODUCTS = 50
+# pending events per connection before it gets a reset and is closed
+LIVE_MAX_QUEUE = 100
+LIVE_REPLAY_LIMIT = 500
+LIVE_HEARTBEAT = 15
+
+# Seller dashboard rollups (products.stats): refresh jobs run this many seconds after the write,
+# so bursts of writes are recomputed once; `manage.py reconcile_seller_stats` repairs drift
+SELLER_STATS_REFRESH_DELAY = 5
+
+# Product view counters and popularity scores (products.popularity): views are buffered per
+# process and flushed every POPULARITY_FLUSH_INTERVAL seconds; `manage.py recompute_popularity`
+# (cron) rebuilds the decayed scores from the last POPULARITY_WINDOW_DAYS of daily counts
+POPULARITY_TRACKING = True
+POPULARITY_FLUSH_INTERVAL = 10
+POPULARITY_BUFFER_MAX = 10000
+POPULARITY_WINDOW_DAYS = 30
+POPULARITY_HALF_LIFE_DAYS = 7
+POPULARITY_TRENDING_HALF_LIFE_DAYS = 1
+POPULARITY_KEEP_DAYS = 90
+
+# Similar products (products.similarity, GET /api/products/<id>/similar/): memory-mapped index
+# built by `manage.py build_similarity_index`, partitions rebuilt by jobs SIMILARITY_UPDATE_DELAY
+# seconds after specification changes; workers pick up new files every SIMILARITY_RELOAD_INTERVAL
+SIMILARITY_INDEX_DIR = BASE_DIR / "var" / "similarity"
+SIMILARITY_UPDATE_DELAY = 30
+SIMILARITY_RELOAD_INTERVAL = 5
+# distance = weighted distance of the standardized log sizes + penalties for another grade / standard
+SIMILARITY_WEIGHTS = {"thickness_mm": 2.0, "width_mm": 1.0, "length_mm": 0.5, "weight_kg_per_unit": 1.0}
+SIMILARITY_GRADE_PENALTY = 1.0
+SIMILARITY_STANDARD_PENALTY = 0.5
+# grades that count as the same grade
+SIMILARITY_EQUIVALENT_GRADES = [("ST37", "S235JR", "A36"), ("ST52", "S355JR")]
+SIMILARITY_DEFAULT_LIMIT = 12
+SIMILARITY_MAX_LIMIT = 50
+
+# Daily price index (products.price_index, GET /api/price-index/), computed by
+# `manage.py compute_price_index` (cron); series with fewer offers are not published
+PRICE_INDEX_MIN_OFFERS = 3
+
+# Rate limits per endpoint scope (core.throttling): list of (key, rate) rules,
+# key is "ip", "user", "email" or "username" (request body field)
+RATE_LIMITS = {
+    "token": [("ip", "20/min"), ("username", "10/min")],
+    "register": [("ip", "10/hour"), ("email", "3/hour")],
+    "contact": [("ip", "5/hour")],
+    "verification_resend": [("user", "5/day")],
+    "export": [("ip", "10/hour")],
+}
+RATE_LIMIT_CACHE = "default"
+
+# In-process copies of categories/standards/spec attributes (products.refdata); each
+# process re-checks the table versions in this cache at most every REFDATA_VERSION_TTL seconds
+REFDATA_CACHE = "default"
+REFDATA_VERSION_TTL = 1.0
+
+# Render shared nested rows (seller, category, standard) once per GET request (core.identity)
+SERIALIZATION_MEMO = True
+
+# Per-request SQL instrumentation (core.middleware.SQLInstrumentationMiddleware)
+# fraction of requests instrumented; 1.0 in development, keep low in production
+SQL_INSTRUMENTATION_SAMPLE_RATE = 1.0 if DEBUG else 0.05
+# sampled requests slower than this are logged with their slowest statements
+SQL_SLOW_REQUEST_MS = 500
+SQL_SLOW_QUERY_TOP_N = 5
+
+# N+1 detection (core.middleware.NPlusOneDetectionMiddleware); development only.
+# Set NPLUSONE_RAISE = True in test settings to turn repeated queries into errors.
+NPLUSONE_DETECTION = DEBUG
+NPLUSONE_THRESHOLD = 5
+NPLUSONE_RAISE = False
+
+# On-demand request profiler (core.middleware.RequestProfilerMiddleware)
+# random fraction of requests profiled in addition to explicitly triggered ones
+PROFILER_SAMPLE_RATE = 0.0
+PROFILER_INTERVAL_MS = 1
+# lifetime of tokens printed by `manage.py profile_token`
+PROFILER_TOKEN_MAX_AGE = 60 * 60
+
+# Per-request allocation tracking (core.middleware.MemoryProfilerMiddleware)
+MEMORY_PROFILER_SAMPLE_RATE = 0.0
+MEMORY_PROFILER_TOP_N = 10
+MEMORY_PROFILER_STORE = True
+
+# Prometheus metrics (core.metrics, served at /metrics). With several gunicorn
+# workers set PROMETHEUS_MULTIPROC_DIR (see gunicorn.conf.py).
+# If set, scrapers must send "Authorization: Bearer <METRICS_TOKEN>".
+METRICS_TOKEN = os.environ.get("METRICS_TOKEN", "")
@@ -5,8 +5,7 @@ from django.conf.urls.static import static
 from django.urls import path, include 
 from rest_framework import routers
 from core import views as core_views
-from rest_framework_simplejwt.views import TokenRefreshView
-from accounts.auth_views import ActiveUserTokenObtainPairView
+from accounts.auth_views import ActiveUserTokenObtainPairView, ClaimsTokenRefreshView
 from django.conf import settings
 if settings.DEBUG:
     try:
@@ -24,11 +23,13 @@ urlpatterns += [
     path('api/', include('products.urls')),
     # expose contact API under /api/contact so frontend requests to `${API_BASE}/contact` work
     path('api/contact', core_views.ContactAPIView.as_view()),
+    # Prometheus scrape endpoint (see core/metrics.py)
+    path('metrics', core_views.metrics_view, name='metrics'),
     # include accounts URL patterns directly under /api/ so routes like
     # /api/auth/profile/ and /api/auth/register/ match frontend expectations
     path("api/", include("accounts.urls")),
     path("api/token/", ActiveUserTokenObtainPairView.as_view(), name="token_obtain_pair"),
-    path("api/token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
+    path("api/token/refresh/", ClaimsTokenRefreshView.as_view(), name="token_refresh"),
 
 ]
 
@@ -0,0 +1,55 @@
+"""Small helpers shared by the benchmark management commands.
+
+Only the standard library is used so the helpers can run inside any
+management command or a plain Python shell.
+
+Usage examples:
+    from utils.benchmarking import summarize
+
+    stats = summarize([1.2, 3.4, 2.2])   # {"count": 3, "p50": 2.2, ...}
+"""
+from __future__ import annotations
+
+import math
+from typing import Dict, Iterable, List, Sequence
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Return the `pct` percentile (0-100) of `values` using linear interpolation.
+
+    - An empty sequence -> 0.0
+    - `values` does not need to be sorted.
+    """
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    if len(ordered) == 1:
+        return float(ordered[0])
+    rank = (len(ordered) - 1) * (pct / 100.0)
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    if low == high:
+        return float(ordered[low])
+    return float(ordered[low] + (ordered[high] - ordered[low]) * (rank - low))
+
+
+def summarize(values: Iterable[float]) -> Dict[str, float]:
+    """Return count, mean, min, max and p50/p95/p99 of `values`."""
+    samples: List[float] = list(values)
+    if not samples:
+        return {"count": 0, "mean": 0.0, "min": 0.0, "max": 0.0, "p50": 0.0, "p95": 0.0, "p99": 0.0}
+    return {
+        "count": len(samples),
+        "mean": sum(samples) / len(samples),
+        "min": float(min(samples)),
+        "max": float(max(samples)),
+        "p50": percentile(samples, 50),
+        "p95": percentile(samples, 95),
+        "p99": percentile(samples, 99),
+    }
+
+
+__all__ = [
+    "percentile",
+    "summarize",
+]
@@ -0,0 +1,129 @@
+"""N+1 query detection for development and test runs.
+
+`NPlusOneDetector` is a `QueryRecorder` that additionally remembers where each
+statement came from. When one normalized fingerprint runs more than
+`threshold` times it is reported together with:
+
+- the innermost project frame that triggered it (file:line in function), and
+- the serializer field path being rendered at the time, e.g.
+  `ProductListSerializer.offers > OfferReadSerializer.seller`
+
+Usage examples:
+    from utils.nplusone import detect_n_plus_one
+
+    with detect_n_plus_one(threshold=3):      # raises NPlusOneError
+        client.get("/api/products/")
+
+    detector = NPlusOneDetector(threshold=5)
+    with detector.installed():
+        ...
+    print(detector.report())
+"""
+from __future__ import annotations
+
+import os
+import sys
+from collections import Counter
+from contextlib import contextmanager
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from django.conf import settings
+
+from .sql import QueryRecorder, QueryStats
+
+# frames from these files are plumbing, never the "cause" of a query
+_IGNORED_FILES = (
+    os.path.join("utils", "sql.py"),
+    os.path.join("utils", "nplusone.py"),
+    os.path.join("core", "middleware.py"),
+    "manage.py",
+    os.path.join("tg1", "wsgi.py"),
+    os.path.join("tg1", "asgi.py"),
+)
+
+
+class NPlusOneError(AssertionError):
+    """Raised when a fingerprint repeats more often than the allowed threshold."""
+
+
+def _project_root() -> str:
+    return str(getattr(settings, "BASE_DIR", os.getcwd()))
+
+
+def _call_site(frame, root: str) -> Tuple[str, str]:
+    """Return (innermost project frame, serializer field path) for `frame`."""
+    site = None
+    path: List[str] = []
+    while frame is not None:
+        code = frame.f_code
+        filename = code.co_filename
+        if code.co_name == "to_representation":
+            owner = frame.f_locals.get("self")
+            field = frame.f_locals.get("field")
+            if owner is not None and field is not None and hasattr(field, "field_name"):
+                path.append(f"{type(owner).__name__}.{field.field_name}")
+        if (
+            site is None
+            and filename.startswith(root)
+            and "site-packages" not in filename
+            and not filename.endswith(_IGNORED_FILES)
+        ):
+            site = f"{os.path.relpath(filename, root)}:{frame.f_lineno} in {code.co_name}"
+        frame = frame.f_back
+    return site or "<library code>", " > ".join(reversed(path))
+
+
+class NPlusOneDetector(QueryRecorder):
+    """Record statements with their call sites and flag repeated fingerprints."""
+
+    def __init__(self, threshold: Optional[int] = None):
+        super().__init__(fingerprints=True)
+        self.threshold = threshold if threshold is not None else getattr(settings, "NPLUSONE_THRESHOLD", 5)
+        self.root = _project_root()
+        self.call_sites: Dict[str, Counter] = {}
+
+    def record(self, sql: str, duration: float) -> Optional[QueryStats]:
+        stats = super().record(sql, duration)
+        # frame 0 = record, 1 = QueryRecorder.__call__, 2+ = the caller
+        site = _call_site(sys._getframe(2), self.root)
+        self.call_sites.setdefault(stats.fingerprint, Counter())[site] += 1
+        return stats
+
+    def offenders(self) -> List[Tuple[QueryStats, Counter]]:
+        """Fingerprints repeated more than `threshold` times with their call sites."""
+        return [
+            (stats, self.call_sites.get(stats.fingerprint, Counter()))
+            for stats in self.duplicates()
+            if stats.count > self.threshold
+        ]
+
+    def report(self) -> str:
+        lines = []
+        for stats, sites in self.offenders():
+            lines.append(f"{stats.count}x ({stats.total_time * 1000:.2f}ms) {stats.fingerprint[:200]}")
+            for (site, serializer_path), n in sites.most_common(3):
+                where = f"{site} [{serializer_path}]" if serializer_path else site
+                lines.append(f"    {n}x from {where}")
+        return "\n".join(lines)
+
+    def check(self) -> None:
+        """Raise NPlusOneError when any fingerprint exceeds the threshold."""
+        if self.offenders():
+            raise NPlusOneError(f"Repeated queries (threshold={self.threshold}):\n{self.report()}")
+
+
+@contextmanager
+def detect_n_plus_one(threshold: Optional[int] = None, raise_on_detect: bool = True) -> Iterator[NPlusOneDetector]:
+    """Run the enclosed block under an NPlusOneDetector and check it on exit."""
+    detector = NPlusOneDetector(threshold=threshold)
+    with detector.installed():
+        yield detector
+    if raise_on_detect:
+        detector.check()
+
+
+__all__ = [
+    "NPlusOneError",
+    "NPlusOneDetector",
+    "detect_n_plus_one",
+]
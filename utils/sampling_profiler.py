@@ -0,0 +1,111 @@
+"""A small wall-clock sampling profiler producing collapsed stacks.
+
+A background thread periodically grabs the target thread's current frame via
+`sys._current_frames()` and counts identical stacks. The result is emitted in
+the "collapsed" format understood by flamegraph.pl, speedscope and inferno:
+
+    core/middleware.py:__call__;rest_framework/views.py:dispatch;... 42
+
+Because it samples the whole stack, time spent in middleware, filtering,
+serialization, rendering and inside the DB driver (including execute
+wrappers) all shows up without any instrumentation of the code itself.
+
+Usage examples:
+    from utils.sampling_profiler import SamplingProfiler
+
+    profiler = SamplingProfiler(interval=0.002)
+    with profiler:
+        handle_request()
+    open("out.collapsed", "w").write(profiler.collapsed())
+"""
+from __future__ import annotations
+
+import os
+import sys
+import threading
+from collections import Counter
+from typing import Dict, Optional, Tuple
+
+
+def short_path(filename: str) -> str:
+    """Trim absolute paths to something readable in a flame graph."""
+    marker = "site-packages" + os.sep
+    idx = filename.rfind(marker)
+    if idx != -1:
+        return filename[idx + len(marker):]
+    cwd = os.getcwd() + os.sep
+    if filename.startswith(cwd):
+        return filename[len(cwd):]
+    return filename
+
+
+class SamplingProfiler:
+    """Sample the stack of one thread (default: the creating thread)."""
+
+    def __init__(self, interval: float = 0.001, thread_id: Optional[int] = None, max_depth: int = 200):
+        self.interval = interval
+        self.thread_id = thread_id if thread_id is not None else threading.get_ident()
+        self.max_depth = max_depth
+        self.samples = 0
+        self.stacks: Counter = Counter()
+        self._labels: Dict[object, str] = {}
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            label = self._labels[code] = f"{short_path(code.co_filename)}:{code.co_name}"
+        return label
+
+    def _sample(self) -> None:
+        frame = sys._current_frames().get(self.thread_id)
+        if frame is None:
+            return
+        stack = []
+        while frame is not None and len(stack) < self.max_depth:
+            stack.append(self._label(frame.f_code))
+            frame = frame.f_back
+        stack.reverse()
+        self.stacks[tuple(stack)] += 1
+        self.samples += 1
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self._sample()
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="sampling-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def __enter__(self) -> "SamplingProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def collapsed(self) -> str:
+        """Return the samples in collapsed-stack format, heaviest stacks first."""
+        return "\n".join(f"{';'.join(stack)} {count}" for stack, count in self.stacks.most_common())
+
+    def top_frames(self, limit: int = 10) -> Tuple[Tuple[str, int], ...]:
+        """Leaf frames with the most samples (self time)."""
+        leaves: Counter = Counter()
+        for stack, count in self.stacks.items():
+            if stack:
+                leaves[stack[-1]] += count
+        return tuple(leaves.most_common(limit))
+
+
+__all__ = [
+    "short_path",
+    "SamplingProfiler",
+]
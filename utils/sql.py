@@ -0,0 +1,119 @@
+"""SQL instrumentation helpers built on `connection.execute_wrapper`.
+
+`normalize_sql` turns a statement into a fingerprint by stripping literals
+and collapsing `IN (...)` lists, so the same query issued with different
+parameters groups together. `QueryRecorder` is an execute wrapper that
+counts statements, sums their time and aggregates them per fingerprint.
+
+Usage examples:
+    from utils.sql import QueryRecorder
+
+    recorder = QueryRecorder()
+    with recorder.installed():
+        list(Product.objects.all()[:10])
+    recorder.count, recorder.total_time, recorder.duplicates()
+"""
+from __future__ import annotations
+
+import re
+import time
+from contextlib import ExitStack, contextmanager
+from typing import Dict, Iterator, List, Optional
+
+from django.db import connections
+
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+(?:\.\d+)?\b")
+_IN_LIST_RE = re.compile(r"\bIN\s*\((?:\s*(?:%s|\?)\s*,?)+\)", re.IGNORECASE)
+_PLACEHOLDER_RE = re.compile(r"%s|%\(\w+\)s")
+_WHITESPACE_RE = re.compile(r"\s+")
+
+
+def normalize_sql(sql: str) -> str:
+    """Return a parameter-independent fingerprint of `sql`.
+
+    - string and numeric literals -> ?
+    - driver placeholders (%s, %(name)s) -> ?
+    - IN (?, ?, ...) -> IN (...)
+    - runs of whitespace -> a single space
+    """
+    sql = _STRING_RE.sub("?", sql)
+    sql = _PLACEHOLDER_RE.sub("?", sql)
+    sql = _NUMBER_RE.sub("?", sql)
+    sql = _IN_LIST_RE.sub("IN (...)", sql)
+    return _WHITESPACE_RE.sub(" ", sql).strip()
+
+
+class QueryStats:
+    """Aggregated timings of all statements sharing one fingerprint."""
+
+    __slots__ = ("fingerprint", "count", "total_time", "max_time")
+
+    def __init__(self, fingerprint: str):
+        self.fingerprint = fingerprint
+        self.count = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    def add(self, duration: float) -> None:
+        self.count += 1
+        self.total_time += duration
+        if duration > self.max_time:
+            self.max_time = duration
+
+
+class QueryRecorder:
+    """An execute wrapper recording count, total time and per-fingerprint stats.
+
+    With `fingerprints=False` only the count and total time are kept, which is
+    cheap enough to run on every request.
+    """
+
+    def __init__(self, fingerprints: bool = True):
+        self.fingerprints = fingerprints
+        self.count = 0
+        self.total_time = 0.0
+        self.stats: Dict[str, QueryStats] = {}
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.record(sql, time.perf_counter() - started)
+
+    def record(self, sql: str, duration: float) -> Optional[QueryStats]:
+        """Account one statement; returns its fingerprint stats when tracked."""
+        self.count += 1
+        self.total_time += duration
+        if not self.fingerprints:
+            return None
+        fingerprint = normalize_sql(sql)
+        stats = self.stats.get(fingerprint)
+        if stats is None:
+            stats = self.stats[fingerprint] = QueryStats(fingerprint)
+        stats.add(duration)
+        return stats
+
+    @contextmanager
+    def installed(self, aliases: Optional[List[str]] = None) -> Iterator["QueryRecorder"]:
+        """Install this recorder on every (or the given) database connection."""
+        with ExitStack() as stack:
+            for alias in aliases or list(connections):
+                stack.enter_context(connections[alias].execute_wrapper(self))
+            yield self
+
+    def duplicates(self) -> List[QueryStats]:
+        """Fingerprints executed more than once, most repeated first."""
+        return sorted((s for s in self.stats.values() if s.count > 1), key=lambda s: s.count, reverse=True)
+
+    def slowest(self, limit: int = 5) -> List[QueryStats]:
+        """The `limit` fingerprints with the highest total time."""
+        return sorted(self.stats.values(), key=lambda s: s.total_time, reverse=True)[:limit]
+
+
+__all__ = [
+    "normalize_sql",
+    "QueryStats",
+    "QueryRecorder",
+]